@@ -0,0 +1,267 @@
+"""
+Bulk import of game accounts from CSV or JSONL supplier files.
+
+    flask accounts import accounts.csv [--batch-size 500] [--restart] [--errors report.csv]
+
+or upload the file at /admin/accounts/import. Columns (CSV header, or
+JSONL object keys): ``title``, ``description``, ``category``, ``rank``,
+``price``, ``account_username``, ``account_password``, ``internal_notes``.
+
+The file is read row by row, never whole. Every row is checked with
+AccountForm's validators, and must also carry credentials. Valid rows are
+collected into batches of ``--batch-size``; each batch's credentials are
+encrypted together and the batch is inserted and committed along with a
+job_checkpoints row holding the last line done and the rejected rows. If
+the import stops halfway, importing the same file again (same SHA-256)
+continues after the last committed batch, and a finished file is not
+imported twice unless ``--restart`` is given.
+
+Bulk inserts skip the ORM hooks, so each batch updates the dashboard
+counters itself and invalidates the catalog, facet and search caches.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from werkzeug.datastructures import MultiDict
+
+from crypto_keys import encrypt_many
+
+accounts_cli = AppGroup('accounts', help='Game account inventory.')
+
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+COLUMNS = ('title', 'description', 'category', 'rank', 'price', 'account_username', 'account_password',
+           'internal_notes')
+REQUIRED_COLUMNS = ('title', 'category', 'price', 'account_username', 'account_password')
+BATCH_SIZE = 500
+# Rejected rows kept for the report; the count covers all of them
+ERROR_LIMIT = 1000
+
+
+class AccountImportError(Exception):
+    """The file as a whole cannot be imported (format, header, encoding)"""
+
+
+def detect_format(filename):
+    fmt = FORMATS.get(os.path.splitext(filename or '')[1].lower())
+    if fmt is None:
+        raise AccountImportError('Chỉ hỗ trợ tệp .csv, .jsonl hoặc .ndjson')
+    return fmt
+
+
+def file_digest(stream):
+    """SHA-256 of a binary stream, read in chunks; the stream is rewound afterwards"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(64 * 1024), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def checkpoint_name(stream):
+    """job_checkpoints name of an import of this file (rewinds the stream)"""
+    return f'account_import:{file_digest(stream)[:32]}'
+
+
+def iter_rows(stream, fmt):
+    """Yield (line number, row dict or None, parse error or None) from a binary stream"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(text)
+            missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+            if missing:
+                raise AccountImportError(f"Thiếu cột: {', '.join(missing)}")
+            for row in reader:
+                yield reader.line_num, row, None
+        else:
+            for line_number, line in enumerate(text, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_number, None, f'JSON không hợp lệ: {e}'
+                    continue
+                if not isinstance(row, dict):
+                    yield line_number, None, 'Mỗi dòng phải là một đối tượng JSON'
+                    continue
+                yield line_number, row, None
+    except UnicodeDecodeError:
+        raise AccountImportError('Tệp phải được mã hóa UTF-8')
+    finally:
+        # Leave the caller's stream open
+        text.detach()
+
+
+class RowValidator:
+    """AccountForm's validators applied to plain dicts, reusing one form"""
+
+    def __init__(self):
+        from forms import AccountForm
+
+        self.form = AccountForm(formdata=None, meta={'csrf': False})
+
+    def __call__(self, row):
+        """Return (column values, None) or (None, {field: [messages]})"""
+        values = {column: '' if row.get(column) is None else str(row[column]).strip() for column in COLUMNS}
+        self.form.process(MultiDict(values))
+        errors = {} if self.form.validate() else dict(self.form.errors)
+        for column in ('account_username', 'account_password'):
+            if not values[column]:
+                errors.setdefault(column, []).append('Không được để trống')
+        if errors:
+            return None, errors
+        values['price'] = self.form.price.data
+        return values, None
+
+
+def _report_entry(line, row, errors):
+    return {'line': line, 'title': str((row or {}).get('title') or '')[:200], 'errors': errors}
+
+
+class _Batch:
+    def __init__(self):
+        self.rows = []
+        self.errors = []
+        self.failed = 0
+        self.last_line = 0
+
+    def __len__(self):
+        return len(self.rows) + self.failed
+
+
+def _flush(batch, checkpoint, encryption_key):
+    """Insert a batch and advance the checkpoint in one transaction; returns the categories touched"""
+    from extensions import dashboard_stats, db
+    from models import GameAccount
+
+    details = dict(checkpoint.details)
+    if batch.rows:
+        tokens = encrypt_many(encryption_key, [row['account_username'] for row in batch.rows]
+                              + [row['account_password'] for row in batch.rows])
+        now = datetime.utcnow()
+        for row, username, password in zip(batch.rows, tokens, tokens[len(batch.rows):]):
+            row.update(account_username=username, account_password=password, description=row['description'] or None,
+                       rank=row['rank'] or None, internal_notes=row['internal_notes'] or None,
+                       is_sold=False, images=[], created_at=now, updated_at=now)
+        db.session.execute(GameAccount.__table__.insert(), batch.rows)
+        dashboard_stats.apply({'accounts_total': len(batch.rows)})
+    details['imported'] += len(batch.rows)
+    details['failed'] += batch.failed
+    details['errors'] = (details['errors'] + batch.errors)[:ERROR_LIMIT]
+    checkpoint.position = batch.last_line
+    checkpoint.details = details
+    db.session.commit()
+    return {row['category'] for row in batch.rows}
+
+
+def _invalidate_caches(categories):
+    from extensions import catalog_cache, catalog_facets, search_index
+
+    catalog_cache.invalidate(categories)
+    catalog_facets.invalidate()
+    search_index.invalidate()
+
+
+def import_accounts(stream, filename, batch_size=BATCH_SIZE, restart=False, progress=None):
+    """Import a CSV/JSONL binary stream; returns the checkpoint details plus ``checkpoint`` and ``resumed_from``"""
+    from extensions import db, encryption_key
+    from models import JobCheckpoint
+
+    fmt = detect_format(filename)
+    checkpoint = JobCheckpoint.load(checkpoint_name(stream))
+    if restart or not checkpoint.details:
+        checkpoint.position = 0
+        checkpoint.details = {'file': filename, 'format': fmt, 'imported': 0, 'failed': 0, 'errors': [],
+                              'finished': False}
+    db.session.commit()
+    summary = {'checkpoint': checkpoint.name, 'resumed_from': checkpoint.position}
+    if checkpoint.details['finished']:
+        return {**checkpoint.details, **summary, 'already_imported': True}
+
+    validate = RowValidator()
+    batch = _Batch()
+    for line, row, parse_error in iter_rows(stream, fmt):
+        if line <= checkpoint.position:
+            continue
+        values, errors = (None, {'row': [parse_error]}) if parse_error else validate(row)
+        if errors:
+            batch.failed += 1
+            batch.errors.append(_report_entry(line, row, errors))
+        else:
+            batch.rows.append(values)
+        batch.last_line = line
+        if len(batch) >= batch_size:
+            _invalidate_caches(_flush(batch, checkpoint, encryption_key))
+            if progress:
+                progress(checkpoint.details)
+            batch = _Batch()
+
+    checkpoint.details = {**checkpoint.details, 'finished': True}
+    if batch.last_line:
+        _invalidate_caches(_flush(batch, checkpoint, encryption_key))
+    else:
+        db.session.commit()
+    return {**checkpoint.details, **summary, 'already_imported': False}
+
+
+def load_report(name):
+    """Checkpoint details of an earlier import, or None"""
+    from extensions import db
+    from models import JobCheckpoint
+
+    if not name.startswith('account_import:'):
+        return None
+    checkpoint = db.session.get(JobCheckpoint, name)
+    return checkpoint.details if checkpoint else None
+
+
+def write_error_report(errors, output):
+    """One CSV line per rejected field: line, title, field, message"""
+    writer = csv.writer(output)
+    writer.writerow(['line', 'title', 'field', 'message'])
+    for entry in errors:
+        for field, messages in entry['errors'].items():
+            for message in messages:
+                writer.writerow([entry['line'], entry['title'], field, message])
+
+
+@accounts_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', type=int, default=BATCH_SIZE, help='Rows encrypted and inserted per transaction.')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint and import the whole file again.')
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False), default=None,
+              help='Write the rejected rows to this CSV file.')
+def import_command(path, batch_size, restart, errors_path):
+    """Import game accounts from a CSV or JSONL file."""
+    from models import AuditLog
+
+    def progress(details):
+        click.echo(f"imported {details['imported']}, rejected {details['failed']}")
+
+    with open(path, 'rb') as stream:
+        try:
+            result = import_accounts(stream, os.path.basename(path), batch_size, restart, progress)
+        except AccountImportError as e:
+            raise click.ClickException(str(e))
+    if result['already_imported']:
+        click.echo(f"⚠️ {path} was already imported ({result['imported']} accounts); use --restart to import it again")
+    else:
+        if result['resumed_from']:
+            click.echo(f"Resumed after line {result['resumed_from']}")
+        AuditLog.create_log(None, 'import_accounts', f"Imported {result['imported']} accounts from "
+                            f"{os.path.basename(path)} ({result['failed']} rows rejected)", sync=True)
+        click.echo(f"✅ Imported {result['imported']} accounts, rejected {result['failed']} rows")
+    if errors_path:
+        with open(errors_path, 'w', newline='', encoding='utf-8') as output:
+            write_error_report(result['errors'], output)
+        click.echo(f"Rejected rows written to {errors_path}")
+    elif result['errors']:
+        for entry in result['errors'][:20]:
+            click.echo(f"  line {entry['line']}: {entry['errors']}", err=True)
@@ -0,0 +1,238 @@
+"""
+Retention and archival for audit_logs.
+
+Rows older than ``AUDIT_RETENTION_DAYS`` are moved, in chunks, into gzip
+compressed JSONL files (one per month) under ``AUDIT_ARCHIVE_DIR`` and then
+deleted from the hot table. Each chunk is written and fsynced before it is
+deleted, so a crash can at worst archive a chunk twice, never lose it.
+
+On PostgreSQL, ``flask audit partition`` converts audit_logs into a table
+partitioned by month on created_at. Archiving then drops whole expired
+partitions instead of deleting rows one by one.
+
+Usage:
+    flask audit archive [--days 30] [--chunk-size 5000] [--sleep 0]
+    flask audit partition [--months-ahead 2]
+"""
+import gzip
+import json
+import os
+import re
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from extensions import db
+
+audit_cli = AppGroup('audit', help='Audit log retention and archival.')
+
+PARTITION_RE = re.compile(r'^audit_logs_p(\d{4})(\d{2})$')
+
+
+def is_postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def next_month(value):
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def archive_path(archive_dir, created_at):
+    return os.path.join(archive_dir, f'audit_logs-{created_at:%Y-%m}.jsonl.gz')
+
+
+def serialize(row):
+    return json.dumps({
+        'id': row['id'],
+        'user_id': row['user_id'],
+        'action': row['action'],
+        'description': row['description'],
+        'ip_address': row['ip_address'],
+        'created_at': row['created_at'].isoformat() if row['created_at'] else None,
+    }, ensure_ascii=False)
+
+
+def write_archive(rows, archive_dir):
+    """Append rows to their monthly archive files and fsync them"""
+    os.makedirs(archive_dir, exist_ok=True)
+    by_path = {}
+    for row in rows:
+        by_path.setdefault(archive_path(archive_dir, row['created_at']), []).append(row)
+    for path, path_rows in by_path.items():
+        # Appending creates a new gzip member; gzip readers concatenate them
+        with open(path, 'ab') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='ab') as archive:
+                archive.write(''.join(serialize(row) + '\n' for row in path_rows).encode())
+            raw.flush()
+            os.fsync(raw.fileno())
+
+
+def partitioned_table_exists():
+    if not is_postgres():
+        return False
+    return db.session.execute(db.text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = 'audit_logs'"
+    )).first() is not None
+
+
+def list_partitions():
+    """Return {partition name: month start} for monthly audit_logs partitions"""
+    names = db.session.execute(db.text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'audit_logs'"
+    )).scalars()
+    partitions = {}
+    for name in names:
+        match = PARTITION_RE.match(name)
+        if match:
+            partitions[name] = datetime(int(match.group(1)), int(match.group(2)), 1)
+    return partitions
+
+
+def ensure_partitions(start, months_ahead=2):
+    """Create monthly partitions from ``start`` up to ``months_ahead`` months from now"""
+    existing = set(list_partitions())
+    end = month_start(datetime.utcnow())
+    for _ in range(months_ahead):
+        end = next_month(end)
+    created = []
+    current = month_start(start)
+    while current <= end:
+        name = f'audit_logs_p{current:%Y%m}'
+        if name not in existing:
+            db.session.execute(db.text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF audit_logs "
+                f"FOR VALUES FROM ('{current:%Y-%m-%d}') TO ('{next_month(current):%Y-%m-%d}')"
+            ))
+            created.append(name)
+        current = next_month(current)
+    return created
+
+
+def convert_to_partitioned(months_ahead=2):
+    """Rebuild audit_logs as a monthly range-partitioned table (PostgreSQL only).
+
+    Runs in one transaction and copies the current rows, so run ``archive``
+    first to keep the copy small.
+    """
+    if not is_postgres():
+        raise click.ClickException('Partitioning is only supported on PostgreSQL')
+    if partitioned_table_exists():
+        return ensure_partitions(datetime.utcnow(), months_ahead)
+
+    oldest = db.session.execute(db.text("SELECT min(created_at) FROM audit_logs")).scalar() or datetime.utcnow()
+    for statement in [
+        "ALTER TABLE audit_logs RENAME TO audit_logs_legacy",
+        "ALTER INDEX IF EXISTS ix_audit_logs_created_at RENAME TO ix_audit_logs_legacy_created_at",
+        "ALTER TABLE audit_logs_legacy RENAME CONSTRAINT audit_logs_pkey TO audit_logs_legacy_pkey",
+        "CREATE TABLE audit_logs ("
+        " id INTEGER NOT NULL DEFAULT nextval('audit_logs_id_seq'),"
+        " user_id INTEGER REFERENCES users (id),"
+        " action VARCHAR(100) NOT NULL,"
+        " description TEXT,"
+        " ip_address VARCHAR(50),"
+        " created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),"
+        " PRIMARY KEY (id, created_at)"
+        ") PARTITION BY RANGE (created_at)",
+        "CREATE INDEX ix_audit_logs_created_at ON audit_logs (created_at)",
+        "CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT",
+    ]:
+        db.session.execute(db.text(statement))
+    created = ensure_partitions(oldest, months_ahead)
+    for statement in [
+        "INSERT INTO audit_logs (id, user_id, action, description, ip_address, created_at) "
+        "SELECT id, user_id, action, description, ip_address, coalesce(created_at, now() AT TIME ZONE 'utc') "
+        "FROM audit_logs_legacy",
+        "ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id",
+        "DROP TABLE audit_logs_legacy",
+    ]:
+        db.session.execute(db.text(statement))
+    db.session.commit()
+    return created
+
+
+def _archive_partitions(cutoff, archive_dir, chunk_size):
+    """Archive and drop partitions that end before ``cutoff``"""
+    table = db.metadata.tables['audit_logs']
+    archived = 0
+    for name, start in sorted(list_partitions().items(), key=lambda item: item[1]):
+        if next_month(start) > cutoff:
+            continue
+        partition = db.table(name, *[db.column(c.name) for c in table.columns])
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                db.select(partition).where(partition.c.id > last_id).order_by(partition.c.id).limit(chunk_size)
+            ).mappings().all()
+            if not rows:
+                break
+            write_archive(rows, archive_dir)
+            archived += len(rows)
+            last_id = rows[-1]['id']
+        db.session.execute(db.text(f"DROP TABLE {name}"))
+        db.session.commit()
+    return archived
+
+
+def archive_old_logs(retention_days=None, chunk_size=None, archive_dir=None, sleep=0.0):
+    """Move audit logs older than the retention window into archive files.
+
+    Returns the number of rows archived.
+    """
+    config = current_app.config
+    if retention_days is None:
+        retention_days = config.get('AUDIT_RETENTION_DAYS', 30)
+    if chunk_size is None:
+        chunk_size = config.get('AUDIT_ARCHIVE_CHUNK_SIZE', 5000)
+    archive_dir = archive_dir or config.get('AUDIT_ARCHIVE_DIR', 'archive/audit_logs')
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    table = db.metadata.tables['audit_logs']
+
+    archived = 0
+    if partitioned_table_exists():
+        ensure_partitions(datetime.utcnow())
+        db.session.commit()
+        archived += _archive_partitions(cutoff, archive_dir, chunk_size)
+
+    while True:
+        rows = db.session.execute(
+            db.select(table).where(table.c.created_at < cutoff).order_by(table.c.id).limit(chunk_size)
+        ).mappings().all()
+        if not rows:
+            break
+        write_archive(rows, archive_dir)
+        db.session.execute(table.delete().where(table.c.id.in_([row['id'] for row in rows])))
+        db.session.commit()
+        archived += len(rows)
+        if sleep:
+            time.sleep(sleep)
+    return archived
+
+
+@audit_cli.command('archive')
+@click.option('--days', type=int, default=None, help='Hot window in days (AUDIT_RETENTION_DAYS).')
+@click.option('--chunk-size', type=int, default=None, help='Rows moved per transaction.')
+@click.option('--archive-dir', default=None, help='Directory for .jsonl.gz archives.')
+@click.option('--sleep', type=float, default=0.0, help='Pause between chunks, in seconds.')
+def archive_command(days, chunk_size, archive_dir, sleep):
+    """Archive audit logs older than the retention window."""
+    archived = archive_old_logs(days, chunk_size, archive_dir, sleep)
+    click.echo(f"✅ Archived {archived} audit log rows")
+
+
+@audit_cli.command('partition')
+@click.option('--months-ahead', type=int, default=2, help='Future monthly partitions to create.')
+def partition_command(months_ahead):
+    """Convert audit_logs to monthly partitions / create upcoming partitions (PostgreSQL)."""
+    created = convert_to_partitioned(months_ahead)
+    db.session.commit()
+    click.echo(f"✅ audit_logs is partitioned, created {len(created)} partitions")
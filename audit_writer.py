@@ -0,0 +1,165 @@
+"""
+Buffered, asynchronous writer for audit_logs.
+
+AuditLog.create_log() hands rows to this writer instead of committing the
+request session. Rows are queued in memory and a background thread inserts
+them in bulk once ``batch_size`` rows are waiting or ``flush_interval``
+seconds have passed. The queue is bounded: when it is full, producers wait
+up to ``enqueue_timeout`` and the row is dropped (and counted) after that.
+
+Security-relevant actions are written synchronously on a separate
+connection, so they are never lost and never commit unrelated request state.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+
+SYNC_ACTIONS = frozenset({
+    'login_failed',
+    'access_denied',
+    'password_reset',
+    'password_reset_request',
+})
+
+
+class AuditWriter:
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.batch_size = 100
+        self.flush_interval = 2.0
+        self.queue_size = 10000
+        self.enqueue_timeout = 0.05
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.enqueued = 0
+        self.written = 0
+        self.written_sync = 0
+        self.dropped = 0
+        self.backpressure_waits = 0
+        self.flushes = 0
+        self.errors = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.setdefault('AUDIT_LOG_ASYNC', True)
+        self.batch_size = app.config.setdefault('AUDIT_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.setdefault('AUDIT_FLUSH_INTERVAL', self.flush_interval)
+        self.queue_size = app.config.setdefault('AUDIT_QUEUE_SIZE', self.queue_size)
+        self.enqueue_timeout = app.config.setdefault('AUDIT_ENQUEUE_TIMEOUT', self.enqueue_timeout)
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        app.extensions['audit_writer'] = self
+        atexit.register(self.shutdown)
+
+    def _ensure_started(self):
+        # Threads do not survive fork(), so each gunicorn worker starts its own
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.queue_size)
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, row, sync=False):
+        """Record one audit row (a dict of AuditLog column values)"""
+        if sync or not self.enabled or self.app is None:
+            self._write_sync([row])
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.backpressure_waits += 1
+            try:
+                self._queue.put(row, timeout=self.enqueue_timeout)
+            except queue.Full:
+                self.dropped += 1
+                return
+        self.enqueued += 1
+
+    def _insert(self, rows):
+        from extensions import db
+        from models import AuditLog
+
+        with db.engine.begin() as connection:
+            connection.execute(AuditLog.__table__.insert(), rows)
+
+    def _write_sync(self, rows):
+        if self.app is None:
+            self._insert(rows)
+        else:
+            with self.app.app_context():
+                self._insert(rows)
+        self.written_sync += len(rows)
+
+    def _drain(self, limit):
+        rows = []
+        while len(rows) < limit:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def flush(self):
+        """Write everything currently queued; returns the number of rows"""
+        total = 0
+        while True:
+            rows = self._drain(self.batch_size)
+            if not rows:
+                return total
+            try:
+                with self.app.app_context():
+                    self._insert(rows)
+            except Exception as e:
+                self.errors += 1
+                self.dropped += len(rows)
+                print(f"⚠️ Audit log flush failed, {len(rows)} rows dropped: {e}")
+                return total
+            self.written += len(rows)
+            self.flushes += 1
+            total += len(rows)
+
+    def _run(self):
+        while not self._stop.is_set():
+            deadline = time.monotonic() + self.flush_interval
+            while self._queue.qsize() < self.batch_size and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._stop.wait(min(remaining, 0.1))
+            self.flush()
+
+    def shutdown(self, timeout=5.0):
+        """Stop the background thread and flush what is left"""
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+        if self._queue is not None and self.app is not None:
+            self.flush()
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'queue_size': self.queue_size,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'written_sync': self.written_sync,
+            'dropped': self.dropped,
+            'backpressure_waits': self.backpressure_waits,
+            'flushes': self.flushes,
+            'errors': self.errors,
+        }
@@ -0,0 +1,619 @@
+"""
+Benchmarks for the shop's hot routes.
+
+    python benchmark.py run [--users 500] [--accounts 20000] [--mode client --mode server]
+                            [--requests 300] [--concurrency 8] [--workers 2] [--save-baseline]
+    python benchmark.py compare RESULTS.json [BASELINE.json] [--threshold 10]
+
+Scenarios: the catalog (``index`` plain, filtered and searched),
+``account_detail``, ``add_to_cart``, ``checkout``, ``order_detail`` and
+``admin_dashboard``. Customers are seeded users (``SEED_PASSWORD``), each
+requesting their own orders; checkout refills the cart with one account
+before every timed POST, and that request counts towards its throughput.
+
+Modes:
+* ``client``: the Flask test client in this process, one request at a
+  time. Measures the app without HTTP or worker overhead.
+* ``server``: gunicorn with gunicorn.conf.py and ``--workers`` processes,
+  driven over keep-alive HTTP by ``--concurrency`` threads, one logged-in
+  customer each.
+
+The dataset is seeded once per ``--users``/``--accounts``/``--seed`` into
+``BENCHMARK_DIR`` (default ``instance/benchmarks/``) with ``flask init-db`` and ``flask seed``, and every
+mode runs on a fresh copy of it, so repeated runs see the same data. With
+``--database URL`` that database is used as it is (seed it first, and
+expect drift between runs as checkouts consume accounts). This also needs
+``--create-admin``, since the run then writes to that database:
+* it creates the admin ``bench-admin@example.com`` with ``SEED_PASSWORD``
+  and deletes it again when the run ends;
+* it empties the carts of the customers it logs in as, before every
+  scenario, so checkouts only buy the benchmark's accounts;
+* checkouts sell accounts and create completed orders.
+
+Results are written as JSON. If a baseline exists (``--save-baseline``
+stores one), throughput and p50/p95/p99 latency are compared with it, and
+changes beyond ``--threshold`` percent are reported; regressions exit 1.
+Percentiles of a few hundred requests move by several percent between
+identical runs, so raise ``--requests`` before trusting a tight threshold.
+"""
+import http.client
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+import click
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.environ.get('BENCHMARK_DIR', os.path.join(ROOT, 'instance', 'benchmarks'))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+ADMIN_EMAIL = 'bench-admin@example.com'
+# Forms are posted without CSRF tokens, like a browser that already has one
+SERVER_APP = 'app:create_app(config={"WTF_CSRF_ENABLED": False})'
+# metric, +1 if higher is better
+METRICS = (('rps', 1), ('p50_ms', -1), ('p95_ms', -1), ('p99_ms', -1))
+
+
+class Scenario:
+    def __init__(self, name, role, request, expect=None, prepare=None):
+        self.name = name
+        self.role = role
+        # (iteration, session) -> (method, path, form)
+        self.request = request
+        self.expect = expect or (lambda status, location: status == 200)
+        # Untimed setup before each request, e.g. filling the cart
+        self.prepare = prepare
+
+
+def scenarios(fixtures):
+    index_paths = fixtures['index_paths']
+    search_paths = fixtures['search_paths']
+    browse = fixtures['accounts']['browse']
+    cart = fixtures['accounts']['cart']
+    checkout = fixtures['accounts']['checkout']
+
+    def fill_cart(i, session):
+        session.request('POST', f'/add_to_cart/{checkout[i]}')
+
+    return [
+        Scenario('index', 'customer', lambda i, s: ('GET', '/', None)),
+        Scenario('index_filtered', 'customer', lambda i, s: ('GET', index_paths[i % len(index_paths)], None)),
+        Scenario('index_search', 'customer', lambda i, s: ('GET', search_paths[i % len(search_paths)], None)),
+        Scenario('account_detail', 'customer', lambda i, s: ('GET', f'/account/{browse[i % len(browse)]}', None)),
+        Scenario('order_detail', 'customer', lambda i, s: ('GET', f'/order/{s.orders[i % len(s.orders)]}', None)),
+        Scenario('admin_dashboard', 'admin', lambda i, s: ('GET', '/admin', None)),
+        Scenario('add_to_cart', 'customer', lambda i, s: ('POST', f'/add_to_cart/{cart[i]}', None)),
+        Scenario('checkout', 'customer',
+                 lambda i, s: ('POST', '/checkout', {'customer_name': s.name, 'customer_email': s.email,
+                                                     'customer_phone': '0900000000'}),
+                 expect=lambda status, location: status == 302 and '/payment/' in location,
+                 prepare=fill_cart),
+    ]
+
+
+class _ClientSession:
+    """Flask test client with the same interface as _HttpSession"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None):
+        response = self.client.open(path, method=method, data=form)
+        response.get_data()
+        return response.status_code, response.headers.get('Location', '')
+
+
+class _HttpSession:
+    """One keep-alive connection with its own cookies"""
+
+    def __init__(self, port):
+        self.port = port
+        self.cookies = {}
+        self.connection = None
+
+    def request(self, method, path, form=None):
+        headers = {}
+        body = urlencode(form) if form is not None else None
+        if body is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            try:
+                self.connection.request(method, path, body, headers)
+                response = self.connection.getresponse()
+                response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                # The server closed an idle keep-alive connection
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        return response.status, response.getheader('Location', '')
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of sorted ``values``"""
+    if not values:
+        return 0.0
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 2)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1]) if latencies else 0.0,
+    }
+
+
+def _phase(scenario, sessions, start, count):
+    """Run iterations start..start+count spread over the sessions; returns latencies, errors, wall time"""
+    counter = itertools.count(start)
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+
+    def worker(session):
+        while True:
+            with lock:
+                i = next(counter)
+            if i >= start + count:
+                return
+            if scenario.prepare:
+                scenario.prepare(i, session)
+            method, path, form = scenario.request(i, session)
+            started = time.perf_counter()
+            try:
+                status, location = session.request(method, path, form)
+                ok = scenario.expect(status, location)
+            except (http.client.HTTPException, OSError):
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += not ok
+
+    started = time.perf_counter()
+    if len(sessions) == 1:
+        worker(sessions[0])
+    else:
+        with ThreadPoolExecutor(len(sessions)) as executor:
+            list(executor.map(worker, sessions))
+    return latencies, errors[0], time.perf_counter() - started
+
+
+def run_scenario(scenario, sessions, requests, warmup):
+    _phase(scenario, sessions, 0, warmup)
+    latencies, errors, elapsed = _phase(scenario, sessions, warmup, requests)
+    return summarize(latencies, errors, elapsed)
+
+
+def _login(session, email):
+    status, _ = session.request('POST', '/login', {'email': email, 'password': _seed_password()})
+    if status != 302:
+        raise click.ClickException(f'Could not log in as {email} (HTTP {status})')
+
+
+def _seed_password():
+    from seed_data import SEED_PASSWORD
+
+    return SEED_PASSWORD
+
+
+def _sessions(make_session, fixtures, count):
+    """``count`` customer sessions and as many admin sessions, logged in"""
+    customers = []
+    for customer in fixtures['customers'][:count]:
+        session = make_session()
+        _login(session, customer['email'])
+        session.name, session.email, session.orders = customer['name'], customer['email'], customer['orders']
+        customers.append(session)
+    admins = []
+    for _ in range(count):
+        session = make_session()
+        _login(session, ADMIN_EMAIL)
+        admins.append(session)
+    return {'customer': customers, 'admin': admins}
+
+
+def _dataset_path(users, accounts, seed):
+    return os.path.join(BENCH_DIR, f'dataset-{users}u-{accounts}a-seed{seed}.db')
+
+
+def prepare_dataset(users, accounts, seed):
+    """Seed the pristine dataset file unless it already exists; returns its path"""
+    path = _dataset_path(users, accounts, seed)
+    if os.path.exists(path):
+        return path
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    partial = path + '.partial'
+    if os.path.exists(partial):
+        os.remove(partial)
+    click.echo(f"Seeding {users} users and {accounts} accounts into {os.path.relpath(path, ROOT)} ...")
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{partial}')
+    for command in (['init-db', '--no-seed'],
+                    ['seed', '--users', str(users), '--accounts', str(accounts), '--seed', str(seed)]):
+        result = subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', *command], cwd=ROOT, env=env,
+                                capture_output=True, text=True)
+        if result.returncode:
+            raise click.ClickException(f"flask {command[0]} failed:\n{result.stdout}{result.stderr}")
+    os.replace(partial, path)
+    return path
+
+
+def reset_database(pristine, working):
+    """Replace the working copy with the pristine dataset and drop everything cached from the old one"""
+    from extensions import catalog_cache, catalog_facets, db, search_index, user_cache
+
+    db.engine.dispose()
+    shutil.copyfile(pristine, working)
+    for suffix in ('-wal', '-shm', '-journal'):
+        if os.path.exists(working + suffix):
+            os.remove(working + suffix)
+    catalog_cache.invalidate()
+    catalog_facets.invalidate()
+    search_index.invalidate()
+    user_cache.invalidate()
+
+
+def load_fixtures(sessions, requests, warmup, seed):
+    """Admin user, customers with orders, and the accounts and URLs the scenarios use.
+
+    Empties the chosen customers' carts. ``created_admin`` is True when the
+    admin did not exist yet; remove_admin() deletes it again.
+    """
+    from extensions import db
+    from models import CartItem, GameAccount, Order, User
+
+    admin = User.query.filter_by(email=ADMIN_EMAIL).first()
+    created_admin = admin is None
+    if created_admin:
+        admin = User(email=ADMIN_EMAIL, username='bench-admin', full_name='Benchmark Admin',
+                     role='admin', is_admin=True)
+        admin.set_password(_seed_password())
+        db.session.add(admin)
+
+    customer_ids = [row[0] for row in db.session.query(Order.user_id).join(User, User.id == Order.user_id)
+                    .filter(User.role == 'user').distinct().order_by(Order.user_id).limit(sessions)]
+    if len(customer_ids) < sessions:
+        raise click.ClickException(f'{sessions} customers with orders needed, the dataset has {len(customer_ids)}; '
+                                   'seed more --users/--accounts or lower --concurrency')
+    customers = []
+    for user in User.query.filter(User.id.in_(customer_ids)).order_by(User.id):
+        orders = [row[0] for row in db.session.query(Order.id).filter_by(user_id=user.id).order_by(Order.id).limit(50)]
+        customers.append({'email': user.email, 'name': user.full_name or user.username, 'orders': orders})
+    # Seeded carts would be checked out along with the benchmark's accounts
+    CartItem.query.filter(CartItem.user_id.in_(customer_ids)).delete(synchronize_session=False)
+    db.session.commit()
+
+    rng = random.Random(seed)
+    available = [row[0] for row in db.session.query(GameAccount.id)
+                 .filter(GameAccount.is_sold.is_(False), GameAccount.order_id.is_(None)).order_by(GameAccount.id)]
+    needed = 2 * (requests + warmup)
+    if len(available) < needed:
+        raise click.ClickException(f'{needed} unsold accounts needed, the dataset has {len(available)}; '
+                                   'seed more --accounts or lower --requests')
+    rng.shuffle(available)
+    buyable = available[:needed]
+    cart_ids = buyable[:requests + warmup]
+    listings = db.session.query(GameAccount.category, GameAccount.rank, db.func.min(GameAccount.price),
+                                db.func.max(GameAccount.price)).filter(GameAccount.is_sold.is_(False)) \
+        .group_by(GameAccount.category, GameAccount.rank).all()
+    index_paths = []
+    for category, rank, low, high in rng.sample(listings, min(len(listings), 12)):
+        index_paths.append('/?' + urlencode({'category': category, 'rank': rank}))
+        index_paths.append('/?' + urlencode({'category': category, 'min_price': int(low),
+                                             'max_price': int((low + high) / 2), 'sort': 'price_asc'}))
+    index_paths += [f'/?page={page}' for page in range(2, 6)]
+    words = sorted({word for category, rank, _, _ in listings for word in (category.split()[0], rank)})
+    search_paths = ['/?' + urlencode({'search': word}) for word in rng.sample(words, min(len(words), 12))]
+    return {
+        'created_admin': created_admin,
+        'customer_ids': customer_ids,
+        'customers': customers,
+        'accounts': {'browse': available[needed:] or available, 'cart': cart_ids,
+                     'checkout': buyable[requests + warmup:]},
+        'index_paths': index_paths or ['/'],
+        'search_paths': search_paths or ['/?search=skin'],
+    }
+
+
+def remove_admin():
+    """Delete the benchmark admin; its audit rows are kept without a user"""
+    from extensions import audit_writer, db
+    from models import AuditLog, User
+
+    admin = User.query.filter_by(email=ADMIN_EMAIL).first()
+    if admin is None:
+        return
+    # Queued login records would otherwise point at the deleted user
+    audit_writer.flush()
+    AuditLog.query.filter_by(user_id=admin.id).update({'user_id': None}, synchronize_session=False)
+    db.session.delete(admin)
+    db.session.commit()
+
+
+def clear_carts(fixtures):
+    from extensions import db
+    from models import CartItem
+
+    CartItem.query.filter(CartItem.user_id.in_(fixtures['customer_ids'])).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_healthy(process, port, log_path, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            with open(log_path) as log:
+                raise click.ClickException(f'gunicorn exited with {process.returncode}:\n{log.read()[-2000:]}')
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        try:
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            connection.close()
+        time.sleep(0.2)
+    raise click.ClickException(f'gunicorn did not become healthy within {timeout}s; see {log_path}')
+
+
+@contextmanager
+def serve(database_url, workers):
+    """gunicorn on a free port with ``workers`` processes; yields the port"""
+    port = _free_port()
+    metrics_dir = tempfile.mkdtemp(prefix='shop-bench-metrics-')
+    log_path = os.path.join(BENCH_DIR, 'server.log')
+    env = dict(os.environ, DATABASE_URL=database_url, PORT=str(port), WEB_CONCURRENCY=str(workers),
+               PROMETHEUS_MULTIPROC_DIR=metrics_dir)
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen([sys.executable, '-m', 'gunicorn', SERVER_APP, '--config', 'gunicorn.conf.py'],
+                                   cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            _wait_until_healthy(process, port, log_path)
+            yield port
+        finally:
+            process.terminate()
+            try:
+                process.wait(30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+def run_scenarios(app, fixtures, make_session, count, requests, warmup):
+    """Every scenario with ``count`` concurrent sessions; returns {scenario: stats}"""
+    sessions = _sessions(make_session, fixtures, count)
+    results = {}
+    try:
+        for scenario in scenarios(fixtures):
+            with app.app_context():
+                clear_carts(fixtures)
+            stats = run_scenario(scenario, sessions[scenario.role], requests, warmup)
+            click.echo(f"  {scenario.name:<16} {stats['rps']:>8.1f} req/s  p50 {stats['p50_ms']:>7.1f} ms  "
+                       f"p95 {stats['p95_ms']:>7.1f} ms  p99 {stats['p99_ms']:>7.1f} ms"
+                       + (f"  ⚠️ {stats['errors']} errors" if stats['errors'] else ''))
+            results[scenario.name] = stats
+    finally:
+        for session in itertools.chain(*sessions.values()):
+            if hasattr(session, 'close'):
+                session.close()
+    return results
+
+
+def _commit_hash():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, threshold):
+    """One row per scenario and metric present in both; status is ok, regression or improvement"""
+    rows = []
+    for mode, results in current['results'].items():
+        for name, stats in results.items():
+            base = baseline['results'].get(mode, {}).get(name)
+            if base is None:
+                continue
+            for metric, direction in METRICS:
+                old, new = base[metric], stats[metric]
+                change = (new - old) / old * 100 if old else 0.0
+                worse = -change * direction
+                status = 'regression' if worse > threshold else 'improvement' if worse < -threshold else 'ok'
+                rows.append({'mode': mode, 'scenario': name, 'metric': metric, 'baseline': old,
+                             'current': new, 'change_pct': round(change, 1), 'status': status})
+            if stats['errors'] > base['errors']:
+                rows.append({'mode': mode, 'scenario': name, 'metric': 'errors', 'baseline': base['errors'],
+                             'current': stats['errors'], 'change_pct': None, 'status': 'regression'})
+    return rows
+
+
+def _mismatched_settings(current, baseline):
+    return [key for key in ('dataset', 'requests', 'concurrency', 'workers', 'cpus')
+            if current['meta'].get(key) != baseline['meta'].get(key)]
+
+
+def report(current, baseline, threshold):
+    """Print the comparison; returns its rows"""
+    mismatched = _mismatched_settings(current, baseline)
+    if mismatched:
+        click.echo(f"⚠️ The baseline was measured with different {', '.join(mismatched)}; "
+                   "the numbers are not directly comparable")
+    rows = compare(current, baseline, threshold)
+    click.echo(f"\nCompared with the baseline from {baseline['meta'].get('created_at')} "
+               f"(commit {baseline['meta'].get('commit')}), threshold {threshold:g}%:")
+    marks = {'ok': '', 'regression': '❌ regression', 'improvement': '✅ improvement'}
+    for row in rows:
+        change = '' if row['change_pct'] is None else f"{row['change_pct']:+.1f}%"
+        click.echo(f"  {row['mode']:<7} {row['scenario']:<16} {row['metric']:<7} {row['baseline']:>10} -> "
+                   f"{row['current']:<10} {change:>8}  {marks[row['status']]}")
+    regressions = _regressions(rows)
+    if regressions:
+        click.echo(f"❌ {len(regressions)} regressions beyond {threshold:g}%")
+    else:
+        click.echo("✅ No regressions")
+    return rows
+
+
+def _regressions(rows):
+    return [row for row in rows if row['status'] == 'regression']
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save(document, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+
+
+@click.group()
+def cli():
+    """Benchmark the shop's hot routes."""
+
+
+@cli.command()
+@click.option('--users', type=int, default=500, help='Seeded users in the dataset.')
+@click.option('--accounts', type=int, default=20000, help='Seeded game accounts in the dataset.')
+@click.option('--seed', 'seed', type=int, default=42, help='Seed for the dataset and the request mix.')
+@click.option('--database', default=None, help='Benchmark this (already seeded) database instead.')
+@click.option('--create-admin', is_flag=True,
+              help='Allow --database runs to create (then delete) the benchmark admin and empty customer carts.')
+@click.option('--mode', 'modes', type=click.Choice(['client', 'server']), multiple=True,
+              help='client, server or both (default).')
+@click.option('--requests', type=int, default=200, help='Timed requests per scenario.')
+@click.option('--warmup', type=int, default=20, help='Untimed requests per scenario before measuring.')
+@click.option('--concurrency', type=int, default=8, help='Concurrent sessions in server mode.')
+@click.option('--workers', type=int, default=2, help='gunicorn workers in server mode.')
+@click.option('--output', default=None, help='Results file (default: instance/benchmarks/results-<time>.json).')
+@click.option('--baseline', default=DEFAULT_BASELINE, show_default=True, help='Baseline to compare with.')
+@click.option('--threshold', type=float, default=10.0, show_default=True, help='Allowed change in percent.')
+@click.option('--save-baseline', is_flag=True, help='Store these results as the new baseline.')
+def run(users, accounts, seed, database, create_admin, modes, requests, warmup, concurrency, workers, output,
+        baseline, threshold, save_baseline):
+    """Measure throughput and p50/p95/p99 latency of every scenario."""
+    if database and not create_admin:
+        raise click.UsageError(f'--database writes to that database: it creates the admin {ADMIN_EMAIL} '
+                               '(removed afterwards), empties the carts of the customers it uses and buys '
+                               'accounts. Pass --create-admin to allow this.')
+    if database:
+        pristine, database_url = None, database
+    else:
+        pristine = prepare_dataset(users, accounts, seed)
+        working = os.path.join(BENCH_DIR, 'run.db')
+        database_url = f'sqlite:///{working}'
+    os.environ['DATABASE_URL'] = database_url
+    from app import create_app
+
+    app = create_app({'WTF_CSRF_ENABLED': False})
+    results = {}
+    created_admin = False
+    try:
+        for mode in modes or ('client', 'server'):
+            sessions = 1 if mode == 'client' else concurrency
+            with app.app_context():
+                if pristine:
+                    reset_database(pristine, working)
+                fixtures = load_fixtures(sessions, requests, warmup, seed)
+            created_admin = created_admin or fixtures['created_admin']
+            click.echo(f"{mode}: {requests} requests per scenario, {sessions} sessions"
+                       + (f", {workers} workers" if mode == 'server' else ''))
+            if mode == 'client':
+                results[mode] = run_scenarios(app, fixtures, lambda: _ClientSession(app), 1, requests, warmup)
+            else:
+                with serve(database_url, workers) as port:
+                    results[mode] = run_scenarios(app, fixtures, lambda: _HttpSession(port), sessions, requests,
+                                                  warmup)
+    finally:
+        if database and created_admin:
+            with app.app_context():
+                remove_admin()
+            click.echo(f"Removed {ADMIN_EMAIL}")
+
+    document = {
+        'meta': {
+            'created_at': datetime.utcnow().replace(microsecond=0).isoformat(),
+            'commit': _commit_hash(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'dataset': ({'users': users, 'accounts': accounts, 'seed': seed} if pristine
+                        else {'database': database_url.split(':', 1)[0]}),
+            'requests': requests,
+            'warmup': warmup,
+            'concurrency': concurrency,
+            'workers': workers,
+        },
+        'results': results,
+    }
+    output = output or os.path.join(BENCH_DIR, f"results-{datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    rows = []
+    if os.path.exists(baseline):
+        rows = report(document, _load(baseline), threshold)
+        document['comparison'] = {'baseline': baseline, 'threshold': threshold, 'rows': rows}
+    _save(document, output)
+    click.echo(f"Results saved to {output}")
+    if save_baseline:
+        _save(document, baseline)
+        click.echo(f"✅ Baseline saved to {baseline}")
+    elif _regressions(rows):
+        sys.exit(1)
+
+
+@cli.command('compare')
+@click.argument('results', type=click.Path(exists=True, dir_okay=False))
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False), default=DEFAULT_BASELINE)
+@click.option('--threshold', type=float, default=10.0, show_default=True, help='Allowed change in percent.')
+def compare_command(results, baseline, threshold):
+    """Report changes between a results file and the baseline; exits 1 on regressions."""
+    if _regressions(report(_load(results), _load(baseline), threshold)):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    cli()
@@ -5,5 +5,8 @@ set -o errexit
 
 pip install -r requirements.txt
 
+# Fingerprint and precompress static assets
+python static_assets.py
+
 # Initialize database
-python init_db.py
+flask --app app init-db
@@ -0,0 +1,143 @@
+"""
+In-process cache for the storefront catalog listing.
+
+Entries are keyed by the index() filter arguments and hold detached snapshots
+of the unsold accounts on a page, so a cache hit never touches the database.
+Routes that change the unsold catalog call ``invalidate()`` with the affected
+categories; a TTL bounds staleness between gunicorn workers.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask_sqlalchemy.pagination import Pagination
+
+
+class CatalogItem:
+    """Read-only copy of the GameAccount fields the catalog templates use"""
+
+    def __init__(self, account):
+        self.id = account.id
+        self.title = account.title
+        self.description = account.description
+        self.category = account.category
+        self.rank = account.rank
+        self.price = account.price
+        self.is_sold = account.is_sold
+        self.images = list(account.get_images())
+        self.image_variants = {}
+        self.created_at = account.created_at
+        self.updated_at = account.updated_at
+
+    def get_images(self):
+        return self.images
+
+    def __repr__(self):
+        return f'<CatalogItem {self.title}>'
+
+
+class CatalogPage(Pagination):
+    """Pagination over already materialized items, compatible with index.html"""
+
+    def _query_items(self):
+        return self._query_args['items']
+
+    def _query_count(self):
+        return self._query_args['total']
+
+    @classmethod
+    def from_pagination(cls, pagination):
+        return cls(
+            page=pagination.page,
+            per_page=pagination.per_page,
+            max_per_page=None,
+            error_out=False,
+            items=[CatalogItem(account) for account in pagination.items],
+            total=pagination.total,
+        )
+
+
+def make_key(page, category, rank, min_price, max_price, search, sort='newest', cursor=''):
+    return (page, category or '', rank or '', min_price, max_price, (search or '').strip().lower(),
+            sort, cursor or '')
+
+
+class CatalogCache:
+    def __init__(self, app=None, maxsize=256, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.maxsize = app.config.setdefault('CATALOG_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.setdefault('CATALOG_CACHE_TTL', self.ttl)
+        app.extensions['catalog_cache'] = self
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, categories=None):
+        """Drop cached pages that may list accounts from ``categories``.
+
+        Pages filtered on another category are kept; unfiltered pages always go.
+        With no categories given the whole cache is cleared.
+        """
+        with self._lock:
+            if categories is None:
+                self._entries.clear()
+            else:
+                affected = {c for c in categories if c}
+                for key in [k for k in self._entries if not k[1] or k[1] in affected]:
+                    del self._entries[key]
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,14 @@
+"""
+The tests use the app's configured database; importing the app no longer
+creates it, so do what ``flask init-db`` does once per test session.
+"""
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def database():
+    from app import app
+    from init_db import init_database
+
+    with app.app_context():
+        init_database()
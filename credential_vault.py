@@ -0,0 +1,98 @@
+"""
+Batched, request-scoped decryption of stored game credentials.
+
+Pages that show credentials for many accounts (order delivery, admin review)
+call ``decrypt_many()`` once with all accounts instead of decrypting two
+fields per account from the template. Each ciphertext is decrypted at most
+once per request: results are memoized on ``flask.g`` and therefore dropped
+when the request ends, never shared across requests.
+
+Every batch is timed; totals are kept per process in ``stats()`` and the
+time spent in the current request is available as ``request_time()``.
+"""
+import threading
+import time
+
+from flask import current_app, g, has_app_context
+
+DECRYPT_ERROR = '[Lỗi giải mã]'
+
+_lock = threading.Lock()
+_stats = {'batches': 0, 'decrypted': 0, 'memo_hits': 0, 'errors': 0, 'seconds': 0.0}
+
+
+class Credentials:
+    def __init__(self, username, password):
+        self.username = username
+        self.password = password
+
+    def __repr__(self):
+        return '<Credentials ***>'
+
+
+def _memo():
+    if not has_app_context():
+        return {}
+    if '_credential_memo' not in g:
+        g._credential_memo = {}
+        g._credential_seconds = 0.0
+    return g._credential_memo
+
+
+def _decrypt(token):
+    from extensions import cipher_suite
+
+    try:
+        return cipher_suite.decrypt(token.encode()).decode(), False
+    except Exception:
+        return DECRYPT_ERROR, True
+
+
+def decrypt_tokens(tokens):
+    """Decrypt ciphertexts, reusing results already decrypted in this request"""
+    memo = _memo()
+    pending = {token for token in tokens if token and token not in memo}
+    hits = sum(1 for token in tokens if token in memo)
+
+    start = time.perf_counter()
+    errors = 0
+    for token in pending:
+        memo[token], failed = _decrypt(token)
+        errors += failed
+    elapsed = time.perf_counter() - start
+
+    if has_app_context():
+        g._credential_seconds = g.get('_credential_seconds', 0.0) + elapsed
+        if pending:
+            current_app.logger.debug('Decrypted %d credential fields in %.2f ms', len(pending), elapsed * 1000)
+    with _lock:
+        _stats['batches'] += 1
+        _stats['decrypted'] += len(pending)
+        _stats['memo_hits'] += hits
+        _stats['errors'] += errors
+        _stats['seconds'] += elapsed
+    return {token: memo.get(token, DECRYPT_ERROR) for token in tokens}
+
+
+def decrypt_many(accounts):
+    """Return {account id: Credentials} for the given GameAccounts in one batch"""
+    tokens = []
+    for account in accounts:
+        tokens.append(account.account_username)
+        tokens.append(account.account_password)
+    plain = decrypt_tokens(tokens)
+    return {
+        account.id: Credentials(plain.get(account.account_username, DECRYPT_ERROR),
+                                plain.get(account.account_password, DECRYPT_ERROR))
+        for account in accounts
+    }
+
+
+def request_time():
+    """Seconds spent decrypting credentials in the current request"""
+    return g.get('_credential_seconds', 0.0) if has_app_context() else 0.0
+
+
+def stats():
+    with _lock:
+        return dict(_stats)
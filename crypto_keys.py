@@ -0,0 +1,57 @@
+"""
+Encryption keyring for stored game credentials.
+
+Keys come from ``ENCRYPTION_KEYS`` (comma separated, newest first) or the
+single legacy ``ENCRYPTION_KEY``. The first key encrypts; every key can
+decrypt, so a new key can be put in front and old rows re-encrypted online
+with ``flask credentials rotate`` before the old key is removed.
+
+Without any configured key a development key is created once in
+``ENCRYPTION_KEY_FILE`` and shared by all workers on the machine, instead of
+each process generating its own and being unable to read the others' rows.
+"""
+import hashlib
+import os
+
+from cryptography.fernet import Fernet, MultiFernet
+
+DEFAULT_KEY_FILE = os.path.join('instance', 'encryption.key')
+
+
+def _read_or_create_key_file(path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    try:
+        # O_EXCL: when several workers boot at once only one writes the key
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, 'rb') as key_file:
+            return key_file.read().strip()
+    key = Fernet.generate_key()
+    with os.fdopen(fd, 'wb') as key_file:
+        key_file.write(key)
+    print(f"⚠️ ENCRYPTION_KEY is not set, generated a development key in {path}")
+    return key
+
+
+def load_keys(environ=os.environ):
+    """Return the configured Fernet keys, primary (encrypting) key first"""
+    raw = environ.get('ENCRYPTION_KEYS') or environ.get('ENCRYPTION_KEY') or ''
+    keys = [key.strip().encode() for key in raw.split(',') if key.strip()]
+    if not keys:
+        keys = [_read_or_create_key_file(environ.get('ENCRYPTION_KEY_FILE', DEFAULT_KEY_FILE))]
+    return keys
+
+
+def build_cipher(keys):
+    return MultiFernet([Fernet(key) for key in keys])
+
+
+def encrypt_many(key, values):
+    """Encrypt strings with one key; module level so process pools can run it"""
+    fernet = Fernet(key)
+    return [fernet.encrypt(value.encode()).decode() for value in values]
+
+
+def fingerprint(key):
+    """Short, non-secret identifier of a key for logs and checkpoints"""
+    return hashlib.sha256(key).hexdigest()[:12]
@@ -0,0 +1,182 @@
+"""
+Materialized counters for the admin dashboard.
+
+Instead of aggregating orders and game_accounts on every dashboard view,
+the totals live in the stats_counters table:
+
+* ``revenue``: sum of ``total_amount`` over completed orders
+* ``accounts_total`` / ``accounts_sold``
+* ``orders_<status>``: orders per status
+
+A ``before_flush`` hook turns every ORM insert, update and delete of an
+Order or GameAccount into counter deltas, applied on the same connection,
+so they commit or roll back with the change itself. Bulk ``UPDATE``
+statements bypass the ORM and must call ``apply()`` themselves (see
+reservations.release_expired).
+
+The counters are built from scratch when the table is empty, and can be
+checked and repaired at any time:
+
+    flask stats reconcile [--dry-run]
+"""
+from collections import Counter
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect
+
+stats_cli = AppGroup('stats', help='Dashboard counters.')
+
+BASE_COUNTERS = ('revenue', 'accounts_total', 'accounts_sold', 'orders_pending')
+
+
+def flush_value(obj, attr, old):
+    """Current value of ``attr``, or its value before this flush if ``old``"""
+    if not old:
+        return getattr(obj, attr)
+    state = inspect(obj)
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    if history.added and state.has_identity:
+        # Assigned while expired (e.g. after a commit): the old value was never loaded
+        table = obj.__table__
+        return state.session.connection().execute(
+            table.select().with_only_columns(table.c[attr]).where(table.c.id == state.identity[0])
+        ).scalar()
+    return getattr(obj, attr)
+
+
+def contributions(obj, old=False):
+    """Counter values one Order or GameAccount adds to the totals"""
+    from models import GameAccount, Order
+
+    if isinstance(obj, GameAccount):
+        return {'accounts_total': 1, 'accounts_sold': 1 if flush_value(obj, 'is_sold', old) else 0}
+    if isinstance(obj, Order):
+        status = flush_value(obj, 'status', old) or 'pending'
+        values = {f'orders_{status}': 1}
+        if status == 'completed':
+            values['revenue'] = flush_value(obj, 'total_amount', old) or 0
+        return values
+    return {}
+
+
+class DashboardStats:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from extensions import db
+
+        if not event.contains(db.session, 'before_flush', self._before_flush):
+            event.listen(db.session, 'before_flush', self._before_flush)
+        app.extensions['dashboard_stats'] = self
+
+    def _before_flush(self, session, flush_context, instances):
+        deltas = Counter()
+        for obj in session.new:
+            deltas.update(contributions(obj))
+        for obj in session.deleted:
+            deltas.subtract(contributions(obj, old=True))
+        for obj in session.dirty:
+            if session.is_modified(obj, include_collections=False):
+                deltas.update(contributions(obj))
+                deltas.subtract(contributions(obj, old=True))
+        if any(deltas.values()):
+            self.apply(deltas, session.connection())
+
+    def apply(self, deltas, connection=None):
+        """Add ``deltas`` ({counter: change}) inside the current transaction"""
+        from extensions import db
+        from models import StatsCounter
+
+        table = StatsCounter.__table__
+        connection = connection or db.session.connection()
+        for name, delta in deltas.items():
+            if not delta:
+                continue
+            updated = connection.execute(
+                table.update().where(table.c.name == name).values(value=table.c.value + delta)
+            ).rowcount
+            if updated:
+                continue
+            # Before the first rebuild there is nothing to add to; rebuild() counts this row later
+            initialized = connection.execute(
+                db.select(table.c.name).where(table.c.name == 'accounts_total')
+            ).first()
+            if initialized:
+                connection.execute(table.insert().values(name=name, value=delta))
+
+    def compute(self):
+        """Counter values aggregated from orders and game_accounts"""
+        from extensions import db
+        from models import GameAccount, Order
+
+        values = dict.fromkeys(BASE_COUNTERS, 0)
+        values['accounts_total'] = db.session.execute(db.select(db.func.count(GameAccount.id))).scalar()
+        values['accounts_sold'] = db.session.execute(
+            db.select(db.func.count(GameAccount.id)).where(GameAccount.is_sold.is_(True))
+        ).scalar()
+        values['revenue'] = db.session.execute(
+            db.select(db.func.coalesce(db.func.sum(Order.total_amount), 0)).where(Order.status == 'completed')
+        ).scalar()
+        for status, count in db.session.execute(db.select(Order.status, db.func.count()).group_by(Order.status)):
+            values[f'orders_{status or "pending"}'] = values.get(f'orders_{status or "pending"}', 0) + count
+        return values
+
+    def rebuild(self, dry_run=False):
+        """Recompute every counter; returns {counter: (stored, actual)} for those that drifted"""
+        from extensions import db
+        from models import StatsCounter
+
+        # Lock the counters first so concurrent writers wait and are included in the aggregates
+        stored = {row.name: row.value for row in db.session.execute(
+            db.select(StatsCounter).with_for_update()).scalars()}
+        actual = self.compute()
+        for name in stored:
+            actual.setdefault(name, 0)
+
+        drift = {name: (stored.get(name), value) for name, value in actual.items()
+                 if stored.get(name) is None or round(stored[name] - value, 2) != 0}
+        if dry_run:
+            db.session.rollback()
+            return drift
+        for name, value in actual.items():
+            if name in stored:
+                db.session.execute(db.update(StatsCounter).where(StatsCounter.name == name).values(value=value))
+            else:
+                db.session.add(StatsCounter(name=name, value=value))
+        db.session.commit()
+        return drift
+
+    def counters(self):
+        """All counters in one query, building them first if the table is empty"""
+        from extensions import db
+        from models import StatsCounter
+
+        values = dict(db.session.execute(db.select(StatsCounter.name, StatsCounter.value)).all())
+        if 'accounts_total' not in values:
+            self.rebuild()
+            values = dict(db.session.execute(db.select(StatsCounter.name, StatsCounter.value)).all())
+        for name in BASE_COUNTERS:
+            values.setdefault(name, 0)
+        return values
+
+
+@stats_cli.command('reconcile')
+@click.option('--dry-run', is_flag=True, help='Report drift without fixing it.')
+def reconcile_command(dry_run):
+    """Rebuild dashboard counters from orders and accounts and report drift."""
+    from extensions import dashboard_stats
+
+    drift = dashboard_stats.rebuild(dry_run=dry_run)
+    if not drift:
+        click.echo("✅ Counters match the database")
+        return
+    for name, (stored, actual) in sorted(drift.items()):
+        click.echo(f"⚠️ {name}: stored {stored}, actual {actual}")
+    click.echo("ℹ️ Dry run, nothing changed" if dry_run else f"✅ Repaired {len(drift)} counters")
@@ -5,6 +5,7 @@ Deployment script for production environment
 import os
 import sys
 from app import app, db
+from init_db import create_schema
 from models import User
 
 def check_database():
@@ -14,7 +15,7 @@ def check_database():
             print(f"Database URL: {app.config['SQLALCHEMY_DATABASE_URI'][:50]}...")
             
             # Create tables if they don't exist
-            db.create_all()
+            create_schema()
             print("✅ Database tables created/verified")
             
             # Try to query users table
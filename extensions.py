@@ -2,13 +2,39 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
-from cryptography.fernet import Fernet
-import os
+from catalog_cache import CatalogCache
+from facets import CatalogFacets
+from search import SearchIndex
+from audit_writer import AuditWriter
+from user_cache import UserCache
+from password_hasher import PasswordHasher
+from image_pipeline import ImagePipeline
+from upload_storage import UploadStorage
+from static_assets import StaticAssets
+from dashboard_stats import DashboardStats
+from sales_rollups import SalesRollups
+from query_profiler import QueryProfiler
+from metrics import Metrics
+from crypto_keys import load_keys, build_cipher
 
 db = SQLAlchemy()
 login_manager = LoginManager()
 migrate = Migrate()
 csrf = CSRFProtect()
+catalog_cache = CatalogCache()
+catalog_facets = CatalogFacets()
+search_index = SearchIndex()
+audit_writer = AuditWriter()
+user_cache = UserCache()
+password_hasher = PasswordHasher()
+image_pipeline = ImagePipeline()
+upload_storage = UploadStorage()
+static_assets = StaticAssets()
+dashboard_stats = DashboardStats()
+sales_rollups = SalesRollups()
+query_profiler = QueryProfiler()
+metrics = Metrics()
 
-encryption_key = os.environ.get('ENCRYPTION_KEY', Fernet.generate_key())
-cipher_suite = Fernet(encryption_key)
+encryption_keys = load_keys()
+encryption_key = encryption_keys[0]
+cipher_suite = build_cipher(encryption_keys)
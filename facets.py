@@ -0,0 +1,124 @@
+"""
+In-memory filter facets for the storefront.
+
+Keeps counts of unsold accounts per (category, rank, price bucket) so the
+index() dropdowns can show live counts without aggregating on every request.
+Counts are loaded once with a single GROUP BY and then adjusted incrementally
+by the routes that create, edit, sell or delete accounts.
+"""
+import threading
+import time
+from collections import Counter
+
+PRICE_BUCKETS = [
+    (0, 200000, 'Dưới 200K'),
+    (200000, 500000, '200K - 500K'),
+    (500000, 1000000, '500K - 1 triệu'),
+    (1000000, 2000000, '1 - 2 triệu'),
+    (2000000, None, 'Trên 2 triệu'),
+]
+
+
+def price_bucket(price):
+    for index, (low, high, _label) in enumerate(PRICE_BUCKETS):
+        if price >= low and (high is None or price < high):
+            return index
+    return 0
+
+
+def facet_key(account):
+    """The facet cell an unsold account counts towards, or None if it is sold"""
+    if account.is_sold:
+        return None
+    return (account.category, account.rank or '', price_bucket(account.price or 0))
+
+
+class CatalogFacets:
+    def __init__(self, app=None, ttl=300):
+        self.ttl = ttl
+        self._counts = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.setdefault('CATALOG_FACETS_TTL', self.ttl)
+        app.extensions['catalog_facets'] = self
+
+    def _load(self):
+        from extensions import db
+        from models import GameAccount
+
+        bucket = db.case(
+            *[(GameAccount.price < high, index) for index, (_low, high, _label) in enumerate(PRICE_BUCKETS) if high],
+            else_=len(PRICE_BUCKETS) - 1,
+        )
+        rows = db.session.query(
+            GameAccount.category, GameAccount.rank, bucket, db.func.count(GameAccount.id)
+        ).filter(GameAccount.is_sold.is_(False)).group_by(GameAccount.category, GameAccount.rank, bucket).all()
+
+        counts = Counter()
+        for category, rank, bucket_index, count in rows:
+            counts[(category, rank or '', bucket_index)] += count
+        return counts
+
+    def _snapshot(self):
+        """A copy of the counts, safe to iterate while update() runs in other threads"""
+        with self._lock:
+            if self._counts is not None and not (self.ttl and time.monotonic() - self._loaded_at > self.ttl):
+                return Counter(self._counts)
+        counts = self._load()
+        with self._lock:
+            self._counts = counts
+            self._loaded_at = time.monotonic()
+            return Counter(counts)
+
+    def update(self, old_key, new_key):
+        """Move one account between facet cells; either key may be None"""
+        if old_key == new_key:
+            return
+        with self._lock:
+            if self._counts is None:
+                return
+            if old_key is not None:
+                self._counts[old_key] -= 1
+                if self._counts[old_key] <= 0:
+                    del self._counts[old_key]
+            if new_key is not None:
+                self._counts[new_key] += 1
+
+    def add(self, account):
+        self.update(None, facet_key(account))
+
+    def remove(self, key):
+        self.update(key, None)
+
+    def invalidate(self):
+        with self._lock:
+            self._counts = None
+
+    def _totals(self, position):
+        totals = Counter()
+        for key, count in self._snapshot().items():
+            totals[key[position]] += count
+        return totals
+
+    def categories(self):
+        """[(category, count)] sorted by name"""
+        return sorted(self._totals(0).items())
+
+    def ranks(self):
+        """[(rank, count)] sorted by name, accounts without a rank excluded"""
+        return sorted((rank, count) for rank, count in self._totals(1).items() if rank)
+
+    def price_buckets(self):
+        """[{'min_price', 'max_price', 'label', 'count'}] in bucket order.
+
+        ``max_price`` is inclusive, matching the index() price filter.
+        """
+        totals = self._totals(2)
+        return [
+            {'min_price': low, 'max_price': high - 1 if high else None, 'label': label, 'count': totals.get(index, 0)}
+            for index, (low, high, label) in enumerate(PRICE_BUCKETS)
+        ]
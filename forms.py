@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileAllowed, MultipleFileField
+from flask_wtf.file import FileField, FileAllowed, FileRequired, MultipleFileField
 from wtforms import StringField, PasswordField, BooleanField, TextAreaField, FloatField, SelectField
 from wtforms.validators import DataRequired, Email, EqualTo, ValidationError, Length, NumberRange
 from models import User
@@ -53,6 +53,10 @@ class AccountForm(FlaskForm):
     internal_notes = TextAreaField('Ghi chú nội bộ')
     images = MultipleFileField('Hình ảnh tài khoản', validators=[FileAllowed(['jpg', 'jpeg', 'png', 'gif', 'webp'], 'Chỉ chấp nhận file ảnh!')])
 
+class AccountImportForm(FlaskForm):
+    file = FileField('Tệp CSV/JSONL', validators=[FileRequired(), FileAllowed(['csv', 'jsonl', 'ndjson'], 'Chỉ chấp nhận tệp .csv, .jsonl hoặc .ndjson!')])
+    restart = BooleanField('Nhập lại toàn bộ tệp (kể cả khi đã nhập xong trước đó)')
+
 class PaymentSettingsForm(FlaskForm):
     bank_id = StringField('Mã ngân hàng (BIN)', validators=[DataRequired(), Length(max=20)])
     bank_name = StringField('Tên ngân hàng', validators=[DataRequired(), Length(max=100)])
@@ -0,0 +1,52 @@
+"""
+gunicorn settings (loaded automatically from the working directory).
+
+Worker class, worker/thread counts and the database pool come from
+server_profile.py; see its docstring for the environment variables.
+"""
+import os
+import shutil
+import tempfile
+
+# Workers write metrics here and /metrics sums them (see metrics.py); set before the app imports prometheus_client
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'shop-metrics'))
+
+from prometheus_client import multiprocess
+from server_profile import check_connection_limit, database_connection_limit, load_profile
+
+profile = load_profile()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+worker_class = profile.worker_class
+workers = profile.workers
+threads = profile.threads
+worker_connections = profile.worker_connections
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):
+    # Values left by a previous run would be added to this one's
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'])
+    server.log.info("Server profile: %s", profile._asdict())
+    warning = check_connection_limit(profile, database_connection_limit(os.environ.get('DATABASE_URL')))
+    if warning:
+        print(warning)
+
+
+def post_fork(server, worker):
+    if profile.worker_class != 'gevent':
+        return
+    # psycopg2 blocks the whole gevent worker unless it is told to yield
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        print("⚠️ gevent workers without psycogreen: every database query blocks the worker")
+        return
+    patch_psycopg()
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
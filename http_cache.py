@@ -0,0 +1,71 @@
+"""
+Conditional GET for the catalog and account detail pages.
+
+Routes build a validator from the data the page is rendered from (account
+ids, ``updated_at``, image variants, facet counts) and pass a render
+callback to ``conditional_response()``. A matching ``If-None-Match`` is
+answered with 304 before any template is rendered.
+
+Anonymous pages are byte-for-byte identical for the same data, so they get
+a strong ETag and ``Cache-Control: public`` with ``s-maxage`` for a reverse
+proxy. ``Vary: Cookie`` keeps a proxy from serving them to signed-in users.
+Signed-in pages include the user's own state in the validator and are
+``private``. Their ETag is weak, because the embedded CSRF token is
+re-signed on every render. The validator also changes every half CSRF
+lifetime, so a revalidated page never carries an expired token.
+
+Responses that would show flashed messages are never answered with 304.
+"""
+import hashlib
+import time
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+PUBLIC_CACHE = 'public, max-age=0, s-maxage={s_maxage}, must-revalidate'
+PRIVATE_CACHE = 'private, no-cache'
+
+
+def fingerprint(*parts):
+    """Stable hash of the values a response is rendered from"""
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+
+def account_validator(account):
+    """What a rendered account card/detail depends on (attach() variants first)"""
+    variants = getattr(account, 'image_variants', {})
+    return (account.id, account.updated_at, account.is_sold,
+            tuple(variant['path'] for image in account.get_images() for variant in variants.get(image, [])))
+
+
+def user_state():
+    """The parts of the current user that base.html renders"""
+    if not current_user.is_authenticated:
+        return None
+    lifetime = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    csrf_window = int(time.time() // (lifetime / 2)) if lifetime else 0
+    return (current_user.id, current_user.username, current_user.full_name, current_user.email,
+            current_user.role, current_user.is_admin, csrf_window)
+
+
+def conditional_response(validator, render):
+    """Return 304 if the client's ETag matches ``validator``, else ``render()``'s response"""
+    if session.get('_flashes'):
+        return render()
+
+    state = user_state()
+    weak = state is not None
+    etag = fingerprint(validator, state)
+    if state is None:
+        cache_control = PUBLIC_CACHE.format(s_maxage=current_app.config.get('HTTP_CACHE_SHARED_MAX_AGE', 30))
+    else:
+        cache_control = PRIVATE_CACHE
+
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag, weak=weak)
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Cookie')
+    return response
@@ -0,0 +1,241 @@
+"""
+Thumbnails and WebP/AVIF variants for uploaded account images.
+
+Uploads are stored through upload_storage. After the account is committed,
+the route hands the new paths to ``image_pipeline.submit()``, which renders
+fixed-width variants on a background thread and records them in the
+image_variants table. Templates ask ``attach()`` for the variants of
+the accounts they show and emit them through the ``responsive_image`` macro
+as ``<picture>``/``srcset``, falling back to the original until the variants
+exist.
+
+Existing uploads:
+    flask images backfill [--force] [--workers 2]
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask.cli import AppGroup
+
+VARIANT_DIR = 'variants'
+EXTENSIONS = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg'}
+SAVE_OPTIONS = {'jpeg': {'optimize': True, 'progressive': True}, 'webp': {'method': 4}, 'avif': {}}
+
+images_cli = AppGroup('images', help='Account image variants.')
+
+
+def variant_path(source, width, fmt):
+    """Static-relative path of a variant, next to the original upload"""
+    directory, filename = os.path.split(source)
+    stem = os.path.splitext(filename)[0]
+    return f"{directory}/{VARIANT_DIR}/{stem}-{width}w.{EXTENSIONS[fmt]}"
+
+
+def render_variants(static_folder, source, widths, formats, quality=70):
+    """Write the variants of one image and return their metadata.
+
+    Only widths narrower than the original are produced; an image smaller than
+    every width still gets one re-encoded copy at its own size. Variants that
+    are not smaller than the original file are discarded.
+    """
+    from PIL import Image, ImageOps, features
+
+    original_size = os.path.getsize(os.path.join(static_folder, source))
+    with Image.open(os.path.join(static_folder, source)) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+    has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    targets = [width for width in sorted(widths) if width < image.width] or [image.width]
+    formats = [fmt for fmt in formats if fmt == 'jpeg' or features.check(fmt)]
+    os.makedirs(os.path.join(static_folder, os.path.dirname(variant_path(source, 0, 'jpeg'))), exist_ok=True)
+
+    variants = []
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in formats:
+            frame = resized.convert('RGB') if fmt == 'jpeg' and has_alpha else resized
+            path = variant_path(source, width, fmt)
+            target = os.path.join(static_folder, path)
+            frame.save(target, fmt.upper(), quality=quality, **SAVE_OPTIONS[fmt])
+            size = os.path.getsize(target)
+            if size >= original_size:
+                os.remove(target)
+                continue
+            variants.append({'width': width, 'height': height, 'format': fmt, 'path': path, 'size': size})
+    return variants
+
+
+class ImagePipeline:
+    def __init__(self, app=None):
+        self.app = None
+        self.widths = (320, 640, 1280)
+        self.formats = ('avif', 'webp', 'jpeg')
+        self.quality = 70
+        self.workers = 1
+        self.run_async = True
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.variants_written = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.widths = tuple(app.config.setdefault('IMAGE_VARIANT_WIDTHS', self.widths))
+        self.formats = tuple(app.config.setdefault('IMAGE_VARIANT_FORMATS', self.formats))
+        self.quality = app.config.setdefault('IMAGE_VARIANT_QUALITY', self.quality)
+        self.workers = app.config.setdefault('IMAGE_PIPELINE_WORKERS', self.workers)
+        self.run_async = app.config.setdefault('IMAGE_PIPELINE_ASYNC', self.run_async)
+        app.extensions['image_pipeline'] = self
+
+    def _pool(self):
+        # Threads do not survive fork(), so each gunicorn worker starts its own
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='image-pipeline')
+                self._pid = os.getpid()
+        return self._executor
+
+    def render(self, source):
+        from extensions import upload_storage
+
+        with upload_storage.local_root([source]) as root:
+            variants = render_variants(root, source, self.widths, self.formats, self.quality)
+            upload_storage.publish(root, [variant['path'] for variant in variants])
+        return variants
+
+    def submit(self, account_id, sources):
+        """Render variants for newly uploaded images of an account (after commit)"""
+        sources = [source for source in sources if source]
+        if not sources:
+            return
+        with self._lock:
+            self.submitted += len(sources)
+        if not self.run_async:
+            self.process(account_id, sources)
+            return
+        self._pool().submit(self._run_job, account_id, sources)
+
+    def _run_job(self, account_id, sources):
+        with self.app.app_context():
+            try:
+                self.process(account_id, sources)
+            except Exception as e:
+                print(f"⚠️ Image pipeline failed for account {account_id}: {e}")
+            finally:
+                from extensions import db
+                db.session.remove()
+
+    def process(self, account_id, sources):
+        from extensions import db, catalog_cache
+        from models import GameAccount
+
+        for source in sources:
+            try:
+                variants = self.render(source)
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                print(f"⚠️ Could not render variants of {source}: {e}")
+                continue
+            self.store(source, variants)
+        db.session.commit()
+
+        account = db.session.get(GameAccount, account_id)
+        if account is not None:
+            catalog_cache.invalidate({account.category})
+
+    def store(self, source, variants):
+        """Replace the recorded variants of ``source``; the caller commits"""
+        from extensions import db
+        from models import ImageVariant
+
+        db.session.execute(db.delete(ImageVariant).where(ImageVariant.source == source))
+        db.session.add_all(ImageVariant(source=source, **variant) for variant in variants)
+        with self._lock:
+            self.processed += 1
+            self.variants_written += len(variants)
+
+    def variants_for(self, sources):
+        """Return {source: [variant dict, ...]} ordered by width, in one query"""
+        from extensions import db
+        from models import ImageVariant
+
+        found = {}
+        sources = set(sources)
+        if not sources:
+            return found
+        rows = db.session.execute(
+            db.select(ImageVariant.source, ImageVariant.width, ImageVariant.format, ImageVariant.path)
+            .where(ImageVariant.source.in_(sources))
+            .order_by(ImageVariant.source, ImageVariant.width)
+        ).all()
+        for row in rows:
+            found.setdefault(row.source, []).append(
+                {'width': row.width, 'format': row.format, 'path': row.path})
+        return found
+
+    def attach(self, accounts):
+        """Set ``image_variants`` ({image: [variants]}) on accounts or catalog items"""
+        found = self.variants_for(image for account in accounts for image in account.get_images())
+        for account in accounts:
+            account.image_variants = {image: found.get(image, []) for image in account.get_images()}
+        return accounts
+
+    def stats(self):
+        with self._lock:
+            return {
+                'widths': list(self.widths),
+                'formats': list(self.formats),
+                'submitted': self.submitted,
+                'processed': self.processed,
+                'failed': self.failed,
+                'variants_written': self.variants_written,
+            }
+
+
+@images_cli.command('backfill')
+@click.option('--force', is_flag=True, help='Re-render images that already have variants.')
+@click.option('--workers', type=int, default=2, help='Images rendered in parallel.')
+def backfill_command(force, workers):
+    """Render variants for uploads made before the pipeline existed."""
+    from extensions import db, image_pipeline, catalog_cache, upload_storage
+    from models import GameAccount
+
+    sources = []
+    for images, in db.session.execute(db.select(GameAccount.images).order_by(GameAccount.id)):
+        sources.extend(image for image in images or [] if image not in sources)
+    if not force:
+        done = image_pipeline.variants_for(sources)
+        sources = [source for source in sources if source not in done]
+    missing = [source for source in sources if not upload_storage.exists(source)]
+    sources = [source for source in sources if source not in missing]
+    for source in missing:
+        click.echo(f"⚠️ Missing file, skipped: {source}", err=True)
+    click.echo(f"🖼️ Rendering variants for {len(sources)} images")
+
+    rendered = failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {source: executor.submit(image_pipeline.render, source) for source in sources}
+        for source, future in futures.items():
+            try:
+                image_pipeline.store(source, future.result())
+                db.session.commit()
+                rendered += 1
+            except Exception as e:
+                db.session.rollback()
+                failed += 1
+                click.echo(f"⚠️ {source}: {e}", err=True)
+    catalog_cache.invalidate()
+    click.echo(f"✅ Backfill finished: {rendered} rendered, {failed} failed, {len(missing)} missing")
@@ -0,0 +1,129 @@
+"""
+Online, resumable re-encryption of GameAccount credentials.
+
+Put the new key first in ENCRYPTION_KEYS (keeping the old ones after it),
+deploy, then run:
+
+    flask credentials rotate [--batch-size 500] [--sleep 0.05] [--restart]
+
+Rows are processed in primary-key order, one short transaction per batch.
+The last finished id is checkpointed in job_checkpoints together with the
+primary key fingerprint, so an interrupted run resumes where it stopped and a
+rotation to a different key starts over. Each row is updated only if its
+ciphertext is unchanged since it was read, so concurrent admin edits (which
+already use the new key) are never overwritten. Once the job reports zero
+failures the old keys can be removed.
+"""
+import time
+
+import click
+from cryptography.fernet import Fernet, InvalidToken
+from flask.cli import AppGroup
+
+from extensions import db, cipher_suite, encryption_key
+from crypto_keys import fingerprint
+from models import GameAccount, JobCheckpoint
+
+credentials_cli = AppGroup('credentials', help='Stored credential encryption.')
+
+CHECKPOINT_NAME = 'credential_rotation'
+
+
+def _rotate_token(token, primary):
+    """Return the token re-encrypted with the primary key, or None if it already is"""
+    try:
+        primary.decrypt(token.encode())
+        return None
+    except InvalidToken:
+        return cipher_suite.rotate(token.encode()).decode()
+
+
+def rotate_credentials(batch_size=500, sleep=0.0, restart=False, progress=None):
+    """Re-encrypt every account with the primary key; returns the totals"""
+    primary = Fernet(encryption_key)
+    key_id = fingerprint(encryption_key)
+    table = GameAccount.__table__
+
+    checkpoint = JobCheckpoint.load(CHECKPOINT_NAME)
+    if restart or (checkpoint.details or {}).get('key') != key_id:
+        checkpoint.position = 0
+        checkpoint.details = {'key': key_id, 'rotated': 0, 'skipped': 0, 'failed': 0, 'conflicts': 0}
+    db.session.commit()
+
+    totals = dict(checkpoint.details)
+    remaining = db.session.execute(
+        db.select(db.func.count()).select_from(table).where(table.c.id > checkpoint.position)
+    ).scalar()
+    started = time.monotonic()
+    processed = 0
+
+    while True:
+        rows = db.session.execute(
+            db.select(table.c.id, table.c.account_username, table.c.account_password, table.c.updated_at)
+            .where(table.c.id > checkpoint.position).order_by(table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        for row in rows:
+            try:
+                new_username = _rotate_token(row.account_username, primary)
+                new_password = _rotate_token(row.account_password, primary)
+            except InvalidToken:
+                totals['failed'] += 1
+                click.echo(f"⚠️ Account {row.id}: credentials not decryptable with any configured key", err=True)
+                continue
+            if new_username is None and new_password is None:
+                totals['skipped'] += 1
+                continue
+            result = db.session.execute(
+                table.update()
+                .where(table.c.id == row.id,
+                       table.c.account_username == row.account_username,
+                       table.c.account_password == row.account_password)
+                .values(account_username=new_username or row.account_username,
+                        account_password=new_password or row.account_password,
+                        updated_at=row.updated_at)
+            )
+            if result.rowcount:
+                totals['rotated'] += 1
+            else:
+                totals['conflicts'] += 1
+
+        checkpoint.position = rows[-1].id
+        checkpoint.details = dict(totals)
+        db.session.commit()
+
+        processed += len(rows)
+        if progress:
+            elapsed = time.monotonic() - started
+            rate = processed / elapsed if elapsed else 0.0
+            eta = (remaining - processed) / rate if rate else 0.0
+            progress(processed, remaining, rate, eta, totals)
+        if sleep:
+            time.sleep(sleep)
+
+    totals['processed'] = processed
+    return totals
+
+
+@credentials_cli.command('rotate')
+@click.option('--batch-size', type=int, default=500, help='Rows re-encrypted per transaction.')
+@click.option('--sleep', type=float, default=0.0, help='Pause between batches, in seconds.')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint and start from the first row.')
+def rotate_command(batch_size, sleep, restart):
+    """Re-encrypt stored credentials with the primary ENCRYPTION_KEYS key."""
+    def progress(processed, remaining, rate, eta, totals):
+        click.echo(f"{processed}/{remaining} rows, {rate:.0f} rows/s, ETA {eta:.0f}s "
+                   f"(rotated {totals['rotated']}, skipped {totals['skipped']}, "
+                   f"failed {totals['failed']}, conflicts {totals['conflicts']})")
+
+    click.echo(f"🔑 Rotating credentials to key {fingerprint(encryption_key)}")
+    totals = rotate_credentials(batch_size, sleep, restart, progress)
+    click.echo(f"✅ Rotation finished: {totals}")
+
+
+@credentials_cli.command('generate-key')
+def generate_key_command():
+    """Print a new Fernet key to prepend to ENCRYPTION_KEYS."""
+    click.echo(Fernet.generate_key().decode())
@@ -0,0 +1,99 @@
+"""
+Keyset (cursor) pagination for account listings.
+
+Instead of OFFSET + COUNT(*), each page continues from the sort key of the
+last row of the previous page, so deep pages cost the same as the first one.
+One extra row is fetched to answer ``has_next`` without counting.
+"""
+import base64
+import json
+import math
+from datetime import datetime
+
+from extensions import db
+
+SORT_OPTIONS = {
+    'newest': ('created_at', True),
+    'price_asc': ('price', False),
+    'price_desc': ('price', True),
+}
+DEFAULT_SORT = 'newest'
+
+
+def normalize_sort(sort):
+    return sort if sort in SORT_OPTIONS else DEFAULT_SORT
+
+
+def order_by_sort(query, model, sort):
+    """Apply the ORDER BY for ``sort``, with the primary key as tie-breaker"""
+    column_name, descending = SORT_OPTIONS[normalize_sort(sort)]
+    column = getattr(model, column_name)
+    if descending:
+        return query.order_by(column.desc(), model.id.desc())
+    return query.order_by(column.asc(), model.id.asc())
+
+
+def encode_cursor(value, row_id):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """Return (value, id) from a cursor, or None if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+        if SORT_OPTIONS[normalize_sort(sort)][0] == 'created_at':
+            value = datetime.fromisoformat(value)
+        else:
+            # A crafted cursor must not reach the Float comparison as a string
+            value = float(value)
+            if not math.isfinite(value):
+                raise ValueError(value)
+        return value, int(row_id)
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+class KeysetPage:
+    is_keyset = True
+
+    def __init__(self, items, per_page, sort, cursor, has_next, next_cursor):
+        self.items = items
+        self.per_page = per_page
+        self.sort = sort
+        self.cursor = cursor
+        self.has_next = has_next
+        self.next_cursor = next_cursor
+
+    @property
+    def has_prev(self):
+        return bool(self.cursor)
+
+    def __iter__(self):
+        yield from self.items
+
+
+def keyset_paginate(query, model, sort=DEFAULT_SORT, cursor=None, per_page=12):
+    sort = normalize_sort(sort)
+    column_name, descending = SORT_OPTIONS[sort]
+    column = getattr(model, column_name)
+
+    position = decode_cursor(cursor, sort) if cursor else None
+    if position is not None:
+        value, row_id = position
+        if descending:
+            query = query.filter(db.or_(column < value, db.and_(column == value, model.id < row_id)))
+        else:
+            query = query.filter(db.or_(column > value, db.and_(column == value, model.id > row_id)))
+
+    rows = order_by_sort(query, model, sort).limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    items = rows[:per_page]
+    next_cursor = None
+    if has_next:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, column_name), last.id)
+    return KeysetPage(items, per_page, sort, cursor if position else None, has_next, next_cursor)
@@ -0,0 +1,137 @@
+"""
+Prometheus metrics at /metrics.
+
+* ``shop_request_duration_seconds{endpoint,method,status}``: latency histogram
+* ``shop_requests_in_flight``
+* ``shop_db_pool_connections{state}``: SQLAlchemy pool size, checked out,
+  checked in and overflow
+* ``shop_audit_queue_depth``: audit log rows waiting for the writer thread
+* ``shop_cache_lookups{cache,result}`` and ``shop_cache_hit_ratio{cache}``
+  for the catalog and user caches
+
+Under gunicorn every worker writes its values to files in
+``PROMETHEUS_MULTIPROC_DIR`` (set and emptied by gunicorn.conf.py), and a
+scrape of any worker returns the sum over all live workers. The variable
+must be set before prometheus_client is imported. Without it the metrics
+only cover the current process.
+
+Gauges read from other objects (pool, audit queue, caches) are refreshed
+by each worker at most every ``METRICS_REFRESH_SECONDS`` while it serves
+requests, and always by the worker answering the scrape. If
+``METRICS_TOKEN`` is set, /metrics requires ``Authorization: Bearer <token>``.
+"""
+import os
+import time
+
+from flask import g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from prometheus_client.core import GaugeMetricFamily
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram('shop_request_duration_seconds', 'Request latency',
+                            ['endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS)
+IN_FLIGHT = Gauge('shop_requests_in_flight', 'Requests being handled', multiprocess_mode='livesum')
+POOL_CONNECTIONS = Gauge('shop_db_pool_connections', 'SQLAlchemy connection pool', ['state'],
+                         multiprocess_mode='livesum')
+AUDIT_QUEUE = Gauge('shop_audit_queue_depth', 'Audit log rows waiting to be written', multiprocess_mode='livesum')
+CACHE_LOOKUPS = Gauge('shop_cache_lookups', 'Cache lookups since worker start', ['cache', 'result'],
+                      multiprocess_mode='livesum')
+
+
+class _HitRatios:
+    """Hit ratio per cache, from the lookups already summed over workers"""
+
+    def __init__(self, source):
+        self.source = source
+
+    def collect(self):
+        lookups = {}
+        for metric in self.source.collect():
+            if metric.name != 'shop_cache_lookups':
+                continue
+            for sample in metric.samples:
+                counts = lookups.setdefault(sample.labels['cache'], {'hit': 0, 'miss': 0})
+                counts[sample.labels['result']] += sample.value
+        ratio = GaugeMetricFamily('shop_cache_hit_ratio', 'Cache hits / lookups', labels=['cache'])
+        for cache, counts in sorted(lookups.items()):
+            total = counts['hit'] + counts['miss']
+            ratio.add_metric([cache], counts['hit'] / total if total else 0.0)
+        yield ratio
+
+
+class Metrics:
+    def __init__(self, app=None):
+        self.enabled = True
+        self.refresh_seconds = 5
+        self.token = None
+        self._refreshed_at = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.setdefault('METRICS_ENABLED', self.enabled)
+        self.refresh_seconds = app.config.setdefault('METRICS_REFRESH_SECONDS', self.refresh_seconds)
+        self.token = app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))
+        if self.enabled:
+            app.before_request(self._start)
+            app.after_request(self._finish)
+            app.teardown_request(self._teardown)
+        app.extensions['metrics'] = self
+
+    def _start(self):
+        g.metrics_started = time.perf_counter()
+        IN_FLIGHT.inc()
+
+    def _observe(self, status):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        IN_FLIGHT.dec()
+        REQUEST_LATENCY.labels(request.endpoint or 'unmatched', request.method, str(status)).observe(
+            time.perf_counter() - started)
+
+    def _finish(self, response):
+        self._observe(response.status_code)
+        if time.monotonic() - self._refreshed_at >= self.refresh_seconds:
+            self.refresh()
+        return response
+
+    def _teardown(self, exc):
+        # after_request is skipped when the view raised
+        self._observe(500)
+
+    def refresh(self):
+        """Copy this worker's pool, audit queue and cache counters into the gauges"""
+        from extensions import audit_writer, catalog_cache, db, user_cache
+
+        self._refreshed_at = time.monotonic()
+        pool = db.engine.pool
+        for state, method in (('size', 'size'), ('checked_out', 'checkedout'),
+                              ('checked_in', 'checkedin'), ('overflow', 'overflow')):
+            if hasattr(pool, method):
+                POOL_CONNECTIONS.labels(state).set(max(getattr(pool, method)(), 0))
+        AUDIT_QUEUE.set(audit_writer.stats()['queue_depth'])
+        for name, cache in (('catalog', catalog_cache), ('user', user_cache)):
+            stats = cache.stats()
+            CACHE_LOOKUPS.labels(name, 'hit').set(stats['hits'])
+            CACHE_LOOKUPS.labels(name, 'miss').set(stats['misses'])
+
+    def registry(self):
+        if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            return REGISTRY
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+
+    def authorized(self, authorization):
+        return not self.token or authorization == f'Bearer {self.token}'
+
+    def export(self):
+        """The exposition text and its content type"""
+        self.refresh()
+        registry = self.registry()
+        ratios = CollectorRegistry()
+        ratios.register(_HitRatios(registry))
+        return generate_latest(registry) + generate_latest(ratios), CONTENT_TYPE_LATEST
@@ -1,8 +1,14 @@
-from extensions import db, cipher_suite
+from extensions import db, audit_writer, password_hasher
+from audit_writer import SYNC_ACTIONS
+from credential_vault import decrypt_tokens
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
+ROLE_HIERARCHY = {'user': 0, 'support': 1, 'admin': 2, 'superadmin': 3}
+
+def role_allows(role, required_role):
+    return ROLE_HIERARCHY.get(role, 0) >= ROLE_HIERARCHY.get(required_role, 0)
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
     
@@ -23,16 +29,19 @@ class User(UserMixin, db.Model):
     wishlist_items = db.relationship('Wishlist', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify the password, upgrading an outdated hash in place (caller commits)"""
+        if not password_hasher.verify(self.password_hash, password):
+            return False
+        if password_hasher.needs_rehash(self.password_hash):
+            self.password_hash = password_hasher.hash(password)
+            password_hasher.record_rehash()
+        return True
     
     def has_permission(self, required_role):
-        role_hierarchy = {'user': 0, 'support': 1, 'admin': 2, 'superadmin': 3}
-        user_level = role_hierarchy.get(self.role, 0)
-        required_level = role_hierarchy.get(required_role, 0)
-        return user_level >= required_level
+        return role_allows(self.role, required_role)
     
     def generate_reset_token(self):
         import secrets
@@ -49,8 +58,116 @@ class User(UserMixin, db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
+class UserIdentity(UserMixin):
+    """Detached copy of the User fields current_user needs, kept in the user cache"""
+    
+    FIELDS = ('id', 'email', 'username', 'full_name', 'phone', 'is_admin', 'role', 'created_at')
+    
+    def __init__(self, user):
+        for field in self.FIELDS:
+            setattr(self, field, getattr(user, field))
+    
+    def has_permission(self, required_role):
+        return role_allows(self.role, required_role)
+    
+    def __repr__(self):
+        return f'<UserIdentity {self.username}>'
+
+class CacheVersion(db.Model):
+    """Version stamps that let gunicorn workers notice stale in-process caches"""
+    __tablename__ = 'cache_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CacheVersion {self.name}={self.version}>'
+
+class StatsCounter(db.Model):
+    """Materialized dashboard totals, kept in step with orders and accounts"""
+    __tablename__ = 'stats_counters'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<StatsCounter {self.name}={self.value}>'
+
+class SalesRollup(db.Model):
+    """Completed sales per order day and account category"""
+    __tablename__ = 'sales_rollups'
+    
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<SalesRollup {self.day} {self.category}>'
+
+class JobCheckpoint(db.Model):
+    """Progress of resumable maintenance jobs (key rotation, backfills)"""
+    __tablename__ = 'job_checkpoints'
+    
+    name = db.Column(db.String(100), primary_key=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    details = db.Column(db.JSON, default=dict)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @staticmethod
+    def load(name):
+        checkpoint = db.session.get(JobCheckpoint, name)
+        if checkpoint is None:
+            checkpoint = JobCheckpoint(name=name, position=0, details={})
+            db.session.add(checkpoint)
+        return checkpoint
+    
+    def __repr__(self):
+        return f'<JobCheckpoint {self.name}@{self.position}>'
+
+class StoredFile(db.Model):
+    """Reference count of a content-addressed upload (key = storage path)"""
+    __tablename__ = 'stored_files'
+    
+    key = db.Column(db.String(255), primary_key=True)
+    size = db.Column(db.Integer, nullable=False, default=0)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<StoredFile {self.key} x{self.refcount}>'
+
+class ImageVariant(db.Model):
+    """Resized / re-encoded copy of an uploaded account image"""
+    __tablename__ = 'image_variants'
+    __table_args__ = (
+        db.UniqueConstraint('source', 'width', 'format', name='uq_image_variants_source_width_format'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(255), nullable=False, index=True)
+    width = db.Column(db.Integer, nullable=False)
+    height = db.Column(db.Integer, nullable=False)
+    format = db.Column(db.String(10), nullable=False)
+    path = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ImageVariant {self.path}>'
+
 class GameAccount(db.Model):
     __tablename__ = 'game_accounts'
+    __table_args__ = (
+        # Keyset pagination indexes for the public catalog sort orders
+        db.Index('ix_game_accounts_sold_category_created', 'is_sold', 'category', 'created_at'),
+        db.Index('ix_game_accounts_sold_created', 'is_sold', 'created_at'),
+        db.Index('ix_game_accounts_sold_price', 'is_sold', 'price'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -63,21 +180,15 @@ class GameAccount(db.Model):
     is_sold = db.Column(db.Boolean, default=False, index=True)
     internal_notes = db.Column(db.Text)
     images = db.Column(db.JSON, default=list)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'))
     
     def get_decrypted_username(self):
-        try:
-            return cipher_suite.decrypt(self.account_username.encode()).decode()
-        except Exception:
-            return '[Lỗi giải mã]'
+        return decrypt_tokens([self.account_username])[self.account_username]
     
     def get_decrypted_password(self):
-        try:
-            return cipher_suite.decrypt(self.account_password.encode()).decode()
-        except Exception:
-            return '[Lỗi giải mã]'
+        return decrypt_tokens([self.account_password])[self.account_password]
     
     def get_images(self):
         if self.images:
@@ -85,16 +196,15 @@ class GameAccount(db.Model):
         return []
     
     def add_image(self, image_path):
-        if self.images is None:
-            self.images = []
+        # Assign a new list: in-place changes to a JSON column are not detected
         if isinstance(self.images, list):
-            self.images.append(image_path)
+            self.images = self.images + [image_path]
         else:
             self.images = [image_path]
     
     def remove_image(self, image_path):
         if self.images and isinstance(self.images, list) and image_path in self.images:
-            self.images.remove(image_path)
+            self.images = [image for image in self.images if image != image_path]
     
     def __repr__(self):
         return f'<GameAccount {self.title}>'
@@ -117,6 +227,18 @@ class Order(db.Model):
     
     accounts = db.relationship('GameAccount', backref='order', lazy='dynamic')
     
+    @staticmethod
+    def account_counts(orders):
+        """Map order id -> number of accounts, in one grouped query"""
+        order_ids = [order.id for order in orders]
+        if not order_ids:
+            return {}
+        rows = db.session.query(GameAccount.order_id, db.func.count(GameAccount.id)) \
+            .filter(GameAccount.order_id.in_(order_ids)).group_by(GameAccount.order_id).all()
+        counts = dict.fromkeys(order_ids, 0)
+        counts.update(rows)
+        return counts
+    
     def __repr__(self):
         return f'<Order {self.id}>'
 
@@ -130,6 +252,12 @@ class CartItem(db.Model):
     
     account = db.relationship('GameAccount', backref='cart_items')
     
+    @staticmethod
+    def for_user(user_id):
+        """Cart items of a user with their accounts loaded in the same query"""
+        return CartItem.query.options(db.joinedload(CartItem.account)) \
+            .filter_by(user_id=user_id).order_by(CartItem.created_at).all()
+    
     def __repr__(self):
         return f'<CartItem {self.id}>'
 
@@ -146,16 +274,17 @@ class AuditLog(db.Model):
     user = db.relationship('User', backref='audit_logs')
     
     @staticmethod
-    def create_log(user_id, action, description, ip_address=None):
-        log = AuditLog(
-            user_id=user_id,
-            action=action,
-            description=description,
-            ip_address=ip_address
-        )
-        db.session.add(log)
-        db.session.commit()
-        return log
+    def create_log(user_id, action, description, ip_address=None, sync=None):
+        # Queued for a bulk insert by the audit writer; never commits the request session
+        row = {
+            'user_id': user_id,
+            'action': action,
+            'description': description,
+            'ip_address': ip_address,
+            'created_at': datetime.utcnow()
+        }
+        audit_writer.submit(row, sync=action in SYNC_ACTIONS if sync is None else sync)
+        return row
     
     def __repr__(self):
         return f'<AuditLog {self.action}>'
@@ -170,6 +299,12 @@ class Wishlist(db.Model):
     
     account = db.relationship('GameAccount', backref='wishlist_items')
     
+    @staticmethod
+    def for_user(user_id):
+        """Wishlist items of a user with their accounts loaded in the same query"""
+        return Wishlist.query.options(db.joinedload(Wishlist.account)) \
+            .filter_by(user_id=user_id).order_by(Wishlist.created_at).all()
+    
     def __repr__(self):
         return f'<Wishlist {self.id}>'
 
@@ -0,0 +1,157 @@
+"""
+Password hashing off the request thread.
+
+scrypt/pbkdf2 are deliberately slow, and running them inline in login(),
+register() and reset_password() lets a burst of logins occupy every worker.
+PasswordHasher runs hash and verify in a small process pool instead. At most
+``PASSWORD_HASH_QUEUE`` operations may be pending per worker; beyond that
+``HasherBusy`` is raised right away, so a credential-stuffing wave gets an
+error page instead of starving catalog requests.
+
+``PASSWORD_HASH_METHOD`` is the werkzeug method for new hashes. Hashes made
+with other parameters are upgraded on the next successful login
+(``needs_rehash``). ``PASSWORD_HASH_WORKERS = 0`` hashes in the calling
+thread, still behind the same queue limit.
+"""
+import atexit
+import bisect
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class HasherBusy(Exception):
+    """Too many password operations are pending or one timed out"""
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method)
+
+
+def _verify(pwhash, password):
+    return check_password_hash(pwhash, password)
+
+
+def normalize_method(method):
+    """Return the method string werkzeug stores in the hash, defaults filled in"""
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        defaults = ['32768', '8', '1']
+    elif name == 'pbkdf2':
+        defaults = ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)]
+    else:
+        return method
+    return ':'.join([name] + args + defaults[len(args):])
+
+
+class PasswordHasher:
+    def __init__(self, app=None):
+        self.method = 'scrypt'
+        self.workers = 2
+        self.queue_limit = 16
+        self.timeout = 10.0
+        self._expected = normalize_method(self.method)
+        self._executor = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(self.queue_limit)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.rehashed = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config.setdefault('PASSWORD_HASH_METHOD', self.method)
+        self.workers = app.config.setdefault('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1))
+        self.queue_limit = app.config.setdefault('PASSWORD_HASH_QUEUE', self.queue_limit)
+        self.timeout = app.config.setdefault('PASSWORD_HASH_TIMEOUT', self.timeout)
+        self._expected = normalize_method(self.method)
+        self._slots = threading.BoundedSemaphore(self.queue_limit)
+        app.extensions['password_hasher'] = self
+        atexit.register(self.shutdown)
+
+    def _pool(self):
+        # A pool inherited through fork() is unusable, so each worker makes its own
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # spawn: children must not inherit the app's threads and DB connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, op, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy(f'{self.queue_limit} password operations already pending')
+        start = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if not self.workers:
+                return func(*args)
+            try:
+                return self._pool().submit(func, *args).result(timeout=self.timeout)
+            except FutureTimeout:
+                with self._lock:
+                    self.timeouts += 1
+                raise HasherBusy(f'password {op} took longer than {self.timeout}s')
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+                counts = self._histograms.setdefault(op, [0] * (len(LATENCY_BUCKETS) + 1))
+                counts[bisect.bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run('hash', _hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run('verify', _verify, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if the hash was made with a method other than the configured one"""
+        return pwhash.split('$', 1)[0] != self._expected
+
+    def record_rehash(self):
+        with self._lock:
+            self.rehashed += 1
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    def stats(self):
+        with self._lock:
+            labels = [f'le_{bound}ms' for bound in LATENCY_BUCKETS] + ['inf']
+            return {
+                'method': self._expected,
+                'workers': self.workers,
+                'queue_limit': self.queue_limit,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'rehashed': self.rehashed,
+                'latency': {op: dict(zip(labels, counts)) for op, counts in self._histograms.items()},
+            }
@@ -0,0 +1,195 @@
+"""
+Per-request SQL profiling.
+
+SQLAlchemy cursor events time every statement issued while a request is
+being handled. Responses to admins, and every response in debug mode or
+with ``QUERY_PROFILER_SERVER_TIMING`` on, get a ``Server-Timing`` header
+(``db;dur=…;desc="N queries", app;dur=…``), so browser dev tools show the
+numbers; they are not published to everyone by default. The request's query count, DB time and slowest statements go into
+a per-worker ring buffer of the last ``QUERY_PROFILER_HISTORY`` requests,
+which /admin/query-profiler shows. Statements are stored without their
+parameters.
+
+In tests, ``query_budget(n)`` fails the test when the code inside it
+issues more than ``n`` statements:
+
+    with query_budget(4):
+        client.get('/orders')
+"""
+import heapq
+import threading
+import time
+from collections import deque
+from contextlib import ContextDecorator
+from datetime import datetime
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+STATEMENT_LENGTH = 500
+
+
+class RequestProfile:
+    def __init__(self, slowest):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest = []
+        self.keep = slowest
+
+    def add(self, statement, duration):
+        self.queries += 1
+        self.db_time += duration
+        entry = (duration, self.queries, statement)
+        if len(self.slowest) < self.keep:
+            heapq.heappush(self.slowest, entry)
+        elif self.keep and duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+
+def _current_profile():
+    return g.get('query_profile') if has_app_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context, which is dropped with it when a statement fails
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_started', None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    profile = _current_profile()
+    if profile is not None:
+        profile.add(statement[:STATEMENT_LENGTH], duration)
+
+
+class QueryProfiler:
+    def __init__(self, app=None):
+        self.enabled = True
+        self.server_timing = False
+        self.slowest = 5
+        self.history = deque(maxlen=200)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.setdefault('QUERY_PROFILER_ENABLED', self.enabled)
+        self.server_timing = app.config.setdefault('QUERY_PROFILER_SERVER_TIMING', self.server_timing)
+        self.slowest = app.config.setdefault('QUERY_PROFILER_SLOWEST', self.slowest)
+        self.history = deque(maxlen=app.config.setdefault('QUERY_PROFILER_HISTORY', self.history.maxlen))
+        if self.enabled:
+            # On the Engine class, so it covers every engine (and every test database)
+            if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+                event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+                event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            app.before_request(self._start)
+            app.after_request(self._finish)
+            app.teardown_request(self._discard)
+        app.extensions['query_profiler'] = self
+
+    def _start(self):
+        g.query_profile = RequestProfile(self.slowest)
+
+    def _discard(self, exc):
+        g.pop('query_profile', None)
+
+    def _finish(self, response):
+        profile = g.pop('query_profile', None)
+        if profile is None:
+            return response
+        total = time.perf_counter() - profile.started
+        if self._show_timing():
+            response.headers.add('Server-Timing', f'db;dur={profile.db_time * 1000:.1f};desc="{profile.queries} queries"')
+            response.headers.add('Server-Timing', f'app;dur={total * 1000:.1f}')
+        if request.endpoint != 'static':
+            self.record({
+                'at': datetime.utcnow().isoformat(),
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'queries': profile.queries,
+                'db_ms': round(profile.db_time * 1000, 2),
+                'total_ms': round(total * 1000, 2),
+                'slowest': [{'ms': round(duration * 1000, 2), 'statement': statement}
+                            for duration, _, statement in sorted(profile.slowest, reverse=True)],
+            })
+        return response
+
+    def _show_timing(self):
+        if self.server_timing or current_app.debug:
+            return True
+        # No session cookie, no admin: skip the user lookup (and the Vary: Cookie it would add)
+        if current_app.config['SESSION_COOKIE_NAME'] not in request.cookies:
+            return False
+        from flask_login import current_user
+
+        return current_user.is_authenticated and current_user.has_permission('admin')
+
+    def record(self, entry):
+        with self._lock:
+            self.history.append(entry)
+
+    def stats(self, limit=50):
+        """Per-endpoint aggregates and the most recent requests, newest first"""
+        with self._lock:
+            entries = list(self.history)
+        endpoints = {}
+        for entry in entries:
+            summary = endpoints.setdefault(entry['endpoint'] or entry['path'], {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'db_ms': 0.0, 'max_db_ms': 0.0})
+            summary['requests'] += 1
+            summary['queries'] += entry['queries']
+            summary['max_queries'] = max(summary['max_queries'], entry['queries'])
+            summary['db_ms'] += entry['db_ms']
+            summary['max_db_ms'] = max(summary['max_db_ms'], entry['db_ms'])
+        for summary in endpoints.values():
+            summary['avg_queries'] = round(summary.pop('queries') / summary['requests'], 2)
+            summary['avg_db_ms'] = round(summary.pop('db_ms') / summary['requests'], 2)
+        return {
+            'enabled': self.enabled,
+            'capacity': self.history.maxlen,
+            'recorded': len(entries),
+            'endpoints': dict(sorted(endpoints.items(), key=lambda item: -item[1]['max_queries'])),
+            'requests': entries[::-1][:limit],
+        }
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(ContextDecorator):
+    """Fail with QueryBudgetExceeded if the block issues more than ``limit`` statements.
+
+    Only statements from the current thread are counted, so background
+    threads (audit writer, image pipeline) do not count against the budget.
+    ``statements`` holds what was issued, for further assertions.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.statements = []
+
+    def _listen(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread:
+            self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        self._thread = threading.get_ident()
+        event.listen(Engine, 'before_cursor_execute', self._listen)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(Engine, 'before_cursor_execute', self._listen)
+        if exc_type is None and len(self.statements) > self.limit:
+            listing = '\n'.join(f'  {i}. {statement}' for i, statement in enumerate(self.statements, 1))
+            raise QueryBudgetExceeded(
+                f'{len(self.statements)} queries, budget is {self.limit}:\n{listing}')
+        return False
@@ -0,0 +1,143 @@
+"""
+Inventory reservation for checkout.
+
+An account is held for an order by setting ``GameAccount.order_id``. Taking
+the hold is atomic, so two buyers racing for the same account cannot both
+get it:
+
+* PostgreSQL: ``SELECT ... FOR UPDATE SKIP LOCKED`` on the free rows, so a
+  checkout never waits behind another one; rows locked elsewhere simply
+  count as unavailable.
+* Other databases (SQLite): one conditional ``UPDATE ... WHERE order_id IS
+  NULL`` whose rowcount tells whether every account was still free.
+
+Holds of orders still ``pending`` after ``RESERVATION_TTL_MINUTES`` are
+released, and the order is cancelled.
+
+Usage:
+    flask reservations release-expired
+"""
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from extensions import db, dashboard_stats
+from models import GameAccount, Order
+
+reservations_cli = AppGroup('reservations', help='Checkout inventory holds.')
+
+_last_release = 0.0
+
+
+class ReservationError(Exception):
+    def __init__(self, unavailable_ids):
+        super().__init__(f'Accounts no longer available: {sorted(unavailable_ids)}')
+        self.unavailable_ids = set(unavailable_ids)
+
+
+def reserve(account_ids, order_id):
+    """Hold ``account_ids`` for ``order_id`` in the current transaction.
+
+    Raises ReservationError if any account is sold, held by another order or
+    being checked out concurrently; the caller should roll back.
+    """
+    account_ids = set(account_ids)
+    available = db.and_(GameAccount.id.in_(account_ids),
+                        GameAccount.is_sold.is_(False),
+                        GameAccount.order_id.is_(None))
+
+    if db.engine.dialect.name == 'postgresql':
+        locked = set(db.session.execute(
+            db.select(GameAccount.id).where(available).with_for_update(skip_locked=True)
+        ).scalars())
+        if locked != account_ids:
+            raise ReservationError(account_ids - locked)
+        db.session.execute(
+            db.update(GameAccount).where(GameAccount.id.in_(locked)).values(order_id=order_id),
+            execution_options={'synchronize_session': False}
+        )
+        return
+
+    result = db.session.execute(
+        db.update(GameAccount).where(available).values(order_id=order_id),
+        execution_options={'synchronize_session': False}
+    )
+    if result.rowcount != len(account_ids):
+        held = set(db.session.execute(
+            db.select(GameAccount.id).where(GameAccount.id.in_(account_ids), GameAccount.order_id == order_id)
+        ).scalars())
+        raise ReservationError(account_ids - held)
+
+
+def lock_order(order_id, statuses):
+    """Lock an order in the current transaction if its status is one of ``statuses``.
+
+    Returns False when it is not (e.g. release_expired() already cancelled
+    it). Otherwise release_expired() cannot cancel it until the caller commits.
+    """
+    return db.session.execute(
+        db.update(Order).where(Order.id == order_id, Order.status.in_(statuses)).values(status=Order.status),
+        execution_options={'synchronize_session': False}
+    ).rowcount == 1
+
+
+def release_order(order_id):
+    """Release the unsold accounts held by an order"""
+    db.session.execute(
+        db.update(GameAccount)
+        .where(GameAccount.order_id == order_id, GameAccount.is_sold.is_(False))
+        .values(order_id=None),
+        execution_options={'synchronize_session': False}
+    )
+
+
+def release_expired(now=None):
+    """Cancel pending orders older than the hold TTL and free their accounts.
+
+    Returns the number of orders released.
+    """
+    ttl = timedelta(minutes=current_app.config.get('RESERVATION_TTL_MINUTES', 30))
+    cutoff = (now or datetime.utcnow()) - ttl
+    # Orders first, in the lock order admin_complete_payment uses (order row, then its
+    # accounts); only orders still pending here give their accounts back
+    cancelled_ids = db.session.execute(
+        db.update(Order)
+        .where(Order.status == 'pending', Order.created_at < cutoff)
+        .values(status='cancelled', admin_notes='Hết hạn giữ hàng', updated_at=datetime.utcnow())
+        .returning(Order.id),
+        execution_options={'synchronize_session': False}
+    ).scalars().all()
+    if not cancelled_ids:
+        db.session.commit()
+        return 0
+    db.session.execute(
+        db.update(GameAccount)
+        .where(GameAccount.order_id.in_(cancelled_ids), GameAccount.is_sold.is_(False))
+        .values(order_id=None),
+        execution_options={'synchronize_session': False}
+    )
+    cancelled = len(cancelled_ids)
+    # Bulk UPDATE bypasses the ORM flush hook that maintains the dashboard counters
+    dashboard_stats.apply({'orders_pending': -cancelled, 'orders_cancelled': cancelled})
+    db.session.commit()
+    return cancelled
+
+
+def release_expired_throttled():
+    """release_expired(), at most once per RESERVATION_SWEEP_SECONDS per worker"""
+    global _last_release
+    interval = current_app.config.get('RESERVATION_SWEEP_SECONDS', 60)
+    if time.monotonic() - _last_release < interval:
+        return 0
+    _last_release = time.monotonic()
+    return release_expired()
+
+
+@reservations_cli.command('release-expired')
+def release_expired_command():
+    """Release holds of unpaid orders past RESERVATION_TTL_MINUTES."""
+    released = release_expired()
+    click.echo(f"✅ Released {released} expired orders")
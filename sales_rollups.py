@@ -0,0 +1,189 @@
+"""
+Daily sales rollups for the admin dashboard time series.
+
+sales_rollups holds one row per (order day, account category) with the
+revenue, completed orders and units sold. Days are the UTC day the order
+was placed (``Order.created_at``), so a later status change always lands
+in the same bucket. An order with accounts in several categories counts
+once in each of their rows, so every day also has an ``ALL_CATEGORIES``
+row counting each order once; the all-category series and totals come
+from it. Rollups written before that row existed need
+``flask stats backfill-sales``.
+
+A ``before_flush`` hook adds an order's accounts to its rows when the
+order's status becomes ``completed``, and subtracts them if it leaves
+``completed``. This happens in the same transaction as the status change.
+``/admin/stats/sales`` then serves ranges from the rollups alone.
+
+Existing history, or repair after bulk changes:
+    flask stats backfill-sales [--days 90]
+"""
+from datetime import date, datetime, timedelta
+
+import click
+from sqlalchemy import event
+
+from dashboard_stats import flush_value, stats_cli
+
+
+# Category of the per-day row covering every category; not a valid category name
+ALL_CATEGORIES = '*'
+
+
+def _as_date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _upsert(connection, rows):
+    """Add rows' revenue/orders/units to existing (day, category) rows"""
+    from models import SalesRollup
+
+    table = SalesRollup.__table__
+    if connection.dialect.name in ('postgresql', 'sqlite'):
+        if connection.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table).values(rows)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.category],
+            set_={name: table.c[name] + statement.excluded[name] for name in ('revenue', 'orders', 'units')},
+        ))
+        return
+    for row in rows:
+        key = (table.c.day == row['day']) & (table.c.category == row['category'])
+        updated = connection.execute(table.update().where(key).values(
+            revenue=table.c.revenue + row['revenue'], orders=table.c.orders + row['orders'],
+            units=table.c.units + row['units'])).rowcount
+        if not updated:
+            connection.execute(table.insert().values(**row))
+
+
+class SalesRollups:
+    def __init__(self, app=None):
+        self.max_days = 366
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from extensions import db
+
+        self.max_days = app.config.setdefault('SALES_SERIES_MAX_DAYS', self.max_days)
+        if not event.contains(db.session, 'before_flush', self._before_flush):
+            event.listen(db.session, 'before_flush', self._before_flush)
+        app.extensions['sales_rollups'] = self
+
+    def _before_flush(self, session, flush_context, instances):
+        from models import Order
+
+        for obj in list(session.dirty) + list(session.deleted):
+            if not isinstance(obj, Order):
+                continue
+            was_completed = flush_value(obj, 'status', old=True) == 'completed'
+            is_completed = obj not in session.deleted and obj.status == 'completed'
+            if was_completed != is_completed:
+                self.record(session.connection(), obj, 1 if is_completed else -1)
+
+    def record(self, connection, order, sign):
+        """Add (sign=1) or remove (sign=-1) a completed order's sales"""
+        from extensions import db
+        from models import GameAccount
+
+        day = (order.created_at or datetime.utcnow()).date()
+        rows = connection.execute(
+            db.select(GameAccount.category, db.func.count(), db.func.coalesce(db.func.sum(GameAccount.price), 0))
+            .where(GameAccount.order_id == order.id).group_by(GameAccount.category)
+        ).all()
+        if rows:
+            _upsert(connection, [
+                {'day': day, 'category': category or '', 'revenue': sign * revenue,
+                 'orders': sign, 'units': sign * units}
+                for category, units, revenue in rows
+            ] + [{'day': day, 'category': ALL_CATEGORIES, 'revenue': sign * sum(row[2] for row in rows),
+                  'orders': sign, 'units': sign * sum(row[1] for row in rows)}])
+
+    def backfill(self, since=None):
+        """Rebuild rollups for order days >= ``since`` (all days if None) from orders"""
+        from extensions import db
+        from models import GameAccount, Order, SalesRollup
+
+        day = db.func.date(Order.created_at)
+        per_category = (
+            db.select(day, GameAccount.category, db.func.sum(GameAccount.price),
+                      db.func.count(db.distinct(Order.id)), db.func.count(GameAccount.id))
+            .join(GameAccount, GameAccount.order_id == Order.id)
+            .where(Order.status == 'completed')
+            .group_by(day, GameAccount.category)
+        )
+        per_day = (
+            db.select(day, db.literal(ALL_CATEGORIES), db.func.sum(GameAccount.price),
+                      db.func.count(db.distinct(Order.id)), db.func.count(GameAccount.id))
+            .join(GameAccount, GameAccount.order_id == Order.id)
+            .where(Order.status == 'completed')
+            .group_by(day)
+        )
+        delete = db.delete(SalesRollup)
+        if since is not None:
+            placed_since = Order.created_at >= datetime.combine(since, datetime.min.time())
+            per_category, per_day = per_category.where(placed_since), per_day.where(placed_since)
+            delete = delete.where(SalesRollup.day >= since)
+
+        rows = [
+            {'day': _as_date(order_day), 'category': category or '', 'revenue': revenue or 0,
+             'orders': orders, 'units': units}
+            for query in (per_category, per_day)
+            for order_day, category, revenue, orders, units in db.session.execute(query)
+        ]
+        db.session.execute(delete)
+        if rows:
+            _upsert(db.session.connection(), rows)
+        db.session.commit()
+        return len(rows)
+
+    def series(self, start, end, by='category', category=None):
+        """Per-day revenue/orders/units between start and end (inclusive), zero-filled"""
+        from extensions import db
+        from models import SalesRollup
+
+        query = db.select(SalesRollup).where(SalesRollup.day >= start, SalesRollup.day <= end)
+        if category:
+            query = query.where(SalesRollup.category == category)
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+        series = {}
+        totals = {'revenue': 0, 'orders': 0, 'units': 0}
+        for row in db.session.execute(query).scalars():
+            overall = row.category == ALL_CATEGORIES
+            # Across categories, only the ALL_CATEGORIES rows count each order once
+            if by == 'category':
+                name = None if overall else row.category
+            else:
+                name = 'all' if overall or category else None
+            if name is not None:
+                points = series.setdefault(name, {day: {'revenue': 0, 'orders': 0, 'units': 0} for day in days})
+                for field in totals:
+                    points[row.day][field] += getattr(row, field)
+            if overall or category:
+                for field in totals:
+                    totals[field] += getattr(row, field)
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'by': by,
+            'series': {
+                name: [{'day': day.isoformat(), **point} for day, point in points.items()]
+                for name, points in sorted(series.items())
+            },
+            'totals': totals,
+        }
+
+
+@stats_cli.command('backfill-sales')
+@click.option('--days', type=int, default=None, help='Only rebuild the last N days (default: all history).')
+def backfill_sales_command(days):
+    """Rebuild daily sales rollups from completed orders."""
+    from extensions import sales_rollups
+
+    since = datetime.utcnow().date() - timedelta(days=days - 1) if days else None
+    rows = sales_rollups.backfill(since)
+    click.echo(f"✅ Rebuilt {rows} rollup rows" + (f" since {since}" if since else ""))
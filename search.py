@@ -0,0 +1,362 @@
+"""
+Full-text search over account titles and descriptions.
+
+Text is folded to plain ASCII so "lien quan" matches "Liên Quân". Two
+backends share one interface, ``apply(query, text)``, which narrows a
+GameAccount query to the matches and orders it by relevance:
+
+* ``MemorySearchBackend`` keeps an inverted index of unsold accounts per
+  worker, loaded on first use and updated incrementally by the admin/order
+  routes. Every change also bumps the ``search_index`` stamp in
+  cache_versions; other workers compare it at most every
+  ``SEARCH_INDEX_VERSION_CHECK`` seconds and reload when it moved. The index
+  is also reloaded after ``SEARCH_INDEX_TTL`` seconds, for writes that do not
+  go through the app.
+* ``PostgresSearchBackend`` uses a GIN index over ``to_tsvector`` of the
+  folded text and ranks with ``ts_rank``. ``flask init-db`` creates the
+  ``shop_unaccent`` function it needs; each process checks for it on first
+  use and falls back to the in-memory index when it is missing (e.g. the
+  ``unaccent`` extension could not be installed).
+"""
+import bisect
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+import sqlalchemy as sa
+
+TITLE_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.5
+
+_TOKEN_RE = re.compile(r'\w+')
+
+VERSION_NAME = 'search_index'
+
+
+def fold(text):
+    """Lowercase and strip Vietnamese diacritics ("Liên Quân" -> "lien quan")"""
+    if not text:
+        return ''
+    text = text.lower().replace('đ', 'd')
+    decomposed = unicodedata.normalize('NFD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(fold(text))
+
+
+class MemorySearchBackend:
+    name = 'memory'
+
+    def __init__(self, max_results=1000, ttl=None, version_check=None):
+        self.max_results = max_results
+        # Both None: a standalone index nothing else writes to (tests)
+        self.ttl = ttl
+        self.version_check = version_check
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+        self._loaded = False
+        self._loaded_at = 0
+        self._version = None
+        self._version_checked_at = 0
+        self._lock = threading.RLock()
+
+    def _document_terms(self, title, description):
+        weights = defaultdict(float)
+        for token in tokenize(title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(description):
+            weights[token] += DESCRIPTION_WEIGHT
+        return weights
+
+    def _add(self, account_id, title, description):
+        terms = self._document_terms(title, description)
+        for term, weight in terms.items():
+            if term not in self._postings:
+                self._vocabulary_dirty = True
+            self._postings[term][account_id] = weight
+        self._documents[account_id] = list(terms)
+
+    def _remove(self, account_id):
+        for term in self._documents.pop(account_id, ()):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(account_id, None)
+            if not postings:
+                del self._postings[term]
+                self._vocabulary_dirty = True
+
+    def _read_version(self):
+        from extensions import db
+        from models import CacheVersion
+
+        return db.session.execute(
+            db.select(CacheVersion.version).where(CacheVersion.name == VERSION_NAME)
+        ).scalar() or 0
+
+    def _check_freshness(self):
+        """Drop the index if it outlived the TTL or another worker changed the catalog"""
+        now = time.monotonic()
+        if self.ttl and self._loaded and now - self._loaded_at > self.ttl:
+            self._clear()
+        if self.version_check is None or now - self._version_checked_at < self.version_check:
+            return
+        version = self._read_version()
+        with self._lock:
+            self._version_checked_at = now
+            if version != self._version:
+                self._clear()
+                self._version = version
+
+    def _ensure_loaded(self):
+        self._check_freshness()
+        if self._loaded:
+            return
+        from extensions import db
+        from models import GameAccount
+
+        rows = db.session.query(GameAccount.id, GameAccount.title, GameAccount.description) \
+            .filter(GameAccount.is_sold.is_(False)).all()
+        with self._lock:
+            if self._loaded:
+                return
+            for account_id, title, description in rows:
+                self._add(account_id, title, description)
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+
+    def _bump_version(self):
+        """Tell the other workers to reload; keep this worker's index if it was current"""
+        if self.version_check is None:
+            return
+        from extensions import db
+        from models import CacheVersion
+
+        bumped = db.session.execute(
+            db.update(CacheVersion).where(CacheVersion.name == VERSION_NAME)
+            .values(version=CacheVersion.version + 1)
+        ).rowcount
+        if not bumped:
+            db.session.add(CacheVersion(name=VERSION_NAME, version=1))
+        db.session.commit()
+        version = self._read_version()
+        with self._lock:
+            if self._version is not None and version == self._version + 1:
+                # Nobody else changed anything since our last check; the local update is enough
+                self._version = version
+            else:
+                self._version_checked_at = 0
+
+    def _expand(self, token):
+        """Yield (term, weight) for the exact token and terms it prefixes"""
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect.bisect_left(self._vocabulary, token)
+        for term in self._vocabulary[start:]:
+            if not term.startswith(token):
+                break
+            yield term, 1.0 if term == token else PREFIX_WEIGHT
+
+    def search(self, text):
+        """Return account ids matching every token of ``text``, best first"""
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        self._ensure_loaded()
+        with self._lock:
+            total = max(len(self._documents), 1)
+            scores = None
+            for token in dict.fromkeys(tokens):
+                token_scores = defaultdict(float)
+                for term, match_weight in self._expand(token):
+                    postings = self._postings[term]
+                    idf = math.log(1 + total / len(postings))
+                    for account_id, weight in postings.items():
+                        token_scores[account_id] += match_weight * weight * idf
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {i: s + token_scores[i] for i, s in scores.items() if i in token_scores}
+                if not scores:
+                    return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return [account_id for account_id, _score in ranked]
+
+    def apply(self, query, text):
+        """The best ``max_results`` matches among the rows ``query`` (already filtered) selects"""
+        from models import GameAccount
+
+        ids = self.search(text)
+        if len(ids) > self.max_results:
+            # Cut only after the category/rank/price filters, or a filtered search could come back empty
+            ids = self._filtered(query, ids)
+        if not ids:
+            return query.filter(sa.false())
+        position = sa.case({account_id: i for i, account_id in enumerate(ids)}, value=GameAccount.id)
+        return query.filter(GameAccount.id.in_(ids)).order_by(position)
+
+    def _filtered(self, query, ids):
+        """The first ``max_results`` of the ranked ``ids`` that ``query`` selects, in rank order"""
+        from models import GameAccount
+
+        kept = []
+        for start in range(0, len(ids), self.max_results):
+            chunk = ids[start:start + self.max_results]
+            selected = {row[0] for row in query.with_entities(GameAccount.id)
+                        .filter(GameAccount.id.in_(chunk)).order_by(None)}
+            kept.extend(account_id for account_id in chunk if account_id in selected)
+            if len(kept) >= self.max_results:
+                return kept[:self.max_results]
+        return kept
+
+    def index_account(self, account):
+        with self._lock:
+            if self._loaded:
+                self._remove(account.id)
+                if not account.is_sold:
+                    self._add(account.id, account.title, account.description)
+        self._bump_version()
+
+    def remove(self, account_id):
+        self.remove_many([account_id])
+
+    def remove_many(self, account_ids):
+        """Remove several accounts with a single version bump"""
+        with self._lock:
+            if self._loaded:
+                for account_id in account_ids:
+                    self._remove(account_id)
+        self._bump_version()
+
+    def _clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._vocabulary = []
+            self._loaded = False
+
+    def invalidate(self):
+        self._clear()
+        self._bump_version()
+
+
+class PostgresSearchBackend:
+    name = 'postgres'
+
+    # Must match the GIN index expression exactly for the planner to use it
+    DOCUMENT_SQL = ("to_tsvector('simple', shop_unaccent("
+                    "coalesce(game_accounts.title, '') || ' ' || coalesce(game_accounts.description, '')))")
+
+    SCHEMA = [
+        "CREATE EXTENSION IF NOT EXISTS unaccent",
+        # unaccent() is only STABLE; an IMMUTABLE wrapper is needed to index it
+        "CREATE OR REPLACE FUNCTION shop_unaccent(text) RETURNS text AS "
+        "$$ SELECT public.unaccent('public.unaccent', $1) $$ "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT",
+        f"CREATE INDEX IF NOT EXISTS ix_game_accounts_search ON game_accounts USING gin (({DOCUMENT_SQL}))",
+    ]
+
+    def ensure_schema(self, engine):
+        with engine.begin() as connection:
+            for statement in self.SCHEMA:
+                connection.execute(sa.text(statement))
+
+    def available(self):
+        """Whether init-db managed to create shop_unaccent in this database"""
+        from extensions import db
+
+        return bool(db.session.execute(sa.text("SELECT to_regprocedure('shop_unaccent(text)') IS NOT NULL")).scalar())
+
+    def apply(self, query, text):
+        terms = tokenize(text)
+        if not terms:
+            return query
+        # Prefix match on every term, like the in-memory backend
+        tsquery = sa.func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+        document = sa.literal_column(self.DOCUMENT_SQL)
+        return query.filter(document.op('@@')(tsquery)).order_by(sa.func.ts_rank(document, tsquery).desc())
+
+    def index_account(self, account):
+        pass
+
+    def remove(self, account_id):
+        pass
+
+    def remove_many(self, account_ids):
+        pass
+
+    def invalidate(self):
+        pass
+
+
+class SearchIndex:
+    """Flask extension selecting the search backend from ``SEARCH_BACKEND``"""
+
+    def __init__(self, app=None):
+        self.backend = MemorySearchBackend()
+        self._verified = True
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+        default = 'postgres' if uri.startswith(('postgres://', 'postgresql')) else 'memory'
+        backend = app.config.setdefault('SEARCH_BACKEND', default)
+        self.max_results = app.config.setdefault('SEARCH_MAX_RESULTS', 1000)
+        self.ttl = app.config.setdefault('SEARCH_INDEX_TTL', 300)
+        self.version_check = app.config.setdefault('SEARCH_INDEX_VERSION_CHECK', 5)
+        if backend == 'postgres':
+            self.backend = PostgresSearchBackend()
+            # Checked on first use, so building the app stays free of queries
+            self._verified = False
+        else:
+            self.backend = MemorySearchBackend(self.max_results, self.ttl, self.version_check)
+            self._verified = True
+        app.extensions['search_index'] = self
+
+    def _fall_back(self, reason):
+        print(f"⚠️ Postgres full-text search unavailable, using in-memory index: {reason}")
+        self.backend = MemorySearchBackend(self.max_results, self.ttl, self.version_check)
+        self._verified = True
+
+    def _backend(self):
+        """The backend, after checking once per process that Postgres search is set up"""
+        if not self._verified:
+            if self.backend.available():
+                self._verified = True
+            else:
+                self._fall_back('shop_unaccent() is missing, run flask init-db')
+        return self.backend
+
+    def ensure_schema(self, engine):
+        if not isinstance(self.backend, PostgresSearchBackend):
+            return
+        try:
+            self.backend.ensure_schema(engine)
+            self._verified = True
+        except Exception as e:
+            self._fall_back(e)
+
+    def apply(self, query, text):
+        return self._backend().apply(query, text)
+
+    def index_account(self, account):
+        self._backend().index_account(account)
+
+    def remove(self, account_id):
+        self._backend().remove(account_id)
+
+    def remove_many(self, account_ids):
+        self._backend().remove_many(account_ids)
+
+    def invalidate(self):
+        self._backend().invalidate()
@@ -0,0 +1,364 @@
+"""
+Synthetic shop data for load tests and production-sized local catalogs.
+
+    flask seed --users 10000 --accounts 1000000 [--orders N] [--days 365] [--seed 42]
+
+Generates users, game accounts (category, rank and price distributions
+shaped like the live shop), orders holding those accounts, cart items,
+wishlists and audit history. The same ``--seed`` against the same database
+produces the same rows. Timestamps are relative to the time of the run, and
+Fernet ciphertexts are always random.
+
+Rows are streamed in batches of ``--batch-size`` and written with bulk
+inserts: executemany, or ``COPY`` on PostgreSQL. Ids continue from the
+current maximum and are assigned here, so seed a database nobody else is
+writing to. Credentials are encrypted with the primary key in a process
+pool (``--workers``). Every synthetic user has the password
+``SEED_PASSWORD``, hashed once.
+
+Bulk inserts bypass the ORM hooks, so afterwards the dashboard counters and
+sales rollups are rebuilt and the caches invalidated.
+"""
+import csv
+import io
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import repeat
+
+import click
+from flask.cli import with_appcontext
+
+from crypto_keys import encrypt_many
+
+SEED_PASSWORD = 'seed-password'
+
+# name, share of listings, base price (VND), ranks from lowest to highest
+CATEGORIES = [
+    ('Liên Quân Mobile', 35, 250_000, ['Đồng', 'Bạc', 'Vàng', 'Bạch Kim', 'Kim Cương', 'Tinh Anh', 'Cao Thủ', 'Thách Đấu']),
+    ('Free Fire', 30, 200_000, ['Đồng', 'Bạc', 'Vàng', 'Bạch Kim', 'Kim Cương', 'Huyền Thoại', 'Grandmaster', 'Thách Đấu']),
+    ('PUBG Mobile', 15, 300_000, ['Bronze', 'Silver', 'Gold', 'Platinum', 'Diamond', 'Crown', 'Ace', 'Conqueror']),
+    ('Mobile Legends', 12, 250_000, ['Warrior', 'Elite', 'Master', 'Grandmaster', 'Epic', 'Legend', 'Mythic', 'Mythic Glory']),
+    ('Liên Minh Tốc Chiến', 8, 200_000, ['Sắt', 'Đồng', 'Bạc', 'Vàng', 'Bạch Kim', 'Lục Bảo', 'Kim Cương', 'Cao Thủ']),
+]
+# Most listings sit in the middle tiers; the top ranks are rare
+RANK_WEIGHTS = [8, 14, 20, 20, 16, 11, 7, 4]
+RANK_PRICE_STEP = 1.35
+FEATURES = ['Full tướng', 'Skin hiếm', 'Nhiều skin súng', 'Trắng thông tin', 'Acc VIP', 'Giá rẻ',
+            'Skin giới hạn', 'Nhiều trang phục', 'Đã đổi tên miễn phí']
+ORDER_SIZES = [(1, 80), (2, 15), (3, 5)]
+ORDER_STATUSES = [('completed', 80), ('cancelled', 12), ('pending', 5), ('processing', 3)]
+CART_RATE = 0.02
+WISHLIST_RATE = 0.05
+LOGINS_PER_USER = 3
+
+LAST_NAMES = ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Huỳnh', 'Phan', 'Vũ', 'Võ', 'Đặng', 'Bùi', 'Đỗ']
+MIDDLE_NAMES = ['Văn', 'Thị', 'Minh', 'Hoàng', 'Ngọc', 'Thanh', 'Đức', 'Thu', 'Gia', 'Quốc']
+FIRST_NAMES = ['An', 'Bình', 'Chi', 'Dũng', 'Hà', 'Hải', 'Hùng', 'Khoa', 'Lan', 'Linh', 'Long', 'Mai',
+               'Nam', 'Phúc', 'Quân', 'Sơn', 'Trang', 'Tuấn', 'Vy', 'Yến']
+CREDENTIAL_CHARS = 'abcdefghijkmnpqrstuvwxyzABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+class _Writer:
+    """Buffers rows per table and writes them with executemany or COPY"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.copy = connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2'
+        self.written = {}
+
+    def insert(self, table, rows):
+        if not rows:
+            return
+        if self.copy:
+            self._copy(table, rows)
+        else:
+            self.connection.execute(table.insert(), rows)
+        self.written[table.name] = self.written.get(table.name, 0) + len(rows)
+
+    def _copy(self, table, rows):
+        columns = list(rows[0])
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                '\\N' if value is None else json.dumps(value) if isinstance(value, list) else value
+                for value in (row[column] for column in columns)
+            ])
+        buffer.seek(0)
+        cursor = self.connection.connection.driver_connection.cursor()
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+
+
+class Seeder:
+    def __init__(self, seed=42, days=365, batch_size=5000, workers=None, progress=None):
+        self.rng = random.Random(seed)
+        self.days = days
+        self.batch_size = batch_size
+        self.workers = min(4, os.cpu_count() or 1) if workers is None else workers
+        self.progress = progress
+        self.now = datetime.utcnow().replace(microsecond=0)
+
+    def _past(self, after=None):
+        """A random moment between ``after`` (default: --days ago) and now"""
+        start = after or self.now - timedelta(days=self.days)
+        return start + timedelta(seconds=self.rng.random() * max((self.now - start).total_seconds(), 0))
+
+    def _ip(self):
+        return '.'.join(str(self.rng.randint(1, 254)) for _ in range(4))
+
+    def _next_id(self, table):
+        from extensions import db
+
+        return (self.connection.execute(db.select(db.func.max(table.c.id))).scalar() or 0) + 1
+
+    def run(self, users, accounts, orders=None):
+        """Generate and insert everything; returns {table: rows written}"""
+        from extensions import db, password_hasher
+        from models import AuditLog, CartItem, GameAccount, Order, User, Wishlist
+
+        self.connection = db.session.connection()
+        writer = _Writer(self.connection)
+        self.tables = {model: model.__table__ for model in (User, GameAccount, Order, CartItem, Wishlist, AuditLog)}
+        started = time.monotonic()
+
+        password_hash = password_hasher.hash(SEED_PASSWORD)
+        self.customers = [tuple(row) for row in self.connection.execute(
+            db.select(User.id, User.full_name, User.email).order_by(User.id))]
+        next_user = self._next_id(self.tables[User])
+        for offset in range(0, users, self.batch_size):
+            user_rows, audit_rows = [], []
+            for user_id in range(next_user + offset, next_user + min(offset + self.batch_size, users)):
+                user_rows.append(self._user(user_id, password_hash, audit_rows))
+            writer.insert(self.tables[User], user_rows)
+            writer.insert(self.tables[AuditLog], audit_rows)
+            self._commit(writer, started)
+
+        if accounts:
+            if not self.customers:
+                raise click.ClickException('No users to place orders; seed some with --users')
+            self._accounts(writer, accounts, accounts // 5 if orders is None else orders, started)
+        self._finish(writer)
+        return writer.written
+
+    def _commit(self, writer, started):
+        from extensions import db
+
+        db.session.commit()
+        self.connection = writer.connection = db.session.connection()
+        if self.progress:
+            rows = sum(writer.written.values())
+            self.progress(dict(writer.written), rows / max(time.monotonic() - started, 1e-6))
+
+    def _user(self, user_id, password_hash, audit_rows):
+        name = f"{self.rng.choice(LAST_NAMES)} {self.rng.choice(MIDDLE_NAMES)} {self.rng.choice(FIRST_NAMES)}"
+        email = f'seed.user{user_id}@example.com'
+        created_at = self._past()
+        self.customers.append((user_id, name, email))
+        ip = self._ip()
+        audit_rows.append(self._audit(user_id, 'register', f'New user registered: {email}', ip, created_at))
+        for _ in range(self.rng.randint(0, 2 * LOGINS_PER_USER)):
+            audit_rows.append(self._audit(user_id, 'login', 'User logged in', ip, self._past(created_at)))
+        return {
+            'id': user_id, 'email': email, 'username': f'seed_user{user_id}', 'password_hash': password_hash,
+            'full_name': name, 'phone': '09' + ''.join(self.rng.choices('0123456789', k=8)),
+            'is_admin': False, 'role': 'user', 'created_at': created_at,
+        }
+
+    def _audit(self, user_id, action, description, ip, created_at):
+        return {'user_id': user_id, 'action': action, 'description': description,
+                'ip_address': ip, 'created_at': created_at}
+
+    def _account(self, account_id):
+        category, _, base_price, ranks = _weighted(self.rng, [(c, c[1]) for c in CATEGORIES])
+        tier = self.rng.choices(range(len(ranks)), RANK_WEIGHTS[:len(ranks)])[0]
+        rank = ranks[tier]
+        price = base_price * RANK_PRICE_STEP ** tier * self.rng.lognormvariate(0, 0.35)
+        feature = self.rng.choice(FEATURES)
+        created_at = self._past()
+        slug = ''.join(word[0] for word in category.split()).lower()
+        return {
+            'id': account_id, 'title': f'{category} - {rank} - {feature}',
+            'description': f'Tài khoản {category} rank {rank}. {feature}, {self.rng.randint(10, 400)} skin.',
+            'category': category, 'rank': rank, 'price': float(max(50_000, round(price, -4))),
+            # Plain text until the batch is encrypted in _flush_accounts()
+            'account_username': f'{slug}_{self.rng.getrandbits(32):08x}',
+            'account_password': ''.join(self.rng.choices(CREDENTIAL_CHARS, k=12)),
+            'is_sold': False, 'images': [], 'created_at': created_at, 'updated_at': created_at, 'order_id': None,
+        }
+
+    def _accounts(self, writer, accounts, orders, started):
+        from models import GameAccount, Order
+
+        sizes = [_weighted(self.rng, ORDER_SIZES) for _ in range(orders)]
+        # Algorithm S: every account is equally likely to end up in an order, and exactly
+        # sum(sizes) of them do, without holding the catalog in memory
+        needed = min(sum(sizes), accounts)
+        next_account = self._next_id(self.tables[GameAccount])
+        self.next_order = self._next_id(self.tables[Order])
+        batch = {'accounts': [], 'orders': [], 'cart': [], 'wishlist': [], 'audit': []}
+        group = []
+        order_index = 0
+
+        with self._encryptor() as encrypt:
+            for i in range(accounts):
+                account = self._account(next_account + i)
+                if needed and self.rng.random() * (accounts - i) < needed:
+                    needed -= 1
+                    group.append(account)
+                    if len(group) == sizes[order_index] or not needed:
+                        self._order(group, batch)
+                        order_index += 1
+                        group = []
+                else:
+                    self._shoppers(account, batch)
+                batch['accounts'].append(account)
+                # An open order group stays in the batch until it is complete
+                if len(batch['accounts']) >= self.batch_size and not group:
+                    self._flush_accounts(writer, batch, encrypt)
+                    self._commit(writer, started)
+            if group:
+                self._order(group, batch)
+            self._flush_accounts(writer, batch, encrypt)
+            self._commit(writer, started)
+
+    def _order(self, accounts, batch):
+        order_id = self.next_order
+        self.next_order += 1
+        user_id, name, email = self.rng.choice(self.customers)
+        status = _weighted(self.rng, ORDER_STATUSES)
+        listed = max(account['created_at'] for account in accounts)
+        if status in ('pending', 'processing'):
+            # Recent enough not to be cancelled by the reservation TTL right away
+            created_at = max(listed, self.now - timedelta(minutes=self.rng.randint(1, 10)))
+        else:
+            created_at = self._past(listed)
+        for account in accounts:
+            if status == 'completed':
+                account.update(is_sold=True, order_id=order_id, updated_at=created_at)
+            elif status != 'cancelled':
+                account['order_id'] = order_id
+        ip = self._ip()
+        batch['orders'].append({
+            'id': order_id, 'user_id': user_id, 'total_amount': sum(account['price'] for account in accounts),
+            'status': status, 'customer_name': name, 'customer_email': email,
+            'customer_phone': '09' + ''.join(self.rng.choices('0123456789', k=8)), 'payment_method': 'vietqr',
+            'payment_reference': f'SEED{order_id}' if status == 'completed' else None, 'admin_notes': None,
+            'created_at': created_at, 'updated_at': created_at,
+        })
+        batch['audit'].append(self._audit(user_id, 'create_order', f'Created order #{order_id}', ip, created_at))
+        if status == 'completed':
+            batch['audit'].append(self._audit(user_id, 'confirm_payment', f'Confirmed payment for order #{order_id}',
+                                              ip, created_at + timedelta(minutes=self.rng.randint(1, 30))))
+
+    def _shoppers(self, account, batch):
+        """Cart and wishlist entries for an account that is still for sale"""
+        for key, rate in (('cart', CART_RATE), ('wishlist', WISHLIST_RATE)):
+            if self.rng.random() < rate:
+                batch[key].append({'user_id': self.rng.choice(self.customers)[0], 'account_id': account['id'],
+                                   'created_at': self._past(account['created_at'])})
+
+    def _encryptor(self):
+        from extensions import encryption_key
+
+        if self.workers <= 1:
+            return _Inline(encryption_key)
+        return _Pooled(encryption_key, self.workers)
+
+    def _flush_accounts(self, writer, batch, encrypt):
+        from models import AuditLog, CartItem, GameAccount, Order, Wishlist
+
+        accounts = batch['accounts']
+        plain = [value for account in accounts for value in (account['account_username'], account['account_password'])]
+        tokens = encrypt(plain)
+        for index, account in enumerate(accounts):
+            account['account_username'], account['account_password'] = tokens[2 * index], tokens[2 * index + 1]
+        # Referenced rows first: PostgreSQL checks foreign keys on every statement
+        writer.insert(self.tables[Order], batch['orders'])
+        writer.insert(self.tables[GameAccount], accounts)
+        writer.insert(self.tables[CartItem], batch['cart'])
+        writer.insert(self.tables[Wishlist], batch['wishlist'])
+        writer.insert(self.tables[AuditLog], batch['audit'])
+        for rows in batch.values():
+            rows.clear()
+
+    def _finish(self, writer):
+        from extensions import catalog_cache, catalog_facets, dashboard_stats, db, sales_rollups, search_index, user_cache
+        from models import GameAccount, Order, User
+
+        if self.connection.dialect.name == 'postgresql':
+            # Ids were assigned here, so move the sequences past them
+            for model in (User, GameAccount, Order):
+                table = model.__tablename__
+                self.connection.execute(db.text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"))
+        db.session.commit()
+        dashboard_stats.rebuild()
+        sales_rollups.backfill()
+        catalog_cache.invalidate()
+        catalog_facets.invalidate()
+        search_index.invalidate()
+        user_cache.invalidate()
+
+
+class _Inline:
+    def __init__(self, key):
+        self.key = key
+
+    def __enter__(self):
+        return lambda values: encrypt_many(self.key, values)
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Pooled:
+    """Splits each batch across worker processes"""
+
+    def __init__(self, key, workers):
+        self.key = key
+        self.workers = workers
+        self.executor = None
+
+    def __enter__(self):
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self.encrypt
+
+    def encrypt(self, values):
+        size = math.ceil(len(values) / self.workers) or 1
+        chunks = [values[start:start + size] for start in range(0, len(values), size)]
+        return [token for chunk in self.executor.map(encrypt_many, repeat(self.key), chunks) for token in chunk]
+
+    def __exit__(self, *exc):
+        self.executor.shutdown()
+        return False
+
+
+@click.command('seed')
+@click.option('--users', type=int, default=1000, help='Users to create.')
+@click.option('--accounts', type=int, default=10000, help='Game accounts to create.')
+@click.option('--orders', type=int, default=None, help='Orders to create (default: accounts / 5).')
+@click.option('--days', type=int, default=365, help='Spread creation dates over the last N days.')
+@click.option('--seed', 'seed', type=int, default=42, help='Random seed; the same seed gives the same data.')
+@click.option('--batch-size', type=int, default=5000, help='Rows per bulk insert and transaction.')
+@click.option('--workers', type=int, default=None, help='Encryption processes (default: CPUs, at most 4; 1 = inline).')
+@with_appcontext
+def seed_command(users, accounts, orders, days, seed, batch_size, workers):
+    """Bulk-insert synthetic users, accounts, orders, carts, wishlists and audit logs."""
+    def progress(written, rate):
+        click.echo(f"{', '.join(f'{table} {rows}' for table, rows in written.items())} ({rate:.0f} rows/s)")
+
+    started = time.monotonic()
+    written = Seeder(seed, days, batch_size, workers, progress).run(users, accounts, orders)
+    click.echo(f"✅ Seeded {sum(written.values())} rows in {time.monotonic() - started:.1f}s: {written}")
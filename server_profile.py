@@ -0,0 +1,117 @@
+"""
+Production server profile: gunicorn workers and threads, and a database
+pool sized to match.
+
+gunicorn.conf.py and create_app() read the same environment, so every
+worker's SQLAlchemy pool has one connection per request thread, plus
+overflow for the background threads (audit writer, image pipeline).
+
+Environment:
+* ``GUNICORN_WORKER_CLASS``: ``gthread`` (default), ``gevent`` (needs the
+  gevent package) or ``sync``.
+* ``WEB_CONCURRENCY``: worker processes (default 2 x CPUs + 1, at most
+  ``GUNICORN_MAX_WORKERS``, default 8).
+* ``GUNICORN_THREADS``: threads per gthread worker (default 4).
+* ``GUNICORN_WORKER_CONNECTIONS``: greenlets per gevent worker (default
+  100). These share a pool of ``DB_POOL_SIZE`` (default 10) connections.
+* ``DB_POOL_SIZE``, ``DB_MAX_OVERFLOW``, ``DB_POOL_RECYCLE`` (seconds,
+  default 1800), ``DB_POOL_TIMEOUT`` (seconds, default 30).
+* ``DB_MAX_CONNECTIONS``: the database's connection limit. If it is not
+  set, PostgreSQL is asked once when gunicorn starts.
+
+    python server_profile.py     # print the profile for this machine
+"""
+import os
+from collections import namedtuple
+
+WORKER_CLASSES = ('gthread', 'gevent', 'sync')
+# Connections used outside request threads: audit writer, image pipeline, one spare
+BACKGROUND_CONNECTIONS = 3
+
+Profile = namedtuple('Profile', 'worker_class workers threads worker_connections '
+                                'pool_size max_overflow pool_recycle pool_timeout')
+
+
+def _int(environ, name, default):
+    value = environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def load_profile(environ=os.environ, cpu_count=None):
+    """Worker and pool settings from the environment and the CPU count"""
+    worker_class = environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+    if worker_class not in WORKER_CLASSES:
+        raise ValueError(f'Unknown GUNICORN_WORKER_CLASS: {worker_class}')
+    cpus = cpu_count or os.cpu_count() or 1
+    workers = _int(environ, 'WEB_CONCURRENCY', min(cpus * 2 + 1, _int(environ, 'GUNICORN_MAX_WORKERS', 8)))
+
+    threads = _int(environ, 'GUNICORN_THREADS', 4) if worker_class == 'gthread' else 1
+    worker_connections = _int(environ, 'GUNICORN_WORKER_CONNECTIONS', 100)
+    if worker_class == 'gevent':
+        # Greenlets beyond the pool wait up to pool_timeout for a connection
+        pool_size = _int(environ, 'DB_POOL_SIZE', 10)
+    else:
+        pool_size = _int(environ, 'DB_POOL_SIZE', threads)
+    return Profile(
+        worker_class=worker_class,
+        workers=max(workers, 1),
+        threads=max(threads, 1),
+        worker_connections=worker_connections,
+        pool_size=pool_size,
+        max_overflow=_int(environ, 'DB_MAX_OVERFLOW', BACKGROUND_CONNECTIONS),
+        pool_recycle=_int(environ, 'DB_POOL_RECYCLE', 1800),
+        pool_timeout=_int(environ, 'DB_POOL_TIMEOUT', 30),
+    )
+
+
+def engine_options(profile):
+    """SQLALCHEMY_ENGINE_OPTIONS for one worker process"""
+    return {
+        'pool_size': profile.pool_size,
+        'max_overflow': profile.max_overflow,
+        'pool_timeout': profile.pool_timeout,
+        'pool_recycle': profile.pool_recycle,
+        'pool_pre_ping': True,
+    }
+
+
+def max_connections(profile):
+    """Connections all workers together may open"""
+    return profile.workers * (profile.pool_size + profile.max_overflow)
+
+
+def database_connection_limit(database_url, environ=os.environ):
+    """DB_MAX_CONNECTIONS, else PostgreSQL's max_connections minus reserved slots; None if unknown"""
+    if environ.get('DB_MAX_CONNECTIONS'):
+        return int(environ['DB_MAX_CONNECTIONS'])
+    if not database_url or not database_url.startswith(('postgres://', 'postgresql')):
+        return None
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import NullPool
+
+    try:
+        engine = create_engine(database_url.replace('postgres://', 'postgresql://', 1), poolclass=NullPool)
+        with engine.connect() as connection:
+            limit = int(connection.execute(text('SHOW max_connections')).scalar())
+            reserved = int(connection.execute(text('SHOW superuser_reserved_connections')).scalar())
+        return limit - reserved
+    except Exception as e:
+        print(f"⚠️ Could not read the database connection limit: {e}")
+        return None
+
+
+def check_connection_limit(profile, limit):
+    """Warning text if the pools can open more connections than ``limit``, else None"""
+    total = max_connections(profile)
+    if limit is None or total <= limit:
+        return None
+    return (f"⚠️ {profile.workers} workers x (pool_size {profile.pool_size} + max_overflow "
+            f"{profile.max_overflow}) = {total} connections, but the database allows {limit}. "
+            f"Lower WEB_CONCURRENCY, GUNICORN_THREADS or DB_POOL_SIZE/DB_MAX_OVERFLOW.")
+
+
+if __name__ == '__main__':
+    current = load_profile()
+    for field, value in current._asdict().items():
+        print(f"{field}: {value}")
+    print(f"max connections: {max_connections(current)}")
@@ -7,6 +7,7 @@ import os
 import sys
 import time
 from app import app, db
+from init_db import create_schema
 from models import User, GameAccount, PaymentSettings
 
 def wait_for_database(max_retries=30, delay=2):
@@ -39,7 +40,7 @@ def auto_initialize_database():
             print(f"📊 Database URL: {app.config['SQLALCHEMY_DATABASE_URI'][:50]}...")
             
             # Create all tables
-            db.create_all()
+            create_schema()
             print("✅ Database tables created/verified")
             
             # Check if database is empty
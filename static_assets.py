@@ -0,0 +1,166 @@
+"""
+Fingerprinted, precompressed static assets.
+
+The build step copies every file under ``static/`` (except uploads) to
+``static/dist/`` with a content hash in its name, writes ``.gz`` and ``.br``
+siblings for compressible types, and records the mapping in
+``static/dist/manifest.json``:
+
+    python static_assets.py            # or: flask assets build
+
+When the manifest exists, ``url_for('static', filename='css/style.css')``
+resolves to the fingerprinted copy, so templates need no change. Those files
+are served with ``Cache-Control: immutable`` and a one year max-age,
+precompressed when the client accepts it. Content-addressed uploads (named
+by their SHA-256) get the same headers. Anything else keeps Flask's defaults.
+
+Local ``url()`` references inside CSS are not rewritten; keep them absolute
+or external.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import sys
+
+import click
+from flask import request, send_from_directory
+from flask.cli import AppGroup
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+SKIP_DIRS = {DIST_DIR, 'uploads'}
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.ico', '.xml'}
+IMMUTABLE = 'public, max-age=31536000, immutable'
+CONTENT_ADDRESSED = re.compile(r'^uploads/.*/[0-9a-f]{64}\.[a-z0-9]+$')
+
+assets_cli = AppGroup('assets', help='Static asset pipeline.')
+
+
+def _fingerprinted_name(path, digest):
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.{digest[:12]}{extension}"
+
+
+def _write_compressed(target, data):
+    """Write .gz/.br siblings when they are smaller than the file itself"""
+    written = []
+    encoders = [('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append(('.br', lambda raw: brotli.compress(raw, quality=11)))
+    for suffix, encode in encoders:
+        compressed = encode(data)
+        if len(compressed) < len(data):
+            with open(target + suffix, 'wb') as f:
+                f.write(compressed)
+            written.append(suffix)
+    return written
+
+
+def build_assets(static_folder):
+    """Rebuild static/dist and its manifest; returns the manifest"""
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    os.makedirs(dist)
+
+    manifest = {}
+    for directory, subdirs, files in os.walk(static_folder):
+        relative_dir = os.path.relpath(directory, static_folder)
+        if relative_dir == '.':
+            subdirs[:] = [name for name in subdirs if name not in SKIP_DIRS]
+        for filename in sorted(files):
+            if filename.startswith('.'):
+                continue
+            logical = os.path.normpath(os.path.join(relative_dir, filename)).replace(os.sep, '/')
+            with open(os.path.join(directory, filename), 'rb') as f:
+                data = f.read()
+            built = f"{DIST_DIR}/{_fingerprinted_name(logical, hashlib.sha256(data).hexdigest())}"
+            target = os.path.join(static_folder, built)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+            if os.path.splitext(filename)[1].lower() in COMPRESSIBLE:
+                _write_compressed(target, data)
+            manifest[logical] = built
+
+    with open(os.path.join(dist, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class StaticAssets:
+    def __init__(self, app=None):
+        self.manifest = {}
+        self.static_folder = None
+        self.fingerprinted = set()
+        self.served_compressed = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        manifest_path = app.config.setdefault(
+            'ASSET_MANIFEST', os.path.join(app.static_folder, DIST_DIR, MANIFEST_NAME))
+        self.load(manifest_path)
+        app.url_defaults(self._rewrite_static_url)
+        app.view_functions['static'] = self.send_static
+        app.extensions['static_assets'] = self
+
+    def load(self, manifest_path):
+        try:
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+        self.fingerprinted = set(self.manifest.values())
+
+    def _rewrite_static_url(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.manifest.get(values['filename'], values['filename'])
+
+    def is_immutable(self, filename):
+        return filename in self.fingerprinted or bool(CONTENT_ADDRESSED.match(filename))
+
+    def send_static(self, filename):
+        """Flask's static view, plus precompressed siblings and immutable caching"""
+        if not self.is_immutable(filename):
+            return send_from_directory(self.static_folder, filename)
+
+        accepted = request.accept_encodings
+        mimetype = mimetypes.guess_type(filename)[0]
+        response = None
+        for suffix, encoding in (('.br', 'br'), ('.gz', 'gzip')):
+            if accepted[encoding] and os.path.isfile(os.path.join(self.static_folder, filename + suffix)):
+                response = send_from_directory(self.static_folder, filename + suffix, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                self.served_compressed += 1
+                break
+        if response is None:
+            response = send_from_directory(self.static_folder, filename)
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+@assets_cli.command('build')
+def build_command():
+    """Fingerprint and precompress static files into static/dist."""
+    from flask import current_app
+
+    manifest = build_assets(current_app.static_folder)
+    current_app.extensions['static_assets'].load(os.path.join(current_app.static_folder, DIST_DIR, MANIFEST_NAME))
+    click.echo(f"✅ Built {len(manifest)} assets into static/{DIST_DIR}"
+               + ("" if brotli else " (brotli not installed, .br skipped)"))
+
+
+if __name__ == '__main__':
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    print(f"✅ Built {len(build_assets(folder))} assets into {os.path.join(folder, DIST_DIR)}")
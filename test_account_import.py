@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test the bulk account import: validation report, batching, resuming and the admin upload
+"""
+import io
+import json
+import uuid
+import account_import
+from app import app, db
+from models import GameAccount, JobCheckpoint, User
+from extensions import dashboard_stats, user_cache
+
+HEADER = 'title,description,category,rank,price,account_username,account_password,internal_notes\n'
+
+def csv_file(tag, rows):
+    return (HEADER + ''.join(f'Import {tag} {row}\n' for row in rows)).encode()
+
+def cleanup(tag, *files):
+    """Delete the test's accounts and the checkpoints of the files it imported, nobody else's"""
+    GameAccount.query.filter(GameAccount.title.like(f'Import {tag}%')).delete(synchronize_session=False)
+    names = [account_import.checkpoint_name(io.BytesIO(data)) for data in files]
+    JobCheckpoint.query.filter(JobCheckpoint.name.in_(names)).delete(synchronize_session=False)
+    db.session.commit()
+    dashboard_stats.rebuild()
+
+def test_import_validates_batches_and_resumes(monkeypatch):
+    """Test invalid rows are reported, valid ones encrypted and counted, and an interrupted import resumes"""
+    tag = uuid.uuid4().hex[:8]
+    data = csv_file(tag, [
+        '1,Mô tả,VIP,Cao,150000,user1,pass1,',
+        '2,,Premium,Elite,99000,user2,pass2,ghi chú',
+        '3,,Unknown,Cao,1000,user3,pass3,',
+        '4,,VIP,Cao,-5,user4,pass4,',
+        '5,,VIP,Cao,1000,,pass5,',
+        '6,,Standard,Thấp,50000,user6,pass6,',
+        '7,,Special,Trung bình,70000,user7,pass7,',
+    ])
+    with app.app_context():
+        try:
+            dashboard_stats.rebuild()
+            before = dashboard_stats.counters()['accounts_total']
+            calls = []
+
+            def crash_after_first_batch(categories):
+                calls.append(categories)
+                if len(calls) == 1:
+                    raise RuntimeError('worker killed')
+
+            monkeypatch.setattr(account_import, '_invalidate_caches', crash_after_first_batch)
+            try:
+                account_import.import_accounts(io.BytesIO(data), 'supplier.csv', batch_size=3)
+                assert False, 'import should have been interrupted'
+            except RuntimeError:
+                pass
+            assert GameAccount.query.filter(GameAccount.title.like(f'Import {tag}%')).count() == 2
+
+            result = account_import.import_accounts(io.BytesIO(data), 'supplier.csv', batch_size=3)
+            assert result['resumed_from'] == 4
+            assert (result['imported'], result['failed'], result['finished']) == (4, 3, True)
+            assert [entry['line'] for entry in result['errors']] == [4, 5, 6]
+            assert set(result['errors'][0]['errors']) == {'category'}
+            assert set(result['errors'][1]['errors']) == {'price'}
+            assert set(result['errors'][2]['errors']) == {'account_username'}
+
+            accounts = GameAccount.query.filter(GameAccount.title.like(f'Import {tag}%')).order_by(GameAccount.id).all()
+            assert [account.title.split()[-1] for account in accounts] == ['1', '2', '6', '7']
+            assert accounts[0].get_decrypted_username() == 'user1' and accounts[0].get_decrypted_password() == 'pass1'
+            assert (accounts[0].price, accounts[1].description, accounts[1].internal_notes) == (150000, None, 'ghi chú')
+            assert dashboard_stats.counters()['accounts_total'] == before + 4
+            assert dashboard_stats.rebuild(dry_run=True) == {}
+
+            again = account_import.import_accounts(io.BytesIO(data), 'supplier.csv')
+            assert again['already_imported'] and again['imported'] == 4
+            assert GameAccount.query.filter(GameAccount.title.like(f'Import {tag}%')).count() == 4
+        finally:
+            cleanup(tag, data)
+
+def test_jsonl_and_bad_files():
+    """Test JSONL rows, unparsable lines and files that cannot be imported at all"""
+    tag = uuid.uuid4().hex[:8]
+    lines = [
+        json.dumps({'title': f'Import {tag} a', 'category': 'VIP', 'rank': 'Elite', 'price': 120000,
+                    'account_username': 'ja', 'account_password': 'pa'}),
+        '{not json',
+        '',
+        json.dumps(['a', 'list']),
+    ]
+    feed = '\n'.join(lines).encode()
+    bad_files = ((b'title,price\nx,1\n', 'missing.csv'), (b'x', 'accounts.xlsx'),
+                 (HEADER.encode() + b'\xff\xfe,,,\n', 'latin1.csv'))
+    with app.app_context():
+        try:
+            result = account_import.import_accounts(io.BytesIO(feed), 'feed.jsonl')
+            assert (result['imported'], result['failed']) == (1, 2)
+            assert [entry['line'] for entry in result['errors']] == [2, 4]
+
+            for data, filename in bad_files:
+                try:
+                    account_import.import_accounts(io.BytesIO(data), filename)
+                    assert False, filename
+                except account_import.AccountImportError:
+                    pass
+        finally:
+            cleanup(tag, feed, *(data for data, _ in bad_files))
+
+def test_admin_upload_and_error_report(monkeypatch):
+    """Test the admin upload page imports a file and serves the rejected rows as CSV"""
+    tag = uuid.uuid4().hex[:8]
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    data = csv_file(tag, ['1,,VIP,Cao,100000,u1,p1,', '2,,VIP,Cao,abc,u2,p2,'])
+    with app.app_context():
+        admin = User(email='importer@example.com', username='importer', role='admin')
+        admin.set_password('password')
+        db.session.add(admin)
+        db.session.commit()
+        user_cache.invalidate(admin.id)
+    try:
+        client = app.test_client()
+        client.post('/login', data={'email': 'importer@example.com', 'password': 'password'})
+        response = client.post('/admin/accounts/import', data={'file': (io.BytesIO(data), 'upload.csv')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+        page = response.get_data(as_text=True)
+        assert 'Đã nhập <strong>1</strong> tài khoản' in page
+
+        name = account_import.checkpoint_name(io.BytesIO(data))
+        report = client.get(f'/admin/accounts/import/{name}/errors.csv')
+        assert report.mimetype == 'text/csv'
+        assert report.get_data(as_text=True).splitlines()[1].startswith(f'3,Import {tag} 2,price,')
+        assert client.get('/admin/accounts/import/credential_rotation/errors.csv').status_code == 404
+    finally:
+        with app.app_context():
+            User.query.filter_by(email='importer@example.com').delete()
+            cleanup(tag, data)
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
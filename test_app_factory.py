@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test that importing the app is cheap and does no I/O, and that init-db creates the schema
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Generous for slow CI machines; a regression back to import-time DB work or eager imports blows well past it
+IMPORT_BUDGET_SECONDS = float(os.environ.get('IMPORT_BUDGET_SECONDS', 3.0))
+
+BOOT = """
+import sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+eager = [name for name in ('models', 'views', 'forms', 'init_db') if name in sys.modules]
+app.create_app()
+print(imported, time.perf_counter() - start, ','.join(eager))
+"""
+
+def run(args, database):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}')
+    return subprocess.run(args, cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+
+def test_import_is_side_effect_free():
+    """Test import app + create_app() stays within budget without touching the database"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'boot.db')
+        imported, created, eager = run([sys.executable, '-c', BOOT], database).split('\n')[-2].split(' ')
+        print(f"import: {float(imported):.3f}s, create_app: {float(created):.3f}s")
+        assert not eager
+        assert float(created) < IMPORT_BUDGET_SECONDS
+        assert not os.path.exists(database)
+
+def test_init_db_command():
+    """Test flask init-db creates the tables on an empty database"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'fresh.db')
+        output = run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db', '--no-seed'], database)
+        assert 'Database has 0 users and 0 accounts' in output
+        with sqlite3.connect(database) as connection:
+            tables = {name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {'users', 'game_accounts', 'orders', 'stats_counters'} <= tables
+
+if __name__ == "__main__":
+    test_import_is_side_effect_free()
+    test_init_db_command()
+    print("✅ App factory tests passed!")
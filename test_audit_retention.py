@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Test chunked archival of expired audit logs on a throwaway database
+"""
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from app import create_app
+from extensions import db
+from models import AuditLog
+from audit_retention import archive_old_logs
+
+def test_archive_moves_expired_rows():
+    """Test expired rows are archived to monthly .jsonl.gz files and deleted, recent ones kept"""
+    old_time = datetime.utcnow() - timedelta(days=400)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(config={'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'audit.db')}"})
+        with app.app_context():
+            db.create_all()
+            db.session.execute(AuditLog.__table__.insert(), [
+                {'action': 'test_retention', 'description': f'old {i}', 'created_at': old_time}
+                for i in range(5)
+            ] + [{'action': 'test_retention', 'description': 'recent', 'created_at': datetime.utcnow()}])
+            db.session.commit()
+
+            archive_dir = os.path.join(tmp, 'archive')
+            assert archive_old_logs(retention_days=30, chunk_size=2, archive_dir=archive_dir) == 5
+            assert [log.description for log in AuditLog.query.all()] == ['recent']
+
+            path = os.path.join(archive_dir, f'audit_logs-{old_time:%Y-%m}.jsonl.gz')
+            with gzip.open(path, 'rt') as archive:
+                rows = [json.loads(line) for line in archive]
+            assert sorted(row['description'] for row in rows) == [f'old {i}' for i in range(5)]
+            db.session.remove()
+            db.engine.dispose()
+
+if __name__ == "__main__":
+    test_archive_moves_expired_rows()
+    print("✅ Audit retention tests passed!")
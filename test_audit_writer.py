@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Test the buffered audit log writer
+"""
+import queue
+from datetime import datetime
+from app import app
+from models import AuditLog
+from audit_writer import AuditWriter
+
+def make_row(action):
+    return {'user_id': None, 'action': action, 'description': 'test',
+            'ip_address': '127.0.0.1', 'created_at': datetime.utcnow()}
+
+def test_audit_writer_bounded_queue_and_flush():
+    """Test that a full queue drops rows and shutdown flushes the rest"""
+    writer = AuditWriter()
+    writer.app = app
+    writer.enabled = True
+    writer.batch_size = 100
+    writer.flush_interval = 60
+    writer.queue_size = 2
+    writer.enqueue_timeout = 0.01
+    writer._queue = queue.Queue(maxsize=2)
+
+    with app.app_context():
+        before = AuditLog.query.filter_by(action='test_audit_writer').count()
+
+    for _ in range(3):
+        writer.submit(make_row('test_audit_writer'))
+    stats = writer.stats()
+    assert stats['enqueued'] == 2
+    assert stats['dropped'] == 1
+    assert stats['queue_depth'] == 2
+
+    writer.shutdown()
+    assert writer.stats()['written'] == 2
+
+    writer.submit(make_row('test_audit_writer'), sync=True)
+    assert writer.stats()['written_sync'] == 1
+
+    with app.app_context():
+        assert AuditLog.query.filter_by(action='test_audit_writer').count() == before + 3
+
+if __name__ == "__main__":
+    test_audit_writer_bounded_queue_and_flush()
+    print("✅ Audit writer tests passed!")
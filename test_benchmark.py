@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test the benchmark suite: statistics, baseline comparison and a short run of both modes
+"""
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from benchmark import compare, percentile, summarize
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS = {'index', 'index_filtered', 'index_search', 'account_detail', 'order_detail',
+             'admin_dashboard', 'add_to_cart', 'checkout'}
+
+def bench(directory, *args):
+    env = dict(os.environ, BENCHMARK_DIR=directory)
+    return subprocess.run([sys.executable, 'benchmark.py', *args], cwd=ROOT, env=env, capture_output=True, text=True)
+
+def test_percentiles_and_summary():
+    """Test nearest-rank percentiles and the per-scenario summary"""
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.05
+    assert percentile(values, 99) == 0.099
+    assert percentile([0.2], 95) == 0.2
+    stats = summarize(list(reversed(values)), errors=1, elapsed=2.0)
+    assert (stats['requests'], stats['errors'], stats['rps']) == (100, 1, 50.0)
+    assert (stats['p50_ms'], stats['p95_ms'], stats['max_ms']) == (50.0, 95.0, 100.0)
+
+def test_compare_flags_changes_beyond_threshold():
+    """Test slower latency, lower throughput and new errors are regressions, and small changes are not"""
+    def document(rps, p50, errors=0):
+        return {'meta': {}, 'results': {'server': {'index': {
+            'rps': rps, 'p50_ms': p50, 'p95_ms': 10.0, 'p99_ms': 20.0, 'errors': errors}}}}
+
+    rows = {row['metric']: row['status'] for row in compare(document(80, 6.0, errors=2), document(100, 5.0), 10)}
+    assert rows == {'rps': 'regression', 'p50_ms': 'regression', 'p95_ms': 'ok', 'p99_ms': 'ok', 'errors': 'regression'}
+    rows = {row['metric']: row['status'] for row in compare(document(105, 4.0), document(100, 5.0), 10)}
+    assert rows == {'rps': 'ok', 'p50_ms': 'improvement', 'p95_ms': 'ok', 'p99_ms': 'ok'}
+
+def test_run_both_modes_and_compare():
+    """Test a short run against the test client and gunicorn, then the baseline report"""
+    with tempfile.TemporaryDirectory() as directory:
+        results = os.path.join(directory, 'results.json')
+        baseline = os.path.join(directory, 'baseline.json')
+        run = bench(directory, 'run', '--users', '30', '--accounts', '400', '--requests', '10', '--warmup', '2',
+                    '--concurrency', '2', '--workers', '2', '--output', results, '--baseline', baseline,
+                    '--save-baseline')
+        assert run.returncode == 0, run.stdout + run.stderr
+        with open(results) as f:
+            document = json.load(f)
+        assert set(document['results']) == {'client', 'server'}
+        for mode in ('client', 'server'):
+            assert set(document['results'][mode]) == SCENARIOS
+            for name, stats in document['results'][mode].items():
+                assert stats['requests'] == 10 and stats['errors'] == 0, (mode, name, stats)
+                assert 0 < stats['p50_ms'] <= stats['p95_ms'] <= stats['p99_ms']
+        assert document['meta']['dataset'] == {'users': 30, 'accounts': 400, 'seed': 42}
+
+        same = bench(directory, 'compare', results, baseline)
+        assert same.returncode == 0 and 'No regressions' in same.stdout
+        for stats in document['results']['server'].values():
+            stats['p95_ms'] *= 2
+        slower = os.path.join(directory, 'slower.json')
+        with open(slower, 'w') as f:
+            json.dump(document, f)
+        worse = bench(directory, 'compare', slower, baseline, '--threshold', '20')
+        assert worse.returncode == 1 and '8 regressions' in worse.stdout
+
+def test_external_database_needs_create_admin():
+    """Test --database is refused without --create-admin, and the admin it creates is removed afterwards"""
+    with tempfile.TemporaryDirectory() as directory:
+        # Seeds dataset-30u-400a-seed42.db, which has no benchmark admin
+        assert bench(directory, 'run', '--users', '30', '--accounts', '400', '--requests', '5', '--warmup', '1',
+                     '--mode', 'client', '--output', os.path.join(directory, 'seeded.json')).returncode == 0
+        database = os.path.join(directory, 'external.db')
+        shutil.copyfile(os.path.join(directory, 'dataset-30u-400a-seed42.db'), database)
+        args = ['run', '--database', f'sqlite:///{database}', '--requests', '5', '--warmup', '1', '--mode', 'client',
+                '--output', os.path.join(directory, 'external.json')]
+
+        refused = bench(directory, *args)
+        assert refused.returncode == 2 and '--create-admin' in refused.stderr
+        allowed = bench(directory, *args, '--create-admin')
+        assert allowed.returncode == 0, allowed.stdout + allowed.stderr
+        with sqlite3.connect(database) as connection:
+            assert connection.execute("SELECT COUNT(*) FROM users WHERE email = 'bench-admin@example.com'").fetchone() == (0,)
+            assert connection.execute("SELECT COUNT(*) FROM audit_logs WHERE action = 'login' AND user_id IS NULL"
+                                      ).fetchone()[0] > 0
+
+if __name__ == "__main__":
+    test_percentiles_and_summary()
+    test_compare_flags_changes_beyond_threshold()
+    test_run_both_modes_and_compare()
+    test_external_database_needs_create_admin()
+    print("✅ Benchmark tests passed")
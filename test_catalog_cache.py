@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Test catalog cache hit/miss accounting and invalidation
+"""
+from catalog_cache import CatalogCache, make_key
+
+def test_catalog_cache_eviction_and_invalidation():
+    """Test LRU eviction and category-scoped invalidation"""
+    cache = CatalogCache(maxsize=2, ttl=None)
+    cache.set(make_key(1, 'Free Fire', '', None, None, ''), 'ff')
+    cache.set(make_key(1, '', '', None, None, ''), 'all')
+    assert cache.get(make_key(1, 'Free Fire', '', None, None, '')) == 'ff'
+
+    cache.set(make_key(1, 'PUBG Mobile', '', None, None, ''), 'pubg')
+    assert cache.get(make_key(1, '', '', None, None, '')) is None
+    assert cache.stats()['evictions'] == 1
+
+    cache.invalidate({'Free Fire'})
+    assert cache.get(make_key(1, 'Free Fire', '', None, None, '')) is None
+    assert cache.get(make_key(1, 'PUBG Mobile', '', None, None, '')) == 'pubg'
+
+    stats = cache.stats()
+    assert stats['hits'] == 2
+    assert stats['misses'] == 2
+
+def test_index_served_from_cache():
+    """Test that repeated index views hit the catalog cache"""
+    from app import app, catalog_cache
+
+    catalog_cache.invalidate()
+    client = app.test_client()
+    before = catalog_cache.stats()
+
+    assert client.get('/?category=Free Fire').status_code == 200
+    assert client.get('/?category=Free Fire').status_code == 200
+
+    after = catalog_cache.stats()
+    assert after['misses'] == before['misses'] + 1
+    assert after['hits'] == before['hits'] + 1
+
+if __name__ == "__main__":
+    test_catalog_cache_eviction_and_invalidation()
+    test_index_served_from_cache()
+    print("✅ Catalog cache tests passed!")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Test batched credential decryption and its request-scoped memo
+"""
+from app import app
+from models import GameAccount
+from extensions import cipher_suite
+import credential_vault
+
+def make_account(account_id, username, password):
+    return GameAccount(id=account_id, title='Vault test', category='Test', price=0,
+                       account_username=cipher_suite.encrypt(username.encode()).decode(),
+                       account_password=cipher_suite.encrypt(password.encode()).decode())
+
+def test_decrypt_many_memoizes_per_request():
+    """Test one batch decrypts each field once and the memo ends with the request"""
+    accounts = [make_account(i, f'user{i}', f'pass{i}') for i in range(1, 4)]
+    broken = GameAccount(id=99, title='Broken', category='Test', price=0,
+                         account_username='not-a-token', account_password='not-a-token')
+
+    with app.test_request_context():
+        before = credential_vault.stats()
+        credentials = credential_vault.decrypt_many(accounts + [broken])
+        assert credentials[2].username == 'user2'
+        assert credentials[3].password == 'pass3'
+        assert credentials[99].password == credential_vault.DECRYPT_ERROR
+
+        assert accounts[0].get_decrypted_password() == 'pass1'
+        after = credential_vault.stats()
+        assert after['decrypted'] - before['decrypted'] == 7
+        assert after['memo_hits'] - before['memo_hits'] == 1
+        assert credential_vault.request_time() > 0
+
+    with app.test_request_context():
+        before = credential_vault.stats()
+        credential_vault.decrypt_many(accounts[:1])
+        assert credential_vault.stats()['decrypted'] - before['decrypted'] == 2
+
+if __name__ == "__main__":
+    test_decrypt_many_memoizes_per_request()
+    print("✅ Credential vault tests passed!")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test materialized dashboard counters and their reconciliation
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+from app import app, create_app, db
+from models import GameAccount, Order, User, StatsCounter
+from extensions import dashboard_stats
+from reservations import release_expired
+
+def changes(before):
+    after = dashboard_stats.counters()
+    return {name: after.get(name, 0) - before.get(name, 0)
+            for name in set(after) | set(before) if after.get(name, 0) != before.get(name, 0)}
+
+def test_counters_follow_order_lifecycle():
+    """Test counters change with inserts, status changes, rollbacks and deletes"""
+    with app.app_context():
+        dashboard_stats.rebuild()
+        before = dashboard_stats.counters()
+        user = User.query.first()
+
+        account = GameAccount(title='Stats test', category='Test', price=1000,
+                              account_username='x', account_password='x')
+        order = Order(user_id=user.id, total_amount=1000, customer_name='Stats', customer_email='s@example.com')
+        db.session.add_all([account, order])
+        db.session.commit()
+        assert changes(before) == {'accounts_total': 1, 'orders_pending': 1}
+
+        account.is_sold = True
+        order.status = 'completed'
+        db.session.commit()
+        assert changes(before) == {'accounts_total': 1, 'accounts_sold': 1, 'orders_completed': 1, 'revenue': 1000}
+
+        order.status = 'cancelled'
+        db.session.flush()
+        db.session.rollback()
+        assert changes(before) == {'accounts_total': 1, 'accounts_sold': 1, 'orders_completed': 1, 'revenue': 1000}
+
+        db.session.delete(db.session.get(GameAccount, account.id))
+        db.session.delete(db.session.get(Order, order.id))
+        db.session.commit()
+        assert changes(before) == {}
+        assert dashboard_stats.rebuild(dry_run=True) == {}
+
+def test_bulk_release_and_reconcile():
+    """Test expired reservations move counters and reconcile repairs drift, on a throwaway database"""
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(config={'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'stats.db')}"})
+        with app.app_context():
+            db.create_all()
+            user = User(email='stats@example.com', username='stats')
+            user.set_password('password')
+            db.session.add(user)
+            db.session.flush()
+            db.session.add_all([
+                Order(user_id=user.id, total_amount=500, customer_name='Stats', customer_email='s@example.com',
+                      created_at=datetime.utcnow() - timedelta(days=1)),
+                GameAccount(title='Stats test', category='Test', price=1000, account_username='x',
+                            account_password='x'),
+            ])
+            db.session.commit()
+            before = dashboard_stats.counters()
+
+            assert release_expired() == 1
+            assert changes(before) == {'orders_pending': -1, 'orders_cancelled': 1}
+            assert dashboard_stats.rebuild(dry_run=True) == {}
+
+            db.session.execute(db.update(StatsCounter).where(StatsCounter.name == 'accounts_total')
+                               .values(value=StatsCounter.value + 7))
+            db.session.commit()
+            assert dashboard_stats.rebuild() == {'accounts_total': (8, 1)}
+            assert dashboard_stats.rebuild(dry_run=True) == {}
+            db.session.remove()
+            db.engine.dispose()
+
+if __name__ == "__main__":
+    test_counters_follow_order_lifecycle()
+    test_bulk_release_and_reconcile()
+    print("✅ Dashboard stats tests passed!")
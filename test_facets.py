@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test in-memory catalog facets against the database
+"""
+import sys
+import threading
+from collections import Counter
+from app import app, db, catalog_facets
+from models import GameAccount
+from facets import CatalogFacets, facet_key, price_bucket
+
+def test_price_bucket_boundaries():
+    """Test price bucket assignment"""
+    assert price_bucket(0) == 0
+    assert price_bucket(199999) == 0
+    assert price_bucket(200000) == 1
+    assert price_bucket(1200000) == 3
+    assert price_bucket(50000000) == 4
+
+def test_facets_match_database():
+    """Test loaded and incrementally updated facets match a fresh aggregate"""
+    with app.app_context():
+        account = GameAccount(title='Facet test', category='FacetTest', rank='Vàng', price=250000,
+                              account_username='x', account_password='x')
+        db.session.add(account)
+        db.session.commit()
+        try:
+            catalog_facets.invalidate()
+            expected = dict(
+                db.session.query(GameAccount.category, db.func.count(GameAccount.id))
+                .filter_by(is_sold=False).group_by(GameAccount.category).all()
+            )
+            assert dict(catalog_facets.categories()) == expected
+
+            key = facet_key(account)
+            catalog_facets.remove(key)
+            assert dict(catalog_facets.categories()).get(account.category, 0) == expected[account.category] - 1
+            catalog_facets.update(None, key)
+            assert dict(catalog_facets.categories()) == expected
+        finally:
+            db.session.delete(account)
+            db.session.commit()
+            catalog_facets.invalidate()
+
+def test_totals_during_concurrent_updates():
+    """Test reading totals while other threads add and remove facet cells"""
+    facets = CatalogFacets(ttl=0)
+    facets.invalidate()
+    facets._counts = Counter({(f'Seed {i}', '', 0): 1 for i in range(5000)})
+    stop = threading.Event()
+
+    def churn():
+        i = 0
+        while not stop.is_set():
+            key = (f'Category {i % 500}', '', 0)
+            facets.update(None, key)
+            facets.update(key, None)
+            i += 1
+
+    interval = sys.getswitchinterval()
+    # Switch threads often enough for an unlocked iteration to see a resize
+    sys.setswitchinterval(1e-6)
+    worker = threading.Thread(target=churn)
+    worker.start()
+    try:
+        for _ in range(200):
+            assert len(facets.categories()) >= 5000
+    finally:
+        stop.set()
+        worker.join()
+        sys.setswitchinterval(interval)
+
+if __name__ == "__main__":
+    test_price_bucket_boundaries()
+    test_facets_match_database()
+    test_totals_during_concurrent_updates()
+    print("✅ Facet tests passed!")
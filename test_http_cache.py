@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test ETag / conditional GET on the catalog and account detail pages
+"""
+from datetime import datetime, timedelta
+import pytest
+from app import app, db
+from models import GameAccount, User
+from extensions import catalog_cache
+
+def create_account():
+    with app.app_context():
+        account = GameAccount(title='ETag test', description='ETag', category='ETagTest', price=5000,
+                              account_username='x', account_password='x', images=[])
+        db.session.add(account)
+        db.session.commit()
+        catalog_cache.invalidate()
+        return account.id
+
+def test_anonymous_pages_revalidate():
+    """Test anonymous pages are public, strong-validated and change with the data"""
+    account_id = create_account()
+    try:
+        client = app.test_client()
+        for url in ['/?category=ETagTest', f'/account/{account_id}']:
+            response = client.get(url)
+            etag = response.headers['ETag']
+            assert not etag.startswith('W/')
+            assert response.headers['Cache-Control'].startswith('public')
+            assert 'Cookie' in response.headers['Vary']
+            assert 'Set-Cookie' not in response.headers
+
+            cached = client.get(url, headers={'If-None-Match': etag})
+            assert cached.status_code == 304
+            assert cached.data == b''
+
+        with app.app_context():
+            account = db.session.get(GameAccount, account_id)
+            account.price = 6000
+            account.updated_at = datetime.utcnow() + timedelta(seconds=1)
+            db.session.commit()
+            catalog_cache.invalidate({'ETagTest'})
+        changed = client.get(f'/account/{account_id}', headers={'If-None-Match': etag})
+        assert changed.status_code == 200
+        assert changed.headers['ETag'] != etag
+    finally:
+        with app.app_context():
+            GameAccount.query.filter_by(id=account_id).delete()
+            db.session.commit()
+            catalog_cache.invalidate()
+
+def test_signed_in_pages_are_private(monkeypatch):
+    """Test signed-in users get a private, weak ETag distinct from the anonymous one"""
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    with app.app_context():
+        user = User(email='etag@example.com', username='etag', full_name='ETag')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+    try:
+        anonymous_etag = app.test_client().get('/').headers['ETag']
+        client = app.test_client()
+        client.post('/login', data={'email': 'etag@example.com', 'password': 'password'})
+        client.get('/')  # shows and consumes the login flash message
+
+        response = client.get('/')
+        assert response.headers['ETag'].startswith('W/')
+        assert response.headers['ETag'][2:] != anonymous_etag
+        assert response.headers['Cache-Control'] == 'private, no-cache'
+        assert client.get('/', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    finally:
+        with app.app_context():
+            User.query.filter_by(email='etag@example.com').delete()
+            db.session.commit()
+
+if __name__ == "__main__":
+    test_anonymous_pages_revalidate()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_signed_in_pages_are_private(monkeypatch)
+    print("✅ HTTP cache tests passed!")
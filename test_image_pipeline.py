@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test image variant rendering and srcset output
+"""
+import os
+import tempfile
+from PIL import Image
+from app import app, db
+from models import GameAccount, ImageVariant
+from extensions import image_pipeline
+from image_pipeline import render_variants, variant_path
+
+def test_render_variants_widths_and_formats():
+    """Test only narrower widths are produced, each in every requested format"""
+    with tempfile.TemporaryDirectory() as static_folder:
+        os.makedirs(os.path.join(static_folder, 'uploads/accounts'))
+        Image.frombytes('RGBA', (800, 400), os.urandom(800 * 400 * 4)).save(os.path.join(static_folder, 'uploads/accounts/a.png'))
+
+        variants = render_variants(static_folder, 'uploads/accounts/a.png', (320, 640, 1280), ('webp', 'jpeg'))
+        assert [(v['width'], v['format']) for v in variants] == [(320, 'webp'), (320, 'jpeg'), (640, 'webp'), (640, 'jpeg')]
+        assert variants[0]['height'] == 160
+        assert variants[0]['path'] == variant_path('uploads/accounts/a.png', 320, 'webp') == 'uploads/accounts/variants/a-320w.webp'
+        for variant in variants:
+            assert os.path.getsize(os.path.join(static_folder, variant['path'])) == variant['size']
+
+        small = render_variants(static_folder, 'uploads/accounts/a.png', (1280,), ('jpeg',))
+        assert [v['width'] for v in small] == [800]
+
+def test_detail_page_emits_srcset():
+    """Test recorded variants are attached in one query and rendered as srcset"""
+    source = 'uploads/accounts/srcset-test.png'
+    with app.app_context():
+        account = GameAccount(title='Srcset test', category='Test', price=1000,
+                              account_username='x', account_password='x', images=[source])
+        db.session.add(account)
+        image_pipeline.store(source, [
+            {'width': 320, 'height': 180, 'format': 'webp', 'path': variant_path(source, 320, 'webp'), 'size': 10},
+            {'width': 320, 'height': 180, 'format': 'jpeg', 'path': variant_path(source, 320, 'jpeg'), 'size': 20},
+        ])
+        db.session.commit()
+        account_id = account.id
+    try:
+        html = app.test_client().get(f'/account/{account_id}').get_data(as_text=True)
+        assert 'type="image/webp" srcset="/static/uploads/accounts/variants/srcset-test-320w.webp 320w"' in html
+        assert 'srcset="/static/uploads/accounts/variants/srcset-test-320w.jpg 320w"' in html
+    finally:
+        with app.app_context():
+            ImageVariant.query.filter_by(source=source).delete()
+            GameAccount.query.filter_by(id=account_id).delete()
+            db.session.commit()
+
+if __name__ == "__main__":
+    test_render_variants_widths_and_formats()
+    test_detail_page_emits_srcset()
+    print("✅ Image pipeline tests passed!")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test resumable credential key rotation
+"""
+import os
+import tempfile
+from cryptography.fernet import Fernet
+from app import create_app
+from extensions import db
+from models import GameAccount, JobCheckpoint
+from crypto_keys import build_cipher, load_keys
+import key_rotation
+
+def run_rotation(keys, **kwargs):
+    """Rotate with a patched keyring, primary key first"""
+    saved = key_rotation.cipher_suite, key_rotation.encryption_key
+    key_rotation.cipher_suite, key_rotation.encryption_key = build_cipher(keys), keys[0]
+    try:
+        return key_rotation.rotate_credentials(**kwargs)
+    finally:
+        key_rotation.cipher_suite, key_rotation.encryption_key = saved
+
+def test_load_keys_order():
+    """Test ENCRYPTION_KEYS wins over ENCRYPTION_KEY and keeps order"""
+    first, second = Fernet.generate_key(), Fernet.generate_key()
+    keys = load_keys({'ENCRYPTION_KEYS': f'{first.decode()}, {second.decode()}', 'ENCRYPTION_KEY': 'ignored'})
+    assert keys == [first, second]
+
+def test_rotate_and_resume():
+    """Test an interrupted rotation resumes from its checkpoint and skips rotated rows, on a throwaway database"""
+    old_key = key_rotation.encryption_key
+    new_key = Fernet.generate_key()
+    old_cipher, new_cipher = Fernet(old_key), Fernet(new_key)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(config={'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'rotation.db')}"})
+        with app.app_context():
+            db.create_all()
+            accounts = [GameAccount(title=f'Rotation test {i}', category='Test', price=0,
+                                    account_username=old_cipher.encrypt(f'user{i}'.encode()).decode(),
+                                    account_password=old_cipher.encrypt(f'pass{i}'.encode()).decode())
+                        for i in range(3)]
+            db.session.add_all(accounts)
+            db.session.commit()
+            ids = [account.id for account in accounts]
+
+            def interrupt(processed, remaining, rate, eta, totals):
+                raise RuntimeError('worker killed')
+
+            # Stopped right after the first batch was committed
+            try:
+                run_rotation([new_key, old_key], batch_size=2, restart=True, progress=interrupt)
+                raise AssertionError('rotation was not interrupted')
+            except RuntimeError:
+                pass
+            checkpoint = JobCheckpoint.load(key_rotation.CHECKPOINT_NAME)
+            assert (checkpoint.position, checkpoint.details['rotated']) == (ids[1], 2)
+            db.session.commit()
+
+            # Resumes after the checkpoint: only the third row is read and re-encrypted
+            totals = run_rotation([new_key, old_key], batch_size=2)
+            assert (totals['processed'], totals['rotated'], totals['skipped']) == (1, 3, 0)
+            for i, account_id in enumerate(ids):
+                account = db.session.get(GameAccount, account_id)
+                db.session.refresh(account)
+                assert new_cipher.decrypt(account.account_username.encode()).decode() == f'user{i}'
+                assert new_cipher.decrypt(account.account_password.encode()).decode() == f'pass{i}'
+            assert JobCheckpoint.load(key_rotation.CHECKPOINT_NAME).position == max(ids)
+            assert run_rotation([new_key, old_key], batch_size=2)['processed'] == 0
+
+            # A restart reads everything again but leaves already rotated rows alone
+            totals = run_rotation([new_key, old_key], batch_size=2, restart=True)
+            assert (totals['processed'], totals['rotated'], totals['skipped']) == (3, 0, 3)
+            db.session.remove()
+            db.engine.dispose()
+
+if __name__ == "__main__":
+    test_load_keys_order()
+    test_rotate_and_resume()
+    print("✅ Key rotation tests passed!")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test keyset pagination walks the catalog in the same order as OFFSET paging
+"""
+from app import app, db
+from models import GameAccount
+from keyset import SORT_OPTIONS, keyset_paginate, order_by_sort, decode_cursor, encode_cursor
+from query_profiler import query_budget
+
+def test_keyset_matches_offset_order():
+    """Test every sort option returns the same rows as ORDER BY without gaps"""
+    with app.app_context():
+        for sort in SORT_OPTIONS:
+            expected = [a.id for a in order_by_sort(GameAccount.query, GameAccount, sort).all()]
+            seen = []
+            cursor = None
+            while True:
+                page = keyset_paginate(GameAccount.query, GameAccount, sort, cursor, per_page=2)
+                seen.extend(a.id for a in page.items)
+                if not page.has_next:
+                    break
+                cursor = page.next_cursor
+            assert seen == expected, sort
+
+def test_malformed_cursor_is_ignored():
+    """Test a tampered cursor falls back to the first page"""
+    assert decode_cursor('not-a-cursor', 'newest') is None
+    assert decode_cursor(encode_cursor('x', 1), 'price_asc') is None
+    assert decode_cursor(encode_cursor('nan', 1), 'price_desc') is None
+    assert decode_cursor(encode_cursor(150000, 7), 'price_asc') == (150000.0, 7)
+    client = app.test_client()
+    assert client.get('/?cursor=not-a-cursor').status_code == 200
+    assert client.get(f"/?sort=price_asc&cursor={encode_cursor('x', 1)}").status_code == 200
+
+def test_next_links_use_cursors():
+    """Test the catalog links to cursor pages, which skip OFFSET and COUNT, and old page links still work"""
+    with app.app_context():
+        accounts = [GameAccount(title=f'Keyset link {i}', description='Test', category='KeysetLinks', price=1000 + i,
+                                account_username='x', account_password='x') for i in range(13)]
+        db.session.add_all(accounts)
+        db.session.commit()
+    try:
+        client = app.test_client()
+        with query_budget(50) as budget:
+            page = client.get('/?category=KeysetLinks&sort=price_asc').get_data(as_text=True)
+        assert 'cursor=' in page and 'page=2' not in page
+        # No paginate() COUNT over the filtered catalog on the cursor path
+        assert not any(statement.lower().startswith('select count(*)') for statement in budget.statements)
+        assert client.get('/?category=KeysetLinks&page=2').status_code == 200
+    finally:
+        with app.app_context():
+            GameAccount.query.filter_by(category='KeysetLinks').delete()
+            db.session.commit()
+
+if __name__ == "__main__":
+    test_keyset_matches_offset_order()
+    test_malformed_cursor_is_ignored()
+    test_next_links_use_cursors()
+    print("✅ Keyset pagination tests passed!")
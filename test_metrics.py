@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test the /metrics endpoint and aggregation across worker processes
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from app import app
+from extensions import metrics
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+WORKER = """
+from app import app
+client = app.test_client()
+for _ in range(3):
+    client.get('/health')
+"""
+
+SCRAPE = """
+import sys
+from prometheus_client import multiprocess
+from app import app
+for pid in sys.argv[1:]:
+    multiprocess.mark_process_dead(int(pid))
+print(app.test_client().get('/metrics').get_data(as_text=True))
+"""
+
+def sample(text, name):
+    for line in text.splitlines():
+        series, _, value = line.rpartition(' ')
+        if series == name:
+            return float(value)
+    return None
+
+def test_metrics_endpoint():
+    """Test latency, pool, audit queue and cache series are exported, behind the token if set"""
+    client = app.test_client()
+    client.get('/health')
+    text = client.get('/metrics').get_data(as_text=True)
+    assert sample(text, 'shop_request_duration_seconds_count{endpoint="main.health_check",method="GET",status="200"}') >= 1
+    assert sample(text, 'shop_requests_in_flight') == 1
+    assert sample(text, 'shop_db_pool_connections{state="checked_out"}') is not None
+    assert sample(text, 'shop_audit_queue_depth') is not None
+    assert sample(text, 'shop_cache_hit_ratio{cache="user"}') is not None
+
+    metrics.token = 'secret'
+    try:
+        assert client.get('/metrics').status_code == 401
+        assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
+    finally:
+        metrics.token = None
+
+def test_workers_are_aggregated():
+    """Test a scrape of one process sums the requests of every process sharing the directory"""
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory)
+        workers = [subprocess.Popen([sys.executable, '-c', WORKER], cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+                   for _ in range(2)]
+        for worker in workers:
+            assert worker.wait() == 0
+        text = subprocess.run([sys.executable, '-c', SCRAPE] + [str(worker.pid) for worker in workers],
+                              cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    assert sample(text, 'shop_request_duration_seconds_count{endpoint="main.health_check",method="GET",status="200"}') == 6
+    # Only the scraping process is alive and handling a request
+    assert sample(text, 'shop_requests_in_flight') == 1
+
+if __name__ == "__main__":
+    test_metrics_endpoint()
+    test_workers_are_aggregated()
+    print("✅ Metrics tests passed!")
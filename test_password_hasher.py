@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test pooled password hashing, queue limit and rehash-on-login
+"""
+import threading
+from werkzeug.security import generate_password_hash
+from app import app
+from models import User
+from extensions import password_hasher
+from password_hasher import PasswordHasher, HasherBusy, normalize_method
+
+def test_pool_roundtrip_and_histogram():
+    """Test hash/verify in worker processes and latency recording"""
+    hasher = PasswordHasher()
+    hasher.workers = 1
+    try:
+        pwhash = hasher.hash('secret')
+        assert hasher.verify(pwhash, 'secret')
+        assert not hasher.verify(pwhash, 'wrong')
+        assert not hasher.needs_rehash(pwhash)
+        stats = hasher.stats()
+        assert stats['completed'] == 3
+        assert sum(stats['latency']['verify'].values()) == 2
+    finally:
+        hasher.shutdown()
+
+def test_queue_limit_rejects():
+    """Test operations beyond the queue limit fail fast with HasherBusy"""
+    hasher = PasswordHasher()
+    hasher.workers = 0
+    hasher.queue_limit = 1
+    hasher._slots = threading.BoundedSemaphore(1)
+    hasher._slots.acquire()
+    try:
+        hasher.hash('secret')
+        assert False, 'expected HasherBusy'
+    except HasherBusy:
+        pass
+    hasher._slots.release()
+    assert hasher.stats()['rejected'] == 1
+
+def test_rehash_on_login():
+    """Test a hash with outdated parameters is upgraded after a correct password"""
+    assert normalize_method('pbkdf2') == normalize_method('pbkdf2:sha256')
+    with app.app_context():
+        user = User(email='rehash@example.com', username='rehash')
+        user.password_hash = generate_password_hash('secret', 'pbkdf2:sha256:1000')
+        old_hash = user.password_hash
+        assert not user.check_password('wrong')
+        assert user.password_hash == old_hash
+        assert user.check_password('secret')
+        assert user.password_hash != old_hash
+        assert not password_hasher.needs_rehash(user.password_hash)
+        assert user.check_password('secret')
+
+if __name__ == "__main__":
+    test_pool_roundtrip_and_histogram()
+    test_queue_limit_rejects()
+    test_rehash_on_login()
+    print("✅ Password hasher tests passed!")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test that list pages issue a constant number of queries regardless of row count
+"""
+import threading
+import pytest
+from sqlalchemy import event
+from app import app, db
+from models import User, GameAccount, Order, CartItem, Wishlist
+from extensions import cipher_suite
+
+def count_queries(client, url):
+    """Count SQL statements issued by this thread while fetching ``url``"""
+    statements = []
+    thread_id = threading.get_ident()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread_id:
+            statements.append(statement)
+
+    # Warm per-worker caches (user loader) so only the page itself is measured
+    client.get(url)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200, url
+    return len(statements)
+
+def add_rows(user_id, n):
+    """Add n orders with an account each, plus n cart and wishlist items"""
+    secret = cipher_suite.encrypt(b'test').decode()
+    for i in range(n):
+        order = Order(user_id=user_id, total_amount=1000, customer_name='Test',
+                      customer_email='test@example.com', status='completed')
+        db.session.add(order)
+        db.session.flush()
+        sold = GameAccount(title=f'N+1 test {i}', category='Test', price=1000, is_sold=True,
+                           account_username=secret, account_password=secret, order_id=order.id)
+        listed = GameAccount(title=f'N+1 test listed {i}', description='Test', category='Test', price=1000, is_sold=True,
+                             account_username=secret, account_password=secret)
+        db.session.add_all([sold, listed])
+        db.session.flush()
+        db.session.add(CartItem(user_id=user_id, account_id=listed.id))
+        db.session.add(Wishlist(user_id=user_id, account_id=listed.id))
+    db.session.commit()
+
+def test_list_pages_constant_queries(monkeypatch):
+    """Test orders, cart, wishlist and order detail pages do not scale queries with rows"""
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    with app.app_context():
+        user = User(email='nplusone@example.com', username='nplusone', full_name='N+1')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    try:
+        client = app.test_client()
+        client.post('/login', data={'email': 'nplusone@example.com', 'password': 'password'})
+        pages = ['/orders', '/cart', '/wishlist', '/checkout']
+
+        with app.app_context():
+            add_rows(user_id, 2)
+        small = {url: count_queries(client, url) for url in pages}
+
+        with app.app_context():
+            add_rows(user_id, 6)
+            order_id = Order.query.filter_by(user_id=user_id).first().id
+        large = {url: count_queries(client, url) for url in pages}
+
+        assert small == large
+        assert count_queries(client, f'/order/{order_id}') <= 4
+    finally:
+        with app.app_context():
+            orders = Order.query.filter_by(user_id=user_id).all()
+            CartItem.query.filter_by(user_id=user_id).delete()
+            Wishlist.query.filter_by(user_id=user_id).delete()
+            GameAccount.query.filter(GameAccount.title.like('N+1 test%')).delete(synchronize_session=False)
+            for order in orders:
+                db.session.delete(order)
+            db.session.delete(db.session.get(User, user_id))
+            db.session.commit()
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_list_pages_constant_queries(monkeypatch)
+    print("✅ Query count tests passed!")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test per-request query profiling, Server-Timing headers, the admin page and query budgets
+"""
+import threading
+import pytest
+from flask import g
+from sqlalchemy.exc import OperationalError
+from app import app, db
+from models import User
+from extensions import query_profiler, user_cache
+from query_profiler import QueryBudgetExceeded, RequestProfile, query_budget
+
+def test_server_timing_and_history():
+    """Test requests land in the ring buffer, and anonymous responses carry no Server-Timing"""
+    client = app.test_client()
+    response = client.get('/health')
+    assert 'Server-Timing' not in response.headers
+
+    latest = query_profiler.stats(limit=1)['requests'][0]
+    assert (latest['endpoint'], latest['path'], latest['status'], latest['queries']) == ('main.health_check', '/health', 200, 1)
+    assert latest['slowest'][0]['statement'].upper().startswith('SELECT 1')
+    assert query_profiler.stats()['endpoints']['main.health_check']['max_queries'] == 1
+
+def test_failed_statements_leave_nothing_behind():
+    """Test failing statements leave no timing state on the pooled connection"""
+    with app.app_context():
+        g.query_profile = RequestProfile(5)
+        with db.engine.connect() as connection:
+            before = repr(connection.info)
+            for _ in range(3):
+                try:
+                    connection.exec_driver_sql('SELECT * FROM no_such_table')
+                except OperationalError:
+                    connection.rollback()
+            connection.exec_driver_sql('SELECT 1')
+            assert repr(connection.info) == before
+        assert g.query_profile.queries == 1
+
+def test_admin_page(monkeypatch):
+    """Test only admins can read the profiler page, and only they get Server-Timing"""
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    with app.app_context():
+        admin = User(email='profiler@example.com', username='profiler', role='admin')
+        admin.set_password('password')
+        db.session.add(admin)
+        db.session.commit()
+        user_cache.invalidate(admin.id)
+    try:
+        client = app.test_client()
+        assert client.get('/admin/query-profiler').status_code == 302
+        client.post('/login', data={'email': 'profiler@example.com', 'password': 'password'})
+        timings = client.get('/orders').headers.getlist('Server-Timing')
+        assert timings[0].startswith('db;dur=') and timings[0].endswith(' queries"')
+        assert timings[1].startswith('app;dur=')
+        data = client.get('/admin/query-profiler?limit=5').get_json()
+        assert data['enabled'] and len(data['requests']) <= 5
+        assert 'main.orders' in data['endpoints']
+    finally:
+        with app.app_context():
+            User.query.filter_by(email='profiler@example.com').delete()
+            db.session.commit()
+
+def test_query_budget():
+    """Test query_budget passes within budget, fails over it and ignores other threads"""
+    client = app.test_client()
+    with query_budget(1) as budget:
+        client.get('/health')
+    assert len(budget.statements) == 1
+
+    try:
+        with query_budget(0):
+            client.get('/health')
+        assert False, "budget not enforced"
+    except QueryBudgetExceeded as e:
+        assert '1 queries, budget is 0' in str(e) and 'SELECT 1' in str(e)
+
+    @query_budget(0)
+    def background_only():
+        worker = threading.Thread(target=client.get, args=('/health',))
+        worker.start()
+        worker.join()
+    background_only()
+
+if __name__ == "__main__":
+    test_server_timing_and_history()
+    test_failed_statements_leave_nothing_behind()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_admin_page(monkeypatch)
+    test_query_budget()
+    print("✅ Query profiler tests passed!")
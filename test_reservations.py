@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test checkout reservations cannot double-assign an account
+"""
+from datetime import datetime, timedelta
+import pytest
+from app import app, db
+from models import User, GameAccount, Order
+from extensions import cipher_suite, user_cache
+from reservations import reserve, release_expired, ReservationError
+
+def test_reserve_is_exclusive_and_expires():
+    """Test a held account cannot be reserved twice and expired holds are released"""
+    with app.app_context():
+        user = User.query.first()
+        secret = cipher_suite.encrypt(b'test').decode()
+        account = GameAccount(title='Reservation test', description='Test', category='Test', price=1000,
+                              account_username=secret, account_password=secret)
+        paying = GameAccount(title='Reservation test paying', description='Test', category='Test', price=1000,
+                             account_username=secret, account_password=secret)
+        first = Order(user_id=user.id, total_amount=1000, customer_name='A', customer_email='a@example.com',
+                      created_at=datetime.utcnow() - timedelta(hours=2))
+        second = Order(user_id=user.id, total_amount=1000, customer_name='B', customer_email='b@example.com')
+        # Past the TTL but already being paid: keeps its hold
+        processing = Order(user_id=user.id, total_amount=1000, customer_name='C', customer_email='c@example.com',
+                           status='processing', created_at=datetime.utcnow() - timedelta(hours=2))
+        db.session.add_all([account, paying, first, second, processing])
+        db.session.commit()
+
+        try:
+            reserve([account.id], first.id)
+            reserve([paying.id], processing.id)
+            db.session.commit()
+
+            try:
+                reserve([account.id], second.id)
+                raise AssertionError('account reserved twice')
+            except ReservationError as e:
+                assert e.unavailable_ids == {account.id}
+                db.session.rollback()
+
+            assert release_expired() >= 1
+            db.session.refresh(account)
+            db.session.refresh(first)
+            assert account.order_id is None
+            assert first.status == 'cancelled'
+            db.session.refresh(paying)
+            assert paying.order_id == processing.id
+            # Counts only orders it cancelled
+            assert release_expired() == 0
+
+            reserve([account.id], second.id)
+            db.session.commit()
+            db.session.refresh(account)
+            assert account.order_id == second.id
+        finally:
+            db.session.delete(account)
+            db.session.delete(paying)
+            db.session.delete(first)
+            db.session.delete(second)
+            db.session.delete(processing)
+            db.session.commit()
+
+def test_expired_order_cannot_be_paid(monkeypatch):
+    """Test confirming or completing payment of an order cancelled by the hold TTL is refused"""
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    with app.app_context():
+        users = []
+        for email, role in (('payer@example.com', 'user'), ('cashier@example.com', 'admin')):
+            user = User(email=email, username=email.split('@')[0], role=role)
+            user.set_password('password')
+            users.append(user)
+        db.session.add_all(users)
+        db.session.flush()
+        secret = cipher_suite.encrypt(b'test').decode()
+        accounts = [GameAccount(title=f'Expiry test {i}', description='Test', category='Test', price=1000,
+                                account_username=secret, account_password=secret) for i in range(2)]
+        expired = Order(user_id=users[0].id, total_amount=1000, customer_name='A', customer_email='a@example.com',
+                        created_at=datetime.utcnow() - timedelta(hours=2))
+        fresh = Order(user_id=users[0].id, total_amount=1000, customer_name='A', customer_email='a@example.com')
+        db.session.add_all(accounts + [expired, fresh])
+        db.session.flush()
+        reserve([accounts[0].id], expired.id)
+        reserve([accounts[1].id], fresh.id)
+        db.session.commit()
+        ids = [account.id for account in accounts], expired.id, fresh.id
+        for user in users:
+            # SQLite reuses ids of users deleted by earlier tests
+            user_cache.invalidate(user.id)
+        assert release_expired() >= 1
+
+    account_ids, expired_id, fresh_id = ids
+    try:
+        customer = app.test_client()
+        customer.post('/login', data={'email': 'payer@example.com', 'password': 'password'})
+        admin = app.test_client()
+        admin.post('/login', data={'email': 'cashier@example.com', 'password': 'password'})
+
+        assert customer.post(f'/payment/{expired_id}/confirm').status_code == 409
+        assert admin.post(f'/admin/order/{expired_id}/complete-payment').status_code == 409
+        with app.app_context():
+            assert db.session.get(Order, expired_id).status == 'cancelled'
+            assert db.session.get(GameAccount, account_ids[0]).is_sold is False
+
+        assert customer.post(f'/payment/{fresh_id}/confirm').status_code == 200
+        assert customer.post(f'/payment/{fresh_id}/confirm').status_code == 409
+        assert admin.post(f'/admin/order/{fresh_id}/complete-payment').status_code == 200
+        assert admin.post(f'/admin/order/{fresh_id}/complete-payment').status_code == 409
+        with app.app_context():
+            assert db.session.get(Order, fresh_id).status == 'completed'
+            assert db.session.get(GameAccount, account_ids[1]).is_sold is True
+    finally:
+        with app.app_context():
+            GameAccount.query.filter(GameAccount.id.in_(account_ids)).delete(synchronize_session=False)
+            Order.query.filter(Order.id.in_([expired_id, fresh_id])).delete(synchronize_session=False)
+            User.query.filter(User.email.in_(['payer@example.com', 'cashier@example.com'])).delete(synchronize_session=False)
+            db.session.commit()
+
+if __name__ == "__main__":
+    test_reserve_is_exclusive_and_expires()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_expired_order_cannot_be_paid(monkeypatch)
+    print("✅ Reservation tests passed!")
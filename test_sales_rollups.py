@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test incremental daily sales rollups and the time-series endpoint
+"""
+from datetime import datetime, timedelta
+import pytest
+from app import app, db
+from models import GameAccount, Order, User, SalesRollup
+from extensions import sales_rollups, user_cache
+
+DAY = datetime.utcnow() - timedelta(days=3)
+
+def rollup_rows():
+    rows = SalesRollup.query.filter(SalesRollup.category.in_(['RollupA', 'RollupB'])).all()
+    return {(row.category, row.day): (row.revenue, row.orders, row.units) for row in rows if row.orders}
+
+def day_totals():
+    """DAY's point of the all-category series; must equal the totals"""
+    data = sales_rollups.series(DAY.date(), DAY.date(), by='day')
+    point = data['series']['all'][0] if data['series'] else {'revenue': 0, 'orders': 0, 'units': 0}
+    assert {field: point[field] for field in data['totals']} == data['totals']
+    return data['totals']
+
+def test_rollups_follow_completion_and_backfill(monkeypatch):
+    """Test completing/cancelling orders updates rollups and backfill rebuilds the same rows"""
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    with app.app_context():
+        admin = User(email='rollup@example.com', username='rollup', role='admin')
+        admin.set_password('password')
+        db.session.add(admin)
+        db.session.flush()
+        order = Order(user_id=admin.id, total_amount=3500, customer_name='Rollup',
+                      customer_email='rollup@example.com', created_at=DAY)
+        db.session.add(order)
+        db.session.flush()
+        db.session.add_all([
+            GameAccount(title='Rollup 1', category='RollupA', price=1000, order_id=order.id,
+                        account_username='x', account_password='x'),
+            GameAccount(title='Rollup 2', category='RollupA', price=1500, order_id=order.id,
+                        account_username='x', account_password='x'),
+            GameAccount(title='Rollup 3', category='RollupB', price=1000, order_id=order.id,
+                        account_username='x', account_password='x'),
+        ])
+        db.session.commit()
+        order_id = order.id
+        # SQLite reuses ids of users deleted by earlier tests
+        user_cache.invalidate(admin.id)
+        assert rollup_rows() == {}
+
+    try:
+        with app.app_context():
+            before = day_totals()
+            db.session.get(Order, order_id).status = 'completed'
+            db.session.commit()
+            incremental = rollup_rows()
+            assert incremental == {('RollupA', DAY.date()): (2500, 1, 2), ('RollupB', DAY.date()): (1000, 1, 1)}
+            # The order spans two categories but is one order in the all-category series
+            expected = {'revenue': before['revenue'] + 3500, 'orders': before['orders'] + 1,
+                        'units': before['units'] + 3}
+            assert day_totals() == expected
+
+            sales_rollups.backfill(DAY.date() - timedelta(days=1))
+            assert rollup_rows() == incremental
+            assert day_totals() == expected
+
+        client = app.test_client()
+        client.post('/login', data={'email': 'rollup@example.com', 'password': 'password'})
+        data = client.get('/admin/stats/sales?days=7&by=category&category=RollupA').get_json()
+        points = data['series']['RollupA']
+        assert len(points) == 7
+        assert {'day': DAY.date().isoformat(), 'revenue': 2500, 'orders': 1, 'units': 2} in points
+        assert data['totals'] == {'revenue': 2500, 'orders': 1, 'units': 2}
+        assert client.get('/admin/stats/sales?start=2024-02-30').status_code == 400
+
+        with app.app_context():
+            db.session.get(Order, order_id).status = 'cancelled'
+            db.session.commit()
+            assert rollup_rows() == {}
+    finally:
+        with app.app_context():
+            GameAccount.query.filter_by(order_id=order_id).delete()
+            Order.query.filter_by(id=order_id).delete()
+            User.query.filter_by(email='rollup@example.com').delete()
+            SalesRollup.query.filter(SalesRollup.category.in_(['RollupA', 'RollupB'])).delete()
+            db.session.commit()
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_rollups_follow_completion_and_backfill(monkeypatch)
+    print("✅ Sales rollup tests passed!")
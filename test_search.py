@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test diacritic folding and in-memory search ranking
+"""
+from app import app, db
+from models import GameAccount
+from search import MemorySearchBackend, PostgresSearchBackend, SearchIndex, fold, tokenize
+
+def test_fold_vietnamese():
+    """Test diacritic folding"""
+    assert fold('Liên Quân') == 'lien quan'
+    assert fold('ĐẦY ĐỦ') == 'day du'
+    assert tokenize('Thách Đấu 100 sao!') == ['thach', 'dau', '100', 'sao']
+
+def test_memory_backend_ranking():
+    """Test AND matching, prefix matching and title weighting"""
+    backend = MemorySearchBackend()
+    backend._loaded = True
+    backend._add(1, 'Free Fire - Tài Khoản VIP', 'Rank Thách Đấu')
+    backend._add(2, 'Liên Quân Mobile', 'Skin Murad, rank Thách Đấu')
+    backend._add(3, 'Thách Đấu Liên Quân', 'Full tướng')
+
+    assert backend.search('lien quan') == [3, 2]
+    assert backend.search('thach dau')[0] == 3
+    assert backend.search('mur') == [2]
+    assert backend.search('lien vip') == []
+
+    backend._remove(3)
+    assert backend.search('lien quan') == [2]
+
+def test_workers_see_each_others_changes_and_filters_apply_before_the_cap():
+    """Test a change indexed by one worker reaches another's index, and the result cap follows the filters"""
+    with app.app_context():
+        first = MemorySearchBackend(max_results=2, ttl=300, version_check=0)
+        second = MemorySearchBackend(max_results=2, ttl=300, version_check=0)
+        accounts = [GameAccount(title=f'Zyxsearch {"zyxsearch " * (3 - i)}', description='Test',
+                                category='SearchB' if i == 2 else 'SearchA', price=1000,
+                                account_username='x', account_password='x') for i in range(3)]
+        try:
+            assert first.search('zyxsearch') == [] and second.search('zyxsearch') == []
+            db.session.add_all(accounts)
+            db.session.commit()
+            for account in accounts:
+                first.index_account(account)
+            ids = [account.id for account in accounts]
+            assert first.search('zyxsearch') == ids
+            # The other worker notices the bumped version stamp and reloads
+            assert second.search('zyxsearch') == ids
+
+            # The only SearchB match ranks third, past max_results
+            filtered = GameAccount.query.filter_by(category='SearchB')
+            assert [a.id for a in second.apply(filtered, 'zyxsearch')] == [ids[2]]
+            assert [a.id for a in second.apply(GameAccount.query, 'zyxsearch')] == ids[:2]
+
+            accounts[0].is_sold = True
+            db.session.commit()
+            first.remove(ids[0])
+            assert second.search('zyxsearch') == ids[1:]
+
+            # A sold order's accounts leave the index with one version bump
+            for account in accounts[1:]:
+                account.is_sold = True
+            db.session.commit()
+            version = first._read_version()
+            first.remove_many(ids[1:])
+            assert first._read_version() == version + 1
+            assert second.search('zyxsearch') == []
+        finally:
+            GameAccount.query.filter(GameAccount.title.like('Zyxsearch%')).delete(synchronize_session=False)
+            db.session.commit()
+
+class MissingUnaccent(PostgresSearchBackend):
+    """Postgres search on a database where init-db could not create shop_unaccent"""
+
+    def available(self):
+        return False
+
+def test_postgres_backend_falls_back_in_every_process():
+    """Test a process that did not run init-db switches to the in-memory index on first use"""
+    index = SearchIndex()
+    index.max_results, index.ttl, index.version_check = 1000, None, None
+    index.backend, index._verified = MissingUnaccent(), False
+    with app.app_context():
+        query = index.apply(GameAccount.query, 'zyxfallback')
+        assert isinstance(index.backend, MemorySearchBackend)
+        assert query.all() == []
+
+if __name__ == "__main__":
+    test_fold_vietnamese()
+    test_memory_backend_ranking()
+    test_workers_see_each_others_changes_and_filters_apply_before_the_cap()
+    test_postgres_backend_falls_back_in_every_process()
+    print("✅ Search tests passed!")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test the synthetic data seeder on throwaway databases
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from extensions import cipher_suite
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def seed(database, *args):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}')
+    for command in (['init-db', '--no-seed'], ['seed', '--users', '40', '--accounts', '600', '--batch-size', '128', *args]):
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', *command], cwd=ROOT, env=env,
+                       capture_output=True, text=True, check=True)
+    return sqlite3.connect(database)
+
+def snapshot(connection):
+    """Every seeded row except ciphertexts and timestamps, which depend on when the seeder ran"""
+    return {
+        'users': connection.execute('SELECT id, email, full_name FROM users ORDER BY id').fetchall(),
+        'accounts': connection.execute('SELECT id, title, category, rank, price, is_sold, order_id '
+                                       'FROM game_accounts ORDER BY id').fetchall(),
+        'orders': connection.execute('SELECT id, user_id, total_amount, status FROM orders ORDER BY id').fetchall(),
+        'carts': connection.execute('SELECT user_id, account_id FROM cart_items ORDER BY id').fetchall(),
+        'audit': connection.execute('SELECT user_id, action FROM audit_logs ORDER BY id').fetchall(),
+    }
+
+def test_seed_is_consistent_and_deterministic():
+    """Test row counts, order/account consistency, counters and that the same seed gives the same data"""
+    with tempfile.TemporaryDirectory() as tmp:
+        first = seed(os.path.join(tmp, 'a.db'), '--workers', '1')
+        second = seed(os.path.join(tmp, 'b.db'), '--workers', '2')
+        other = seed(os.path.join(tmp, 'c.db'), '--seed', '7', '--workers', '1')
+        try:
+            data = snapshot(first)
+            assert data == snapshot(second)
+            assert data['accounts'] != snapshot(other)['accounts']
+
+            assert (len(data['users']), len(data['accounts']), len(data['orders'])) == (40, 600, 120)
+            assert {row[2] for row in data['accounts']} >= {'Liên Quân Mobile', 'Free Fire'}
+            assert data['carts'] and data['audit']
+            # Completed orders own sold accounts summing to their total; cancelled ones hold nothing
+            for order_id, _, total, status in data['orders']:
+                held = first.execute('SELECT SUM(price), MIN(is_sold) FROM game_accounts WHERE order_id = ?',
+                                     (order_id,)).fetchone()
+                if status == 'cancelled':
+                    assert held == (None, None)
+                else:
+                    assert held == (total, 1 if status == 'completed' else 0)
+
+            username, = first.execute('SELECT account_username FROM game_accounts LIMIT 1').fetchone()
+            assert cipher_suite.decrypt(username.encode()).decode().count('_') == 1
+            counters = dict(first.execute('SELECT name, value FROM stats_counters'))
+            assert counters['accounts_total'] == 600
+            assert counters['orders_completed'] == sum(1 for row in data['orders'] if row[3] == 'completed')
+        finally:
+            for connection in (first, second, other):
+                connection.close()
+
+if __name__ == "__main__":
+    test_seed_is_consistent_and_deterministic()
+    print("✅ Seed data tests passed!")
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Test gunicorn worker sizing and the matching database pool
+"""
+import os
+import runpy
+from unittest import mock
+
+from app import create_app
+from server_profile import check_connection_limit, engine_options, load_profile, max_connections
+
+def test_gthread_profile():
+    """Test workers follow the CPU count and the pool has one connection per thread"""
+    profile = load_profile({}, cpu_count=2)
+    assert (profile.worker_class, profile.workers, profile.threads) == ('gthread', 5, 4)
+    assert profile.pool_size == 4
+    assert load_profile({}, cpu_count=16).workers == 8
+    assert load_profile({'WEB_CONCURRENCY': '3', 'GUNICORN_THREADS': '8'}, cpu_count=2)[1:5] == (3, 8, 100, 8)
+
+def test_gevent_profile():
+    """Test gevent workers get one thread and a bounded pool shared by their greenlets"""
+    profile = load_profile({'GUNICORN_WORKER_CLASS': 'gevent', 'GUNICORN_WORKER_CONNECTIONS': '500'}, cpu_count=1)
+    assert (profile.threads, profile.worker_connections, profile.pool_size) == (1, 500, 10)
+    try:
+        load_profile({'GUNICORN_WORKER_CLASS': 'eventlet'})
+        assert False, "unknown worker class accepted"
+    except ValueError:
+        pass
+
+def test_connection_limit_warning():
+    """Test the warning fires only when all workers' pools exceed the database limit"""
+    profile = load_profile({'WEB_CONCURRENCY': '4'}, cpu_count=1)
+    assert max_connections(profile) == 4 * (4 + 3)
+    assert check_connection_limit(profile, None) is None
+    assert check_connection_limit(profile, 28) is None
+    assert '28 connections' in check_connection_limit(profile, 20)
+
+def test_engine_options_and_gunicorn_config():
+    """Test create_app() pools non-SQLite databases and gunicorn.conf.py reads the same profile"""
+    environ = {'DATABASE_URL': 'postgresql+psycopg2://shop@localhost/shop', 'WEB_CONCURRENCY': '2', 'DB_POOL_SIZE': '6'}
+    with mock.patch.dict(os.environ, environ):
+        options = create_app().config['SQLALCHEMY_ENGINE_OPTIONS']
+        settings = runpy.run_path('gunicorn.conf.py')
+    assert options == engine_options(load_profile(environ))
+    assert options['pool_size'] == 6 and options['pool_pre_ping']
+    assert (settings['workers'], settings['worker_class']) == (2, 'gthread')
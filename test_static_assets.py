@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test static asset fingerprinting, precompression and cache headers
+"""
+import gzip
+import os
+import tempfile
+from flask import url_for
+from app import app
+from extensions import static_assets
+from static_assets import build_assets, DIST_DIR, MANIFEST_NAME
+
+def make_static(root):
+    os.makedirs(os.path.join(root, 'css'))
+    os.makedirs(os.path.join(root, 'uploads/accounts'))
+    with open(os.path.join(root, 'css/style.css'), 'w') as f:
+        f.write('body { color: red; }\n' * 200)
+    with open(os.path.join(root, 'uploads/accounts/' + 'a' * 64 + '.png'), 'wb') as f:
+        f.write(b'png bytes')
+
+def test_build_manifest_and_siblings():
+    """Test files get hashed names and compressed siblings; uploads are skipped"""
+    with tempfile.TemporaryDirectory() as root:
+        make_static(root)
+        manifest = build_assets(root)
+        assert list(manifest) == ['css/style.css']
+        built = os.path.join(root, manifest['css/style.css'])
+        assert manifest['css/style.css'].startswith(f'{DIST_DIR}/css/style.')
+        with open(built + '.gz', 'rb') as f:
+            assert gzip.decompress(f.read()) == open(built, 'rb').read()
+        assert os.path.exists(built + '.br')
+        assert os.path.exists(os.path.join(root, DIST_DIR, MANIFEST_NAME))
+
+def test_fingerprinted_urls_and_headers():
+    """Test url_for resolves through the manifest and serves immutable, precompressed files"""
+    saved = static_assets.static_folder, static_assets.manifest, static_assets.fingerprinted
+    with tempfile.TemporaryDirectory() as root:
+        make_static(root)
+        build_assets(root)
+        static_assets.static_folder = root
+        static_assets.load(os.path.join(root, DIST_DIR, MANIFEST_NAME))
+        try:
+            with app.test_request_context():
+                css_url = url_for('static', filename='css/style.css')
+                assert css_url.startswith('/static/dist/css/style.')
+                assert url_for('static', filename='js/other.js') == '/static/js/other.js'
+
+            client = app.test_client()
+            response = client.get(css_url, headers={'Accept-Encoding': 'gzip, br'})
+            assert response.headers['Content-Encoding'] == 'br'
+            assert response.headers['Content-Type'].startswith('text/css')
+            assert 'immutable' in response.headers['Cache-Control']
+            assert 'Accept-Encoding' in response.headers['Vary']
+
+            plain = client.get(css_url)
+            assert 'Content-Encoding' not in plain.headers
+            assert plain.get_data(as_text=True).startswith('body { color: red; }')
+
+            upload = client.get('/static/uploads/accounts/' + 'a' * 64 + '.png')
+            assert 'immutable' in upload.headers['Cache-Control']
+        finally:
+            static_assets.static_folder, static_assets.manifest, static_assets.fingerprinted = saved
+
+if __name__ == "__main__":
+    test_build_manifest_and_siblings()
+    test_fingerprinted_urls_and_headers()
+    print("✅ Static asset tests passed!")
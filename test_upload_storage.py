@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test content-addressed upload storage, reference counting and backends
+"""
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+import pytest
+from werkzeug.datastructures import FileStorage
+from app import app, db
+from models import StoredFile
+from upload_storage import UploadStorage, LocalBackend, S3Backend
+
+def make_storage(root):
+    storage = UploadStorage()
+    storage.backend = LocalBackend(root)
+    return storage
+
+def upload(data, filename='shot.PNG'):
+    return FileStorage(stream=BytesIO(data), filename=filename)
+
+def test_local_dedup_and_parallel_order():
+    """Test identical content is stored once and save_many keeps input order"""
+    with tempfile.TemporaryDirectory() as root:
+        storage = make_storage(root)
+        first = storage.save(upload(b'same bytes'))
+        second = storage.save(upload(b'same bytes', 'other.png'))
+        assert (first.key, first.size) == (second.key, second.size)
+        assert first.spool is None and os.path.exists(second.spool)
+        storage.discard(second)
+        assert first.key == f"uploads/accounts/{hashlib.sha256(b'same bytes').hexdigest()}.png"
+        assert storage.written == 1 and storage.deduplicated == 1
+
+        payloads = [os.urandom(3 * 1024 * 1024 + i) for i in range(3)]
+        uploads = storage.save_many(upload(data) for data in payloads)
+        assert [u.size for u in uploads] == [len(data) for data in payloads]
+        for data, stored in zip(payloads, uploads):
+            with open(os.path.join(root, stored.key), 'rb') as f:
+                assert f.read() == data
+        assert not [name for name in os.listdir(os.path.join(root, 'uploads/accounts')) if name.startswith('.upload-')]
+
+def test_refcount_release_and_purge():
+    """Test a blob is purged only when its last reference is released"""
+    with tempfile.TemporaryDirectory() as root, app.app_context():
+        storage = make_storage(root)
+        stored = storage.save(upload(b'refcounted image'))
+        try:
+            storage.retain(stored)
+            storage.retain(stored)
+            db.session.commit()
+            assert db.session.get(StoredFile, stored.key).refcount == 2
+
+            assert storage.release([stored.key]) == []
+            db.session.commit()
+            orphans = storage.release([stored.key, 'uploads/accounts/legacy_file.png'])
+            db.session.commit()
+            assert orphans == [stored.key]
+            storage.purge(orphans)
+            assert not os.path.exists(os.path.join(root, stored.key))
+            assert db.session.get(StoredFile, stored.key) is None
+        finally:
+            StoredFile.query.filter_by(key=stored.key).delete()
+            db.session.commit()
+
+def test_reupload_during_purge():
+    """Test a re-upload racing the purge of the same content keeps its blob"""
+    with tempfile.TemporaryDirectory() as root, app.app_context():
+        storage = make_storage(root)
+        stored = storage.save(upload(b'deleted then uploaded again'))
+        path = os.path.join(root, stored.key)
+        try:
+            storage.retain(stored)
+            db.session.commit()
+            orphans = storage.release([stored.key])
+            db.session.commit()
+            assert db.session.get(StoredFile, stored.key).refcount == 0
+
+            # Found the blob before the purge deleted it, retained after
+            again = storage.save(upload(b'deleted then uploaded again'))
+            storage.purge(orphans)
+            assert not os.path.exists(path)
+            storage.retain(again)
+            db.session.commit()
+            assert os.path.exists(path) and not os.path.exists(again.spool)
+            assert db.session.get(StoredFile, stored.key).refcount == 1
+
+            # Referenced again before the purge: the blob stays
+            orphans = storage.release([stored.key])
+            db.session.commit()
+            storage.retain(storage.save(upload(b'deleted then uploaded again')))
+            db.session.commit()
+            storage.purge(orphans)
+            assert os.path.exists(path)
+            assert db.session.get(StoredFile, stored.key).refcount == 1
+        finally:
+            StoredFile.query.filter_by(key=stored.key).delete()
+            db.session.commit()
+
+def test_s3_backend_against_local_server():
+    """Test the S3 backend against moto's local S3 stand-in"""
+    ThreadedMotoServer = pytest.importorskip('moto.server').ThreadedMotoServer
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'test')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'test')
+    server = ThreadedMotoServer(port=0)
+    server.start()
+    try:
+        host, port = server.get_host_and_port()
+        backend = S3Backend('uploads', endpoint_url=f'http://{host}:{port}', region='us-east-1')
+        backend.client.create_bucket(Bucket='uploads')
+        storage = UploadStorage()
+        storage.backend = backend
+
+        stored = storage.save(upload(b'remote image'))
+        assert backend.exists(stored.key)
+        assert storage.save(upload(b'remote image')).key == stored.key
+        assert storage.deduplicated == 1
+        head = backend.client.head_object(Bucket='uploads', Key=stored.key)
+        assert head['ContentType'] == 'image/png'
+        assert 'immutable' in head['CacheControl']
+        assert backend.url(stored.key) == f'http://{host}:{port}/uploads/{stored.key}'
+
+        with backend.local_root([stored.key]) as local:
+            with open(os.path.join(local, stored.key), 'rb') as f:
+                assert f.read() == b'remote image'
+            derived = 'uploads/accounts/variants/derived.webp'
+            os.makedirs(os.path.dirname(os.path.join(local, derived)))
+            with open(os.path.join(local, derived), 'wb') as f:
+                f.write(b'variant')
+            backend.publish(local, [derived])
+        assert backend.exists(derived)
+
+        backend.delete(stored.key)
+        assert not backend.exists(stored.key)
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    test_local_dedup_and_parallel_order()
+    test_refcount_release_and_purge()
+    test_reupload_during_purge()
+    test_s3_backend_against_local_server()
+    print("✅ Upload storage tests passed!")
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Test the user loader cache and its cross-worker version stamp
+"""
+from app import app, db
+from models import User
+from user_cache import UserCache
+
+def test_user_cache_hits_and_version_invalidation():
+    """Test cached identities are reused until another worker bumps the version"""
+    cache = UserCache(maxsize=10, ttl=300, version_check=0)
+    other_worker = UserCache(maxsize=10, ttl=300, version_check=0)
+    with app.app_context():
+        user = User.query.first()
+
+        identity = cache.load(user.id)
+        assert identity.username == user.username
+        assert identity.has_permission('user')
+        assert cache.load(user.id) is identity
+        assert cache.stats()['hits'] == 1
+
+        other_worker.invalidate(user.id)
+        assert cache.load(user.id) is not identity
+        assert cache.stats()['misses'] == 2
+
+        assert cache.load(10 ** 9) is None
+
+if __name__ == "__main__":
+    test_user_cache_hits_and_version_invalidation()
+    print("✅ User cache tests passed!")
@@ -0,0 +1,329 @@
+"""
+Content-addressed storage for uploaded account images.
+
+Files are stored under ``<UPLOAD_PREFIX>/<sha256>.<ext>``. The upload is
+streamed to a temporary file while it is hashed, so it is never held in
+memory whole, and a file whose content is already stored is not written
+again. Several uploads from one form are spooled and hashed in parallel
+(``UPLOAD_HASH_WORKERS``).
+
+The stored_files table counts how many accounts reference each key.
+``retain()`` is called when an image is attached to an account.
+``release()`` is called when the account is deleted, and returns the keys
+nobody references anymore; ``purge()`` removes those blobs (and their
+image variants) after the commit.
+
+A delete and a re-upload of the same content can interleave, so:
+* ``release()`` leaves an unreferenced row at refcount 0 instead of
+  deleting it, and ``purge()`` deletes the row (``WHERE refcount <= 0``,
+  which locks it) before the blob and commits after. A concurrent
+  ``retain()`` either revives the row first, and the blob is kept, or waits
+  for the purge and then inserts a new row.
+* ``save()`` keeps its temporary copy when the content was already stored,
+  and ``retain()`` puts it back if it had to insert a new row and the blob
+  is gone. Uploads that are not retained are handed to ``discard()``.
+
+Backends (``UPLOAD_STORAGE``):
+* ``local``: files under the Flask static folder (default).
+* ``s3``: any S3-compatible service via boto3 (``S3_BUCKET``,
+  ``S3_ENDPOINT_URL``, ``S3_PUBLIC_URL``, ``S3_REGION``; credentials from the
+  usual AWS_* variables).
+"""
+import hashlib
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from flask import url_for
+from werkzeug.utils import secure_filename
+
+CHUNK_SIZE = 1024 * 1024
+
+# spool: temporary copy kept by save() when the blob already existed
+Upload = namedtuple('Upload', 'key size spool', defaults=(None,))
+
+
+class LocalBackend:
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, key)
+
+    def temp_dir(self, prefix):
+        # Same filesystem as the final location, so put() is an atomic rename
+        directory = self._path(prefix)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def put(self, key, filename):
+        os.makedirs(os.path.dirname(self._path(key)), exist_ok=True)
+        os.replace(filename, self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key):
+        return url_for('static', filename=key)
+
+    @contextmanager
+    def local_root(self, keys):
+        yield self.root
+
+    def publish(self, root, keys):
+        pass
+
+
+class S3Backend:
+    def __init__(self, bucket, endpoint_url=None, public_url=None, region=None):
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self.public_url = (public_url or f"{endpoint_url or 'https://s3.amazonaws.com'}/{bucket}").rstrip('/')
+        self.region = region
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+
+            self._client = boto3.client('s3', endpoint_url=self.endpoint_url, region_name=self.region)
+        return self._client
+
+    def temp_dir(self, prefix):
+        return None
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def put(self, key, filename):
+        content_type = mimetypes.guess_type(key)[0] or 'application/octet-stream'
+        try:
+            # Keys are content hashes, so the object at a key never changes
+            self.client.upload_file(filename, self.bucket, key, ExtraArgs={
+                'ContentType': content_type,
+                'CacheControl': 'public, max-age=31536000, immutable',
+            })
+        finally:
+            os.remove(filename)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def url(self, key):
+        return f"{self.public_url}/{key}"
+
+    @contextmanager
+    def local_root(self, keys):
+        """Download ``keys`` into a temporary root for local processing"""
+        root = tempfile.mkdtemp(prefix='uploads-')
+        try:
+            for key in keys:
+                target = os.path.join(root, key)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                self.client.download_file(self.bucket, key, target)
+            yield root
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    def publish(self, root, keys):
+        """Upload files written under a local_root() back to the bucket"""
+        for key in keys:
+            self.put(key, os.path.join(root, key))
+
+
+class UploadStorage:
+    def __init__(self, app=None):
+        self.backend = None
+        self.prefix = 'uploads/accounts'
+        self.hash_workers = 4
+        self._lock = threading.Lock()
+        self.deduplicated = 0
+        self.written = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.setdefault('UPLOAD_STORAGE', 'local')
+        self.prefix = app.config.setdefault('UPLOAD_PREFIX', self.prefix).strip('/')
+        self.hash_workers = app.config.setdefault('UPLOAD_HASH_WORKERS', self.hash_workers)
+        if kind == 's3':
+            self.backend = S3Backend(app.config['S3_BUCKET'], app.config.get('S3_ENDPOINT_URL'),
+                                     app.config.get('S3_PUBLIC_URL'), app.config.get('S3_REGION'))
+        elif kind == 'local':
+            self.backend = LocalBackend(app.static_folder)
+        else:
+            raise ValueError(f'Unknown UPLOAD_STORAGE: {kind}')
+        app.jinja_env.globals['upload_url'] = self.url
+        app.extensions['upload_storage'] = self
+
+    def _spool(self, file):
+        """Copy the upload to a temporary file, hashing it on the way"""
+        digest = hashlib.sha256()
+        size = 0
+        fd, filename = tempfile.mkstemp(prefix='.upload-', dir=self.backend.temp_dir(self.prefix))
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size, filename
+
+    def save(self, file):
+        """Store one werkzeug FileStorage and return its Upload (key, size, spool)"""
+        checksum, size, filename = self._spool(file)
+        extension = os.path.splitext(secure_filename(file.filename))[1].lower()
+        key = f"{self.prefix}/{checksum}{extension}"
+        if self.backend.exists(key):
+            # Kept until retain() in case a purge deletes the blob meanwhile
+            with self._lock:
+                self.deduplicated += 1
+            return Upload(key, size, filename)
+        self.backend.put(key, filename)
+        with self._lock:
+            self.written += 1
+        return Upload(key, size)
+
+    def save_many(self, files):
+        """Store several uploads in parallel, keeping their order"""
+        files = list(files)
+        if len(files) <= 1 or self.hash_workers <= 1:
+            return [self.save(file) for file in files]
+        with ThreadPoolExecutor(max_workers=min(self.hash_workers, len(files))) as executor:
+            return list(executor.map(self.save, files))
+
+    def retain(self, upload):
+        """Count one more reference to an upload; the caller commits"""
+        from sqlalchemy.exc import IntegrityError
+        from extensions import db
+        from models import StoredFile
+
+        # Waits for a purge holding the row; a row still here means its blob is too
+        increment = db.update(StoredFile).where(StoredFile.key == upload.key).values(
+            refcount=StoredFile.refcount + 1)
+        if db.session.execute(increment).rowcount:
+            self.discard(upload)
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.add(StoredFile(key=upload.key, size=upload.size, refcount=1))
+        except IntegrityError:
+            # Another request inserted the row first
+            db.session.execute(increment)
+        if upload.spool and not self.backend.exists(upload.key):
+            # Purged between save() and now
+            self.backend.put(upload.key, upload.spool)
+        else:
+            self.discard(upload)
+
+    def discard(self, upload):
+        """Remove the temporary copy save() kept for an upload"""
+        if upload.spool:
+            try:
+                os.remove(upload.spool)
+            except FileNotFoundError:
+                pass
+
+    def release(self, keys):
+        """Drop one reference per key and return the keys left unreferenced.
+
+        Keys without a stored_files row (uploads made before content
+        addressing) are left alone. Unreferenced rows stay at refcount 0
+        until purge(). The caller commits, then calls purge().
+        """
+        from extensions import db
+        from models import StoredFile
+
+        keys = set(keys)
+        if not keys:
+            return []
+        db.session.execute(
+            db.update(StoredFile).where(StoredFile.key.in_(keys), StoredFile.refcount > 0)
+            .values(refcount=StoredFile.refcount - 1)
+        )
+        return db.session.execute(
+            db.select(StoredFile.key).where(StoredFile.key.in_(keys), StoredFile.refcount <= 0)
+        ).scalars().all()
+
+    def purge(self, keys):
+        """Delete blobs that are still unreferenced, and their image variants.
+
+        Each key is re-checked in its own transaction: the row is deleted
+        first, so a retain() of the same key waits until the blob is gone
+        and then stores it again.
+        """
+        from extensions import db
+        from models import ImageVariant, StoredFile
+
+        for key in keys:
+            claimed = db.session.execute(
+                db.delete(StoredFile).where(StoredFile.key == key, StoredFile.refcount <= 0)
+            ).rowcount
+            if not claimed:
+                # Referenced again since release()
+                db.session.rollback()
+                continue
+            variant_paths = db.session.execute(
+                db.select(ImageVariant.path).where(ImageVariant.source == key)
+            ).scalars().all()
+            db.session.execute(db.delete(ImageVariant).where(ImageVariant.source == key))
+            try:
+                for path in list(variant_paths) + [key]:
+                    self.backend.delete(path)
+            except Exception as e:
+                # Keep the row at refcount 0 so a later purge can retry
+                db.session.rollback()
+                print(f"⚠️ Could not delete stored file {key}: {e}")
+                continue
+            db.session.commit()
+
+    def exists(self, key):
+        return self.backend.exists(key)
+
+    def url(self, key):
+        return self.backend.url(key)
+
+    def local_root(self, keys):
+        return self.backend.local_root(keys)
+
+    def publish(self, root, keys):
+        self.backend.publish(root, keys)
+
+    def stats(self):
+        from extensions import db
+        from models import StoredFile
+
+        files, total_size, references = db.session.execute(
+            db.select(db.func.count(), db.func.coalesce(db.func.sum(StoredFile.size), 0),
+                      db.func.coalesce(db.func.sum(StoredFile.refcount), 0)).where(StoredFile.refcount > 0)
+        ).one()
+        return {
+            'backend': type(self.backend).__name__,
+            'files': files,
+            'bytes': total_size,
+            'references': references,
+            'written': self.written,
+            'deduplicated': self.deduplicated,
+        }
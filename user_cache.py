@@ -0,0 +1,128 @@
+"""
+Per-worker cache for the Flask-Login user loader.
+
+load_user() runs on every authenticated request, including the AJAX cart and
+wishlist calls. This cache keeps a detached UserIdentity per user id in a
+TTL-bounded LRU, so those requests skip the users query.
+
+Invalidation bumps a version stamp in the cache_versions table. Every worker
+re-reads the stamp at most every ``USER_CACHE_VERSION_CHECK`` seconds and
+clears its cache when the stamp has moved, so an edit made through one worker
+reaches the others within that interval.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+VERSION_NAME = 'users'
+
+
+class UserCache:
+    def __init__(self, app=None, maxsize=1024, ttl=300, version_check=5):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_check = version_check
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.maxsize = app.config.setdefault('USER_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.setdefault('USER_CACHE_TTL', self.ttl)
+        self.version_check = app.config.setdefault('USER_CACHE_VERSION_CHECK', self.version_check)
+        app.extensions['user_cache'] = self
+
+    def _read_version(self):
+        from extensions import db
+        from models import CacheVersion
+
+        return db.session.execute(
+            db.select(CacheVersion.version).where(CacheVersion.name == VERSION_NAME)
+        ).scalar() or 0
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check:
+            return
+        version = self._read_version()
+        with self._lock:
+            self._version_checked_at = now
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+
+    def load(self, user_id):
+        """Return a UserIdentity for ``user_id``, or None if the user does not exist"""
+        from extensions import db
+        from models import User, UserIdentity
+
+        self._check_version()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                stored_at, identity = entry
+                if not self.ttl or time.monotonic() - stored_at <= self.ttl:
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return identity
+                del self._entries[user_id]
+                self.evictions += 1
+            self.misses += 1
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        identity = UserIdentity(user)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic(), identity)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return identity
+
+    def invalidate(self, user_id=None):
+        """Drop a user (or everyone) here and bump the shared version stamp.
+
+        Call after the change has been committed.
+        """
+        from extensions import db
+        from models import CacheVersion
+
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+            self.invalidations += 1
+
+        bumped = db.session.execute(
+            db.update(CacheVersion).where(CacheVersion.name == VERSION_NAME)
+            .values(version=CacheVersion.version + 1)
+        ).rowcount
+        if not bumped:
+            db.session.add(CacheVersion(name=VERSION_NAME, version=1))
+        db.session.commit()
+        # Re-read the stamp on the next load; that also clears this worker's cache
+        self._version_checked_at = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'version': self._version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,1033 @@
+"""
+Shop, account and admin views, registered on the app by create_app().
+"""
+from flask import Blueprint, Response, render_template, redirect, url_for, flash, request, jsonify, abort
+from flask_login import login_user, logout_user, login_required, current_user
+from functools import wraps
+from datetime import datetime, date, timedelta
+import io
+import os
+
+from extensions import db, login_manager, cipher_suite, catalog_cache, catalog_facets, search_index, audit_writer, user_cache, password_hasher, image_pipeline, upload_storage, dashboard_stats, sales_rollups, query_profiler, metrics
+from catalog_cache import CatalogItem, CatalogPage, make_key
+from facets import facet_key
+from keyset import keyset_paginate, order_by_sort, normalize_sort
+from credential_vault import decrypt_many
+from password_hasher import HasherBusy
+from http_cache import conditional_response, account_validator
+from models import User, GameAccount, Order, CartItem, AuditLog, Wishlist, PaymentSettings
+from forms import LoginForm, RegisterForm, CheckoutForm, AccountForm, AccountImportForm, PaymentSettingsForm, ForgotPasswordForm, ResetPasswordForm
+from reservations import reserve, release_order, release_expired_throttled, lock_order, ReservationError
+from account_import import AccountImportError, import_accounts, load_report, write_error_report
+
+bp = Blueprint('main', __name__)
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def attach_uploaded_images(account, files):
+    """Store uploaded images (in parallel, deduplicated) and reference them from the account"""
+    uploads = upload_storage.save_many(
+        file for file in files or [] if file and file.filename and allowed_file(file.filename)
+    )
+    added = []
+    for upload in uploads:
+        if upload.key not in account.get_images() and upload.key not in added:
+            account.add_image(upload.key)
+            upload_storage.retain(upload)
+            added.append(upload.key)
+        else:
+            upload_storage.discard(upload)
+    return added
+
+def role_required(required_role):
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_user.is_authenticated:
+                flash('Vui lòng đăng nhập để tiếp tục.', 'warning')
+                return redirect(url_for('main.login'))
+            if not current_user.has_permission(required_role):
+                flash('Bạn không có quyền truy cập.', 'danger')
+                AuditLog.create_log(current_user.id, 'access_denied', 
+                                   f'Attempted to access {request.endpoint} without permission', 
+                                   request.remote_addr)
+                return redirect(url_for('main.index'))
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+@login_manager.user_loader
+def load_user(user_id):
+    return user_cache.load(int(user_id))
+
+@bp.route('/')
+def index():
+    try:
+        page = request.args.get('page', 1, type=int)
+        category = request.args.get('category', '')
+        rank = request.args.get('rank', '')
+        min_price = request.args.get('min_price', type=float)
+        max_price = request.args.get('max_price', type=float)
+        search = request.args.get('search', '')
+        sort = request.args.get('sort', '')
+        # Search results default to relevance order unless a sort is picked
+        relevance = bool(search) and sort in ('', 'relevance')
+        sort = 'relevance' if relevance else normalize_sort(sort)
+        cursor = request.args.get('cursor', '')
+        # Cursor pages by default; ?page=N (offset + COUNT) stays for old links
+        keyset = not relevance and (bool(cursor) or 'page' not in request.args)
+        filter_args = {k: v for k, v in request.args.items() if k not in ('page', 'cursor') and v}
+        
+        def query_page():
+            query = GameAccount.query.filter_by(is_sold=False)
+            
+            if category:
+                query = query.filter_by(category=category)
+            if rank:
+                query = query.filter_by(rank=rank)
+            if min_price:
+                query = query.filter(GameAccount.price >= min_price)
+            if max_price:
+                query = query.filter(GameAccount.price <= max_price)
+            if search:
+                query = search_index.apply(query, search)
+                if relevance:
+                    return CatalogPage.from_pagination(query.paginate(page=page, per_page=12, error_out=False))
+                query = query.order_by(None)
+            
+            if keyset:
+                keyset_page = keyset_paginate(query, GameAccount, sort, cursor, per_page=12)
+                keyset_page.items = [CatalogItem(account) for account in keyset_page.items]
+                return keyset_page
+            
+            return CatalogPage.from_pagination(order_by_sort(query, GameAccount, sort).paginate(
+                page=page, per_page=12, error_out=False
+            ))
+        
+        def load_page():
+            accounts = query_page()
+            image_pipeline.attach(accounts.items)
+            return accounts
+        
+        accounts = catalog_cache.get_or_load(
+            make_key(None if keyset else page, category, rank, min_price, max_price, search, sort, cursor), load_page
+        )
+        categories = catalog_facets.categories()
+        ranks = catalog_facets.ranks()
+        price_buckets = catalog_facets.price_buckets()
+        
+        validator = (
+            request.full_path, getattr(accounts, 'total', None), accounts.has_next,
+            [account_validator(item) for item in accounts.items],
+            categories, ranks, price_buckets,
+        )
+        return conditional_response(validator, lambda: render_template('index.html', 
+                             accounts=accounts,
+                             filter_args=filter_args,
+                             categories=categories,
+                             ranks=ranks,
+                             price_buckets=price_buckets))
+    
+    except Exception as e:
+        print(f"Database connection error: {e}")
+        # Return a maintenance page or basic template
+        return render_template('maintenance.html' if os.path.exists('templates/maintenance.html') 
+                             else 'index.html', 
+                             accounts=None, 
+                             categories=[], 
+                             ranks=[],
+                             price_buckets=[],
+                             filter_args={},
+                             db_error=True)
+
+@bp.route('/account/<int:account_id>')
+def account_detail(account_id):
+    account = GameAccount.query.get_or_404(account_id)
+    if current_user.is_authenticated:
+        AuditLog.create_log(current_user.id, 'view_account', 
+                           f'Viewed account {account_id}', request.remote_addr)
+    image_pipeline.attach([account])
+    
+    validator = account_validator(account)
+    if current_user.is_authenticated and account.order_id:
+        # Buyers see their credentials once the order is completed
+        validator += (account.order.user_id, account.order.status)
+    return conditional_response(validator, lambda: render_template('account_detail.html', account=account))
+
+BUSY_MESSAGE = 'Hệ thống đang bận, vui lòng thử lại sau giây lát.'
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+    
+    form = LoginForm()
+    if form.validate_on_submit():
+        user = User.query.filter_by(email=form.email.data).first()
+        try:
+            valid = user is not None and user.check_password(form.password.data)
+        except HasherBusy:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('login.html', form=form), 503
+        if valid:
+            if db.session.is_modified(user):
+                # Password hash upgraded to the current cost parameters
+                db.session.commit()
+            login_user(user, remember=form.remember.data)
+            AuditLog.create_log(user.id, 'login', f'User logged in', request.remote_addr)
+            next_page = request.args.get('next')
+            flash('Đăng nhập thành công!', 'success')
+            return redirect(next_page if next_page else url_for('main.index'))
+        else:
+            flash('Email hoặc mật khẩu không đúng.', 'danger')
+            AuditLog.create_log(None, 'login_failed', 
+                               f'Failed login attempt for {form.email.data}', 
+                               request.remote_addr)
+    
+    return render_template('login.html', form=form)
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+    
+    form = RegisterForm()
+    if form.validate_on_submit():
+        user = User(
+            email=form.email.data,
+            username=form.username.data,
+            full_name=form.full_name.data,
+            phone=form.phone.data
+        )
+        try:
+            user.set_password(form.password.data)
+        except HasherBusy:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('register.html', form=form), 503
+        db.session.add(user)
+        db.session.commit()
+        AuditLog.create_log(user.id, 'register', f'New user registered: {user.username}', request.remote_addr)
+        flash('Đăng ký thành công! Vui lòng đăng nhập.', 'success')
+        return redirect(url_for('main.login'))
+    
+    return render_template('register.html', form=form)
+
+@bp.route('/logout')
+@login_required
+def logout():
+    AuditLog.create_log(current_user.id, 'logout', 'User logged out', request.remote_addr)
+    logout_user()
+    flash('Đã đăng xuất thành công.', 'info')
+    return redirect(url_for('main.index'))
+
+@bp.route('/forgot-password', methods=['GET', 'POST'])
+def forgot_password():
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+    
+    form = ForgotPasswordForm()
+    if form.validate_on_submit():
+        user = User.query.filter_by(email=form.email.data).first()
+        if user:
+            token = user.generate_reset_token()
+            db.session.commit()
+            
+            reset_url = url_for('main.reset_password', token=token, _external=True)
+            
+            flash(f'Link đặt lại mật khẩu: {reset_url}', 'info')
+            AuditLog.create_log(user.id, 'password_reset_request', f'Requested password reset', request.remote_addr)
+        else:
+            flash('Nếu email tồn tại, link đặt lại mật khẩu đã được gửi.', 'info')
+        
+        return redirect(url_for('main.login'))
+    
+    return render_template('forgot_password.html', form=form)
+
+@bp.route('/reset-password/<token>', methods=['GET', 'POST'])
+def reset_password(token):
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+    
+    user = User.query.filter_by(reset_token=token).first()
+    if not user or not user.verify_reset_token(token):
+        flash('Link đặt lại mật khẩu không hợp lệ hoặc đã hết hạn.', 'danger')
+        return redirect(url_for('main.forgot_password'))
+    
+    form = ResetPasswordForm()
+    if form.validate_on_submit():
+        try:
+            user.set_password(form.password.data)
+        except HasherBusy:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('reset_password.html', form=form, token=token), 503
+        user.reset_token = None
+        user.reset_token_expiry = None
+        db.session.commit()
+        user_cache.invalidate(user.id)
+        
+        AuditLog.create_log(user.id, 'password_reset', 'Password reset successful', request.remote_addr)
+        flash('Mật khẩu đã được đặt lại thành công! Vui lòng đăng nhập.', 'success')
+        return redirect(url_for('main.login'))
+    
+    return render_template('reset_password.html', form=form, token=token)
+
+@bp.route('/cart')
+@login_required
+def cart():
+    cart_items = CartItem.for_user(current_user.id)
+    total = sum(item.account.price for item in cart_items)
+    return render_template('cart.html', cart_items=cart_items, total=total)
+
+@bp.route('/add_to_cart/<int:account_id>', methods=['POST'])
+@login_required
+def add_to_cart(account_id):
+    account = GameAccount.query.get_or_404(account_id)
+    
+    if account.is_sold:
+        return jsonify({'success': False, 'message': 'Tài khoản đã được bán'}), 400
+    
+    if account.order_id is not None:
+        return jsonify({'success': False, 'message': 'Tài khoản đang được giữ cho một đơn hàng khác'}), 400
+    
+    existing_item = CartItem.query.filter_by(
+        user_id=current_user.id,
+        account_id=account_id
+    ).first()
+    
+    if existing_item:
+        return jsonify({'success': False, 'message': 'Tài khoản đã có trong giỏ hàng'}), 400
+    
+    cart_item = CartItem(user_id=current_user.id, account_id=account_id)
+    db.session.add(cart_item)
+    db.session.commit()
+    
+    AuditLog.create_log(current_user.id, 'add_to_cart', 
+                       f'Added account {account_id} to cart', request.remote_addr)
+    
+    return jsonify({'success': True, 'message': 'Đã thêm vào giỏ hàng'})
+
+@bp.route('/remove_from_cart/<int:item_id>', methods=['POST'])
+@login_required
+def remove_from_cart(item_id):
+    cart_item = CartItem.query.get_or_404(item_id)
+    if cart_item.user_id != current_user.id:
+        return jsonify({'success': False, 'message': 'Không có quyền'}), 403
+    
+    db.session.delete(cart_item)
+    db.session.commit()
+    
+    AuditLog.create_log(current_user.id, 'remove_from_cart', 
+                       f'Removed cart item {item_id}', request.remote_addr)
+    
+    return jsonify({'success': True, 'message': 'Đã xóa khỏi giỏ hàng'})
+
+@bp.route('/checkout', methods=['GET', 'POST'])
+@login_required
+def checkout():
+    cart_items = CartItem.for_user(current_user.id)
+    
+    if not cart_items:
+        flash('Giỏ hàng trống.', 'warning')
+        return redirect(url_for('main.cart'))
+    
+    total = sum(item.account.price for item in cart_items)
+    form = CheckoutForm()
+    
+    if form.validate_on_submit():
+        release_expired_throttled()
+        
+        order = Order(
+            user_id=current_user.id,
+            total_amount=total,
+            customer_name=form.customer_name.data,
+            customer_email=form.customer_email.data,
+            customer_phone=form.customer_phone.data,
+            status='pending',
+            payment_method='vietqr'
+        )
+        db.session.add(order)
+        db.session.flush()
+        
+        try:
+            reserve([item.account_id for item in cart_items], order.id)
+        except ReservationError as e:
+            db.session.rollback()
+            CartItem.query.filter(CartItem.user_id == current_user.id,
+                                  CartItem.account_id.in_(e.unavailable_ids)).delete(synchronize_session=False)
+            db.session.commit()
+            flash('Một số tài khoản vừa được người khác đặt và đã bị xóa khỏi giỏ hàng. Vui lòng kiểm tra lại.', 'warning')
+            return redirect(url_for('main.cart'))
+        
+        affected_categories = {item.account.category for item in cart_items}
+        CartItem.query.filter_by(user_id=current_user.id).delete(synchronize_session=False)
+        db.session.commit()
+        catalog_cache.invalidate(affected_categories)
+        
+        AuditLog.create_log(current_user.id, 'create_order', 
+                           f'Created order {order.id} with {len(cart_items)} items, total {total}', 
+                           request.remote_addr)
+        
+        flash('Đơn hàng đã được tạo! Vui lòng quét mã QR để thanh toán.', 'success')
+        return redirect(url_for('main.payment', order_id=order.id))
+    
+    return render_template('checkout.html', form=form, cart_items=cart_items, total=total)
+
+@bp.route('/payment/<int:order_id>')
+@login_required
+def payment(order_id):
+    order = Order.query.get_or_404(order_id)
+    if order.user_id != current_user.id:
+        flash('Không có quyền truy cập đơn hàng này.', 'danger')
+        return redirect(url_for('main.orders'))
+    
+    payment_settings = PaymentSettings.get_active_settings()
+    
+    if not payment_settings:
+        flash('Hệ thống thanh toán chưa được cấu hình. Vui lòng liên hệ quản trị viên.', 'danger')
+        return redirect(url_for('main.order_detail', order_id=order.id))
+    
+    payment_content = f"DH{order.id}"
+    order.payment_reference = payment_content
+    db.session.commit()
+    
+    qr_url = generate_vietqr_url(
+        payment_settings.bank_id,
+        payment_settings.account_number,
+        payment_settings.account_name,
+        int(order.total_amount),
+        payment_content,
+        payment_settings.qr_template
+    )
+    
+    return render_template('payment.html', order=order, qr_url=qr_url, 
+                          payment_settings=payment_settings, payment_content=payment_content)
+
+def generate_vietqr_url(bank_id, account_no, account_name, amount, content, template='compact'):
+    import urllib.parse
+    base_url = f"https://img.vietqr.io/image/{bank_id}-{account_no}-{template}.png"
+    params = {
+        'amount': amount,
+        'addInfo': content,
+        'accountName': account_name
+    }
+    return f"{base_url}?{urllib.parse.urlencode(params)}"
+
+ORDER_NOT_PAYABLE = 'Đơn hàng đã hết hạn giữ hàng hoặc không còn chờ thanh toán.'
+
+@bp.route('/payment/<int:order_id>/confirm', methods=['POST'])
+@login_required
+def confirm_payment(order_id):
+    order = Order.query.get_or_404(order_id)
+    if order.user_id != current_user.id and not current_user.has_permission('support'):
+        return jsonify({'success': False, 'message': 'Không có quyền'}), 403
+    
+    if not lock_order(order.id, ['pending']):
+        db.session.rollback()
+        return jsonify({'success': False, 'message': ORDER_NOT_PAYABLE}), 409
+    order.status = 'processing'
+    db.session.commit()
+    
+    AuditLog.create_log(current_user.id, 'confirm_payment', 
+                       f'Marked payment as sent for order {order.id}', request.remote_addr)
+    
+    return jsonify({'success': True, 'message': 'Đã xác nhận thanh toán. Vui lòng chờ admin xác nhận.'})
+
+@bp.route('/admin/order/<int:order_id>/complete-payment', methods=['POST'])
+@role_required('support')
+def admin_complete_payment(order_id):
+    order = Order.query.get_or_404(order_id)
+    if not lock_order(order.id, ['pending', 'processing']):
+        db.session.rollback()
+        return jsonify({'success': False, 'message': ORDER_NOT_PAYABLE}), 409
+    
+    affected_categories = set()
+    sold_keys = []
+    sold_ids = []
+    for account in order.accounts:
+        sold_keys.append(facet_key(account))
+        sold_ids.append(account.id)
+        account.is_sold = True
+        affected_categories.add(account.category)
+    
+    order.status = 'completed'
+    db.session.commit()
+    catalog_cache.invalidate(affected_categories)
+    for key in sold_keys:
+        catalog_facets.remove(key)
+    search_index.remove_many(sold_ids)
+    
+    AuditLog.create_log(current_user.id, 'complete_payment', 
+                       f'Completed payment for order {order.id}', request.remote_addr)
+    
+    return jsonify({'success': True, 'message': 'Đã xác nhận thanh toán thành công'})
+
+@bp.route('/orders')
+@login_required
+def orders():
+    user_orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).all()
+    return render_template('orders.html', orders=user_orders, account_counts=Order.account_counts(user_orders))
+
+@bp.route('/order/<int:order_id>')
+@login_required
+def order_detail(order_id):
+    order = Order.query.get_or_404(order_id)
+    if order.user_id != current_user.id and not current_user.has_permission('support'):
+        flash('Không có quyền truy cập đơn hàng này.', 'danger')
+        AuditLog.create_log(current_user.id, 'access_denied', 
+                           f'Attempted to access order {order_id}', request.remote_addr)
+        return redirect(url_for('main.orders'))
+    
+    if order.status == 'completed':
+        AuditLog.create_log(current_user.id, 'view_credentials', 
+                           f'Viewed credentials for order {order_id}', request.remote_addr)
+    
+    order_accounts = order.accounts.all()
+    credentials = decrypt_many(order_accounts) if order.status == 'completed' else {}
+    return render_template('order_detail.html', order=order, order_accounts=order_accounts,
+                          credentials=credentials)
+
+@bp.route('/profile')
+@login_required
+def profile():
+    return render_template('profile.html')
+
+@bp.route('/profile/edit', methods=['GET', 'POST'])
+@login_required
+def edit_profile():
+    if request.method == 'POST':
+        user = db.session.get(User, current_user.id)
+        user.full_name = request.form.get('full_name')
+        user.phone = request.form.get('phone')
+        db.session.commit()
+        user_cache.invalidate(user.id)
+        AuditLog.create_log(current_user.id, 'update_profile', 
+                           'Updated profile information', request.remote_addr)
+        flash('Cập nhật thông tin thành công!', 'success')
+        return redirect(url_for('main.profile'))
+    
+    return render_template('edit_profile.html')
+
+@bp.route('/admin')
+@role_required('support')
+def admin_dashboard():
+    counters = dashboard_stats.counters()
+    total_revenue = counters['revenue']
+    total_accounts = int(counters['accounts_total'])
+    sold_accounts = int(counters['accounts_sold'])
+    pending_orders = int(counters['orders_pending'])
+    
+    recent_orders = Order.query.order_by(Order.created_at.desc()).limit(10).all()
+    
+    return render_template('admin/dashboard.html',
+                         total_revenue=total_revenue,
+                         total_accounts=total_accounts,
+                         sold_accounts=sold_accounts,
+                         pending_orders=pending_orders,
+                         recent_orders=recent_orders)
+
+@bp.route('/admin/stats/sales')
+@role_required('admin')
+def admin_sales_series():
+    """Daily revenue/orders/units from the rollups, e.g. ?days=90&by=category"""
+    by = request.args.get('by', 'category')
+    if by not in ('category', 'day'):
+        return jsonify({'success': False, 'message': 'by phải là category hoặc day'}), 400
+    try:
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else datetime.utcnow().date()
+        if request.args.get('start'):
+            start = date.fromisoformat(request.args['start'])
+        else:
+            start = end - timedelta(days=request.args.get('days', 30, type=int) - 1)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Ngày không hợp lệ (YYYY-MM-DD)'}), 400
+    if start > end or (end - start).days >= sales_rollups.max_days:
+        return jsonify({'success': False, 'message': f'Khoảng thời gian tối đa {sales_rollups.max_days} ngày'}), 400
+    return jsonify(sales_rollups.series(start, end, by, request.args.get('category') or None))
+
+@bp.route('/admin/accounts')
+@role_required('support')
+def admin_accounts():
+    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor', '')
+    if cursor or 'page' not in request.args:
+        accounts = keyset_paginate(GameAccount.query, GameAccount, 'newest', cursor, per_page=20)
+    else:
+        accounts = order_by_sort(GameAccount.query, GameAccount, 'newest').paginate(
+            page=page, per_page=20, error_out=False
+        )
+    return render_template('admin/accounts.html', accounts=accounts)
+
+@bp.route('/admin/account/add', methods=['GET', 'POST'])
+@role_required('admin')
+def admin_add_account():
+    form = AccountForm()
+    if form.validate_on_submit():
+        encrypted_username = cipher_suite.encrypt(form.account_username.data.encode()).decode()
+        encrypted_password = cipher_suite.encrypt(form.account_password.data.encode()).decode()
+        
+        account = GameAccount(
+            title=form.title.data,
+            description=form.description.data,
+            category=form.category.data,
+            rank=form.rank.data,
+            price=form.price.data,
+            account_username=encrypted_username,
+            account_password=encrypted_password,
+            internal_notes=form.internal_notes.data,
+            images=[]
+        )
+        
+        uploaded = attach_uploaded_images(account, form.images.data)
+        
+        db.session.add(account)
+        db.session.commit()
+        catalog_cache.invalidate({account.category})
+        catalog_facets.add(account)
+        search_index.index_account(account)
+        image_pipeline.submit(account.id, uploaded)
+        
+        AuditLog.create_log(current_user.id, 'create_account', 
+                           f'Created account {account.id}: {account.title}', request.remote_addr)
+        
+        flash('Đã thêm tài khoản thành công!', 'success')
+        return redirect(url_for('main.admin_accounts'))
+    
+    return render_template('admin/account_form.html', form=form, action='add')
+
+@bp.route('/admin/accounts/import', methods=['GET', 'POST'])
+@role_required('admin')
+def admin_import_accounts():
+    form = AccountImportForm()
+    result = None
+    if form.validate_on_submit():
+        upload = form.file.data
+        try:
+            # The upload is spooled to disk by Werkzeug and read row by row
+            result = import_accounts(upload.stream, upload.filename, restart=form.restart.data)
+        except AccountImportError as e:
+            flash(f'Không thể nhập tệp: {e}', 'danger')
+            return render_template('admin/account_import.html', form=form, result=None)
+        
+        if result['already_imported']:
+            flash('Tệp này đã được nhập trước đó. Chọn "Nhập lại toàn bộ tệp" để nhập lại.', 'warning')
+        else:
+            AuditLog.create_log(current_user.id, 'import_accounts',
+                               f"Imported {result['imported']} accounts from {upload.filename} "
+                               f"({result['failed']} rows rejected)", request.remote_addr)
+            flash(f"Đã nhập {result['imported']} tài khoản, {result['failed']} dòng bị từ chối.",
+                  'success' if not result['failed'] else 'warning')
+    
+    return render_template('admin/account_import.html', form=form, result=result)
+
+@bp.route('/admin/accounts/import/<name>/errors.csv')
+@role_required('admin')
+def admin_import_errors(name):
+    report = load_report(name)
+    if report is None:
+        abort(404)
+    output = io.StringIO()
+    write_error_report(report['errors'], output)
+    return Response(output.getvalue(), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename=import-errors-{name.split(":")[-1][:12]}.csv'})
+
+@bp.route('/admin/account/edit/<int:account_id>', methods=['GET', 'POST'])
+@role_required('admin')
+def admin_edit_account(account_id):
+    account = GameAccount.query.get_or_404(account_id)
+    
+    if request.method == 'GET':
+        form = AccountForm(
+            title=account.title,
+            description=account.description,
+            category=account.category,
+            rank=account.rank,
+            price=account.price,
+            internal_notes=account.internal_notes
+        )
+    else:
+        form = AccountForm()
+    
+    if form.validate_on_submit():
+        previous_category = account.category
+        previous_facet = facet_key(account)
+        account.title = form.title.data
+        account.description = form.description.data
+        account.category = form.category.data
+        account.rank = form.rank.data
+        account.price = form.price.data
+        account.internal_notes = form.internal_notes.data
+        
+        if form.account_username.data and form.account_username.data.strip():
+            account.account_username = cipher_suite.encrypt(form.account_username.data.encode()).decode()
+        if form.account_password.data and form.account_password.data.strip():
+            account.account_password = cipher_suite.encrypt(form.account_password.data.encode()).decode()
+        
+        uploaded = attach_uploaded_images(account, form.images.data)
+        
+        db.session.commit()
+        catalog_cache.invalidate({previous_category, account.category})
+        catalog_facets.update(previous_facet, facet_key(account))
+        search_index.index_account(account)
+        image_pipeline.submit(account.id, uploaded)
+        
+        AuditLog.create_log(current_user.id, 'edit_account', 
+                           f'Edited account {account.id}: {account.title}', request.remote_addr)
+        
+        flash('Đã cập nhật tài khoản thành công!', 'success')
+        return redirect(url_for('main.admin_accounts'))
+    
+    credentials = decrypt_many([account])[account.id]
+    decrypted_username = credentials.username
+    decrypted_password = credentials.password
+    
+    return render_template('admin/account_form.html', form=form, action='edit', account=account,
+                          decrypted_username=decrypted_username, decrypted_password=decrypted_password)
+
+@bp.route('/admin/account/delete/<int:account_id>', methods=['POST'])
+@role_required('admin')
+def admin_delete_account(account_id):
+    account = GameAccount.query.get_or_404(account_id)
+    
+    if account.is_sold:
+        return jsonify({'success': False, 'message': 'Không thể xóa tài khoản đã bán'}), 400
+    
+    AuditLog.create_log(current_user.id, 'delete_account', 
+                       f'Deleted account {account.id}: {account.title}', request.remote_addr)
+    
+    category = account.category
+    facet = facet_key(account)
+    orphans = upload_storage.release(account.get_images())
+    db.session.delete(account)
+    db.session.commit()
+    upload_storage.purge(orphans)
+    catalog_cache.invalidate({category})
+    catalog_facets.remove(facet)
+    search_index.remove(account_id)
+    
+    return jsonify({'success': True, 'message': 'Đã xóa tài khoản'})
+
+@bp.route('/admin/cache-stats')
+@role_required('admin')
+def admin_cache_stats():
+    """Hit/miss/eviction counters for sizing the catalog cache"""
+    return jsonify({'catalog': catalog_cache.stats()})
+
+@bp.route('/admin/user-cache')
+@role_required('admin')
+def admin_user_cache():
+    """Hit/miss counters and version stamp of the user loader cache"""
+    return jsonify(user_cache.stats())
+
+@bp.route('/admin/query-profiler')
+@role_required('admin')
+def admin_query_profiler():
+    """Query counts, DB time and slowest statements of recent requests"""
+    return jsonify(query_profiler.stats(limit=request.args.get('limit', 50, type=int)))
+
+@bp.route('/admin/password-hasher')
+@role_required('admin')
+def admin_password_hasher():
+    """Queue depth, rejections and latency histograms of password hashing"""
+    return jsonify(password_hasher.stats())
+
+@bp.route('/admin/image-pipeline')
+@role_required('admin')
+def admin_image_pipeline():
+    """Rendered/failed counters of the image variant pipeline"""
+    return jsonify(image_pipeline.stats())
+
+@bp.route('/admin/upload-storage')
+@role_required('admin')
+def admin_upload_storage():
+    """Stored file count, bytes and deduplication counters of the upload store"""
+    return jsonify(upload_storage.stats())
+
+@bp.route('/admin/audit-queue')
+@role_required('admin')
+def admin_audit_queue():
+    """Queue depth and drop/backpressure counters of the audit log writer"""
+    return jsonify(audit_writer.stats())
+
+@bp.route('/admin/orders')
+@role_required('support')
+def admin_orders():
+    page = request.args.get('page', 1, type=int)
+    orders = Order.query.order_by(Order.created_at.desc()).paginate(
+        page=page, per_page=20, error_out=False
+    )
+    return render_template('admin/orders.html', orders=orders, account_counts=Order.account_counts(orders.items))
+
+@bp.route('/admin/order/<int:order_id>/update_status', methods=['POST'])
+@role_required('support')
+def admin_update_order_status(order_id):
+    order = Order.query.get_or_404(order_id)
+    new_status = request.json.get('status')
+    
+    if new_status not in ['pending', 'processing', 'completed', 'cancelled']:
+        return jsonify({'success': False, 'message': 'Trạng thái không hợp lệ'}), 400
+    
+    old_status = order.status
+    order.status = new_status
+    if new_status == 'cancelled':
+        release_order(order.id)
+    db.session.commit()
+    
+    AuditLog.create_log(current_user.id, 'update_order_status', 
+                       f'Updated order {order.id} status from {old_status} to {new_status}', 
+                       request.remote_addr)
+    
+    return jsonify({'success': True, 'message': 'Đã cập nhật trạng thái'})
+
+@bp.route('/admin/logs')
+@role_required('admin')
+def admin_logs():
+    page = request.args.get('page', 1, type=int)
+    logs = AuditLog.query.options(db.joinedload(AuditLog.user)).order_by(AuditLog.created_at.desc()).paginate(
+        page=page, per_page=50, error_out=False
+    )
+    return render_template('admin/logs.html', logs=logs)
+
+@bp.route('/admin/payment-settings', methods=['GET', 'POST'])
+@role_required('admin')
+def admin_payment_settings():
+    settings = PaymentSettings.get_active_settings()
+    
+    if request.method == 'GET':
+        if settings:
+            form = PaymentSettingsForm(
+                bank_id=settings.bank_id,
+                bank_name=settings.bank_name,
+                account_number=settings.account_number,
+                account_name=settings.account_name,
+                qr_template=settings.qr_template
+            )
+        else:
+            form = PaymentSettingsForm()
+    else:
+        form = PaymentSettingsForm()
+    
+    if form.validate_on_submit():
+        if settings:
+            settings.bank_id = form.bank_id.data
+            settings.bank_name = form.bank_name.data
+            settings.account_number = form.account_number.data
+            settings.account_name = form.account_name.data
+            settings.qr_template = form.qr_template.data
+            flash_msg = 'Đã cập nhật cài đặt thanh toán!'
+        else:
+            settings = PaymentSettings(
+                bank_id=form.bank_id.data,
+                bank_name=form.bank_name.data,
+                account_number=form.account_number.data,
+                account_name=form.account_name.data,
+                qr_template=form.qr_template.data,
+                is_active=True
+            )
+            db.session.add(settings)
+            flash_msg = 'Đã thêm cài đặt thanh toán!'
+        
+        db.session.commit()
+        
+        AuditLog.create_log(current_user.id, 'update_payment_settings', 
+                           f'Updated VietQR payment settings', request.remote_addr)
+        
+        flash(flash_msg, 'success')
+        return redirect(url_for('main.admin_payment_settings'))
+    
+    return render_template('admin/payment_settings.html', form=form, settings=settings)
+
+@bp.route('/wishlist')
+@login_required
+def wishlist():
+    wishlist_items = Wishlist.for_user(current_user.id)
+    return render_template('wishlist.html', wishlist_items=wishlist_items)
+
+@bp.route('/wishlist/add/<int:account_id>', methods=['POST'])
+@login_required
+def add_to_wishlist(account_id):
+    account = GameAccount.query.get_or_404(account_id)
+    
+    if account.is_sold:
+        return jsonify({'success': False, 'message': 'Tài khoản đã được bán'}), 400
+    
+    existing = Wishlist.query.filter_by(user_id=current_user.id, account_id=account_id).first()
+    if existing:
+        return jsonify({'success': False, 'message': 'Đã có trong danh sách yêu thích'}), 400
+    
+    wishlist_item = Wishlist(user_id=current_user.id, account_id=account_id)
+    db.session.add(wishlist_item)
+    db.session.commit()
+    
+    AuditLog.create_log(current_user.id, 'add_to_wishlist', 
+                       f'Added account {account_id} to wishlist', request.remote_addr)
+    
+    return jsonify({'success': True, 'message': 'Đã thêm vào danh sách yêu thích'})
+
+@bp.route('/wishlist/remove/<int:account_id>', methods=['POST'])
+@login_required
+def remove_from_wishlist(account_id):
+    wishlist_item = Wishlist.query.filter_by(user_id=current_user.id, account_id=account_id).first_or_404()
+    
+    db.session.delete(wishlist_item)
+    db.session.commit()
+    
+    AuditLog.create_log(current_user.id, 'remove_from_wishlist', 
+                       f'Removed account {account_id} from wishlist', request.remote_addr)
+    
+    return jsonify({'success': True, 'message': 'Đã xóa khỏi danh sách yêu thích'})
+
+@bp.route('/health')
+def health_check():
+    """Health check endpoint for monitoring"""
+    try:
+        # Test database connection
+        with db.engine.connect() as connection:
+            connection.execute(db.text('SELECT 1'))
+        
+        return jsonify({
+            'status': 'healthy',
+            'database': 'connected',
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'unhealthy',
+            'database': 'disconnected',
+            'error': str(e),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 500
+
+@bp.route('/metrics')
+def metrics_export():
+    """Prometheus metrics, summed over all gunicorn workers"""
+    if not metrics.authorized(request.headers.get('Authorization')):
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    body, content_type = metrics.export()
+    return body, 200, {'Content-Type': content_type}
+
+@bp.route('/status')
+def status():
+    """Simple status page"""
+    return render_template('status.html')
+
+@bp.route('/init-db')
+def init_database_route():
+    """Initialize database tables and data"""
+    try:
+        # Create all tables
+        db.create_all()
+        
+        # Check if we need to initialize data
+        user_count = User.query.count()
+        account_count = GameAccount.query.count()
+        
+        if user_count == 0:
+            from init_db import init_database
+            init_database()
+            return jsonify({
+                'status': 'success',
+                'message': 'Database initialized with sample data',
+                'users_created': User.query.count(),
+                'accounts_created': GameAccount.query.count()
+            })
+        else:
+            return jsonify({
+                'status': 'success', 
+                'message': f'Database already has {user_count} users and {account_count} accounts',
+                'users_count': user_count,
+                'accounts_count': account_count
+            })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/reset-db')
+def reset_database_route():
+    """Reset database and reinitialize with sample data"""
+    try:
+        # Drop all tables
+        db.drop_all()
+        
+        # Create all tables
+        db.create_all()
+        
+        # Initialize with sample data
+        from init_db import init_database
+        init_database()
+        catalog_cache.invalidate()
+        catalog_facets.invalidate()
+        search_index.invalidate()
+        user_cache.invalidate()
+        
+        return jsonify({
+            'status': 'success',
+            'message': 'Database reset and initialized successfully',
+            'users_created': User.query.count(),
+            'accounts_created': GameAccount.query.count()
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/startup-status')
+def startup_status():
+    """Check startup and database status"""
+    try:
+        user_count = User.query.count()
+        account_count = GameAccount.query.count()
+        payment_count = PaymentSettings.query.count()
+        
+        return jsonify({
+            'status': 'success',
+            'database_status': 'connected',
+            'users': user_count,
+            'accounts': account_count,
+            'payment_settings': payment_count,
+            'initialized': user_count > 0 and account_count > 0,
+            'timestamp': datetime.utcnow().isoformat()
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'database_status': 'disconnected',
+            'error': str(e),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 500
+
+@bp.route('/force-init')
+def force_init():
+    """Force initialize database with sample data"""
+    try:
+        # Always run initialization
+        from init_db import init_database
+        
+        # Drop and recreate tables
+        db.drop_all()
+        db.create_all()
+        
+        # Initialize with sample data
+        init_database()
+        catalog_cache.invalidate()
+        catalog_facets.invalidate()
+        search_index.invalidate()
+        user_cache.invalidate()
+        
+        return jsonify({
+            'status': 'success',
+            'message': 'Database force initialized successfully',
+            'users_created': User.query.count(),
+            'accounts_created': GameAccount.query.count(),
+            'payment_settings_created': PaymentSettings.query.count()
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500